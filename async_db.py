@@ -0,0 +1,221 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    # Optional dependencies, only needed by the asyncio crawler
+    import aiosqlite  # noqa: F401 (the sqlite+aiosqlite driver)
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_scoped_session, async_sessionmaker, \
+        create_async_engine
+except ImportError as err:
+    raise ImportError(f"async_db.py needs the optional asyncio dependencies ({err.name} is missing): "
+                      f"pip install -r requirements-async.txt") from err
+from sqlalchemy.orm import Session
+
+import db
+import metrics
+from models import Race
+from repository import get_season
+from rows import DivisionRow
+from web_scraping.divisions import write_divisions
+from web_scraping.races import update_races_in_db
+from web_scraping.result_summaries import ResultMerge
+from web_scraping.seasons import update_seasons_in_db
+
+# Writes that may wait for the writer before producers are slowed down (backpressure)
+MAX_PENDING_WRITES = 256
+# Writes applied (and committed) together at most
+MAX_BATCH = 64
+
+
+def async_db_uri(db_uri: Optional[str] = None) -> str:
+    """The aiosqlite variant of a sqlite:// URI (db.DB_URI by default)."""
+    db_uri = db_uri or db.DB_URI
+    if db_uri.startswith('sqlite://'):
+        return db_uri.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+    return db_uri
+
+
+async def init_async_db(db_uri: Optional[str] = None) -> AsyncEngine:
+    """Async counterpart of db.init_db(): creates or upgrades the schema and returns the engine."""
+    engine = create_async_engine(async_db_uri(db_uri))
+    async with engine.begin() as connection:
+        await connection.run_sync(db.prepare_schema)
+    return engine
+
+
+def task_scoped_sessions(engine: AsyncEngine) -> async_scoped_session:
+    """
+    Session registry that gives every asyncio task its own AsyncSession (the async counterpart
+    of db.Session); call `await sessions.remove()` when a task is done with its session.
+
+    Example:
+        sessions = task_scoped_sessions(engine)
+        async def count_races():
+            try:
+                return await sessions().scalar(select(func.count(Race.id)))
+            finally:
+                await sessions.remove()
+    """
+    return async_scoped_session(async_sessionmaker(engine, expire_on_commit=False), scopefunc=asyncio.current_task)
+
+
+class AsyncWriter:
+    """
+    The single database writer of an asyncio crawler.
+
+    Crawler coroutines hand their parsed downloads to the writer and keep fetching. A background
+    task applies the queued writes in batches: every batch is one run_sync() call on an
+    AsyncSession, so the writers of the sync crawler (update_seasons_in_db, update_races_in_db,
+    write_divisions, ResultMerge) run unchanged while the event loop keeps serving the fetches.
+    Result pages that queue up while a batch is being written are committed together with the
+    next batch, so the busier the crawl, the fewer commits per page.
+
+    Only plain values (ids, rows.DivisionRow) are handed back to the crawler, never ORM objects.
+
+    Example:
+        engine = await init_async_db()
+        async with AsyncWriter(engine) as writer:
+            await writer.write_seasons(scraped_seasons)
+            races = await writer.write_races(8, race_groups)          # [(race_id, race_name), ...]
+            divisions = await writer.write_divisions(race_id, specs)  # [DivisionRow, ...]
+            await writer.queue_results(division.id, rows_info)         # returns once queued
+            counts = await writer.finish_division(division.id)
+        await engine.dispose()
+    """
+
+    def __init__(self, engine: AsyncEngine, max_pending: int = MAX_PENDING_WRITES, max_batch: int = MAX_BATCH):
+        self.session = AsyncSession(engine, expire_on_commit=False)
+        self.max_batch = max_batch
+        self.counts = {'batches': 0, 'writes': 0, 'results': 0}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._merges: Dict[int, ResultMerge] = {}
+        # Divisions that lost a page in a failed batch: their vanished results are not flagged
+        self._failed_divisions: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'AsyncWriter':
+        self._task = asyncio.create_task(self._run(), name='async-writer')
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Everything queued so far is written before the session is closed
+        await self._queue.put(None)
+        await self._task
+        await self.session.close()
+
+    # --- Writers ---
+
+    async def write_seasons(self, scraped_seasons: List[Dict[str, Any]]):
+        await self._call(_write_seasons, scraped_seasons)
+
+    async def write_races(self, season_number: int, race_groups: List[Dict[str, str]]) -> List[Tuple[int, str]]:
+        """Stores the races of a season. Returns (race_id, race_name) of every race of the season."""
+        return await self._call(_write_races, season_number, race_groups)
+
+    async def write_divisions(self, race_id: int, specs: List[Dict[str, Any]]) -> List[DivisionRow]:
+        """Stores the divisions of a race (see fetch_division_specs). Returns all divisions of the race."""
+        return await self._call(_write_divisions, race_id, specs)
+
+    async def queue_results(self, division_id: int, rows_info: list) -> asyncio.Future:
+        """
+        Queues one parsed result page for merging and returns as soon as it is queued.
+
+        The returned future resolves to the number of inserted results once the page is committed.
+        """
+        return await self._enqueue(self._merge_results, division_id, rows_info)
+
+    async def write_results(self, division_id: int, rows_info: list) -> int:
+        """Merges one parsed result page and waits for the commit. Returns the number of inserted results."""
+        return await (await self.queue_results(division_id, rows_info))
+
+    async def finish_division(self, division_id: int) -> Dict[str, int]:
+        """Call after the last page of a division was queued (see ResultMerge.finish). Returns its merge counts."""
+        return await self._call(self._finish_results, division_id)
+
+    # --- Batching ---
+
+    async def _call(self, write: Callable, *args):
+        return await (await self._enqueue(write, *args))
+
+    async def _enqueue(self, write: Callable, *args) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((write, args, future))
+        metrics.QUEUE_DEPTH.set(self._queue.qsize(), queue='async_writes')
+        return future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            metrics.QUEUE_DEPTH.set(self._queue.qsize(), queue='async_writes')
+            writes = [item for item in batch if item is not None]
+            if writes:
+                await self._apply(writes)
+            if len(writes) < len(batch):
+                return
+
+    async def _apply(self, writes: list):
+        try:
+            outcomes = await self.session.run_sync(self._apply_sync, writes)
+        except Exception as err:
+            # Any error fails the waiting writes instead of the writer task (which would leave them waiting forever)
+            await self.session.rollback()
+            # The merges of the divisions in the failed batch no longer match the database: they are
+            # reloaded on the next page, and the pages they lost must not count as vanished results
+            for division_id in {args[0] for write, args, _ in writes
+                                if write in (self._merge_results, self._finish_results)}:
+                self._merges.pop(division_id, None)
+                self._failed_divisions.add(division_id)
+            print(f"  ❌ Error in a batch of {len(writes)} write(s): {err}")
+            for _, _, future in writes:
+                if not future.cancelled():
+                    future.set_exception(err)
+            return
+        self.counts['batches'] += 1
+        self.counts['writes'] += len(writes)
+        for (write, _, future), outcome in zip(writes, outcomes):
+            # Inserted results only count once committed
+            if write == self._merge_results:
+                self.counts['results'] += outcome
+            if not future.cancelled():
+                future.set_result(outcome)
+
+    def _apply_sync(self, session: Session, writes: list) -> list:
+        """Runs in run_sync(): applies every write of the batch, then commits them together."""
+        outcomes = [write(session, *args) for write, args, _ in writes]
+        with metrics.DB_COMMIT_SECONDS.time(writer='async_batch'):
+            session.commit()
+        return outcomes
+
+    def _merge_results(self, session: Session, division_id: int, rows_info: list) -> int:
+        if division_id not in self._merges:
+            self._merges[division_id] = ResultMerge(session, division_id)
+        return len(self._merges[division_id].merge_page(rows_info))
+
+    def _finish_results(self, session: Session, division_id: int) -> Dict[str, int]:
+        merge = self._merges.pop(division_id, None)
+        if division_id in self._failed_divisions:
+            self._failed_divisions.discard(division_id)
+            print(f"  ⚠️ Division {division_id} lost a page in a failed batch; not flagging vanished results.")
+            return merge.counts if merge is not None else {}
+        return merge.finish() if merge is not None else {}
+
+
+def _write_seasons(session: Session, scraped_seasons: List[Dict[str, Any]]):
+    update_seasons_in_db(session, scraped_seasons, commit=False)
+
+
+def _write_races(session: Session, season_number: int, race_groups: List[Dict[str, str]]) -> List[Tuple[int, str]]:
+    season = get_season(session, season_number, profile='races')
+    if season is None:
+        print(f"  ❌ Season {season_number} is not in the database; write the seasons first.")
+        return []
+    update_races_in_db(session, season, race_groups, commit=False)
+    return [(race.id, race.name) for race in season.races]
+
+
+def _write_divisions(session: Session, race_id: int, specs: List[Dict[str, Any]]) -> List[DivisionRow]:
+    race = session.get(Race, race_id)
+    write_divisions(session, race, specs, commit=False)
+    return [DivisionRow(d.id, d.race_id, d.division, d.gender, d.event_id) for d in race.divisions]
@@ -0,0 +1,196 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple, Any
+
+from sqlalchemy import select, func, update, bindparam, insert
+from sqlalchemy.orm import Session
+
+from models import Athlete, AgeGroup, Result, Division, Race, Season
+
+# Number of rows streamed from the DB / written back per round trip
+BATCH_SIZE = 10_000
+
+
+# --- 1. Blocking Keys ---
+
+def normalize_name(full_name: str | None) -> str:
+    """
+    Normalizes an athlete name into an order-independent key.
+
+    Accents and punctuation are dropped, tokens are lower-cased and sorted:
+    'Smith, John', 'John Smith' and 'JOHN SMÍTH' all become 'john smith'.
+    """
+    if not full_name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', full_name)
+    ascii_name = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    tokens = re.findall(r'[a-z0-9]+', ascii_name.lower())
+    return ' '.join(sorted(tokens))
+
+
+def blocking_key(full_name: str | None, nation_abbreviation: str | None) -> Tuple[str, str]:
+    """Returns the (normalized name, nation) block a result belongs to."""
+    return normalize_name(full_name), (nation_abbreviation or '').strip().upper()
+
+
+def age_group_floor(age_group: str | None) -> Optional[int]:
+    """
+    Returns the youngest age of an age group label, or None if it has none.
+
+    '30-34' -> 30, '70+' -> 70, 'U24' -> 0.
+    """
+    if not age_group:
+        return None
+    if age_group.strip().upper().startswith('U'):
+        return 0
+    match = re.search(r'\d+', age_group)
+    return int(match.group()) if match else None
+
+
+# --- 2. Identity Resolution ---
+
+def resolve_athletes(session: Session, full: bool = False) -> Dict[str, int]:
+    """
+    Assigns a stable athlete id to every result.
+
+    Results are grouped by blocking key (normalized name + nation) in a single pass.
+    Within a block, results from the same division of a race must belong to different
+    people, so such a result moves on to another variant of the block (creating it if
+    needed); one athlete may start in several divisions of a race (e.g. HYROX and DOUBLES).
+    Among the free variants, the one whose last age group fits is preferred: results are
+    resolved oldest season first and an athlete's age group never gets younger.
+
+    Existing athletes keep their ids: by default only results without an athlete
+    are resolved, which makes re-running after scraping new races incremental.
+
+    :param session: The SQLAlchemy Session object.
+    :param full: If True, forget all assignments and re-resolve every result.
+    :return: Counts of resolved results and newly created athletes.
+    """
+    if full:
+        session.execute(update(Result).values(athlete_id=None))
+        session.query(Athlete).delete()
+        session.commit()
+
+    # 1. Load known athletes: blocking key -> athlete ids ordered by variant
+    athletes_by_key: Dict[Tuple[str, str], List[int]] = {}
+    known_athletes = session.execute(
+        select(Athlete.id, Athlete.name_key, Athlete.nation_abbreviation)
+        .order_by(Athlete.variant.asc())
+    )
+    for athlete_id, name_key, nation in known_athletes:
+        athletes_by_key.setdefault((name_key, nation), []).append(athlete_id)
+    next_athlete_id = (session.execute(select(func.max(Athlete.id))).scalar() or 0) + 1
+
+    # 2. Divisions each known athlete already appears in (only for the races we are about to resolve)
+    unresolved_races = (
+        select(Division.race_id)
+        .join(Result, Result.division_id == Division.id)
+        .where(Result.athlete_id.is_(None))
+        .distinct()
+    )
+    divisions_by_athlete: Dict[int, set] = {}
+    taken = session.execute(
+        select(Result.athlete_id, Result.division_id)
+        .join(Division, Result.division_id == Division.id)
+        .where(Result.athlete_id.is_not(None), Division.race_id.in_(unresolved_races))
+        .distinct()
+    )
+    for athlete_id, division_id in taken:
+        divisions_by_athlete.setdefault(athlete_id, set()).add(division_id)
+
+    # 3. Youngest age of every age group, and of the latest age group of each known athlete
+    age_floors: Dict[int, Optional[int]] = {
+        age_group_id: age_group_floor(name) for age_group_id, name in session.execute(select(AgeGroup.id, AgeGroup.name))
+    }
+    last_age_floors: Dict[int, int] = {}
+    if not full:
+        latest_age_groups = session.execute(
+            select(Result.athlete_id, Result.age_group_id)
+            .join(Division, Result.division_id == Division.id)
+            .join(Race, Division.race_id == Race.id)
+            .join(Season, Race.season_id == Season.id)
+            .where(Result.athlete_id.is_not(None), Result.age_group_id.is_not(None))
+            .order_by(Season.number.asc(), Race.id.asc(), Result.id.asc())
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+        for athlete_id, age_group_id in latest_age_groups:
+            if age_floors.get(age_group_id) is not None:
+                last_age_floors[athlete_id] = age_floors[age_group_id]
+
+    def age_fit(athlete_id: int, age_floor: Optional[int]) -> Tuple[int, int]:
+        # Best first: same or the closest younger age group, then unknown, then older age groups
+        last_age_floor = last_age_floors.get(athlete_id)
+        if age_floor is None or last_age_floor is None:
+            return 1, 0
+        if last_age_floor <= age_floor:
+            return 0, age_floor - last_age_floor
+        return 2, last_age_floor - age_floor
+
+    # 4. Single streaming pass over unresolved results, oldest season first
+    unresolved = session.execute(
+        select(Result.id, Result.full_name, Result.nation_abbreviation, Result.division_id, Result.age_group_id)
+        .join(Division, Result.division_id == Division.id)
+        .join(Race, Division.race_id == Race.id)
+        .join(Season, Race.season_id == Season.id)
+        .where(Result.athlete_id.is_(None))
+        .order_by(Season.number.asc(), Race.id.asc(), Result.id.asc())
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+
+    new_athletes: List[Dict[str, Any]] = []
+    assignments: List[Dict[str, int]] = []
+    for result_id, full_name, nation, division_id, age_group_id in unresolved:
+        key = blocking_key(full_name, nation)
+        candidates = athletes_by_key.setdefault(key, [])
+        age_floor = age_floors.get(age_group_id)
+        free = [candidate for candidate in candidates if division_id not in divisions_by_athlete.get(candidate, ())]
+        # min() keeps the lowest variant among equally fitting ones
+        athlete_id = min(free, key=lambda candidate: age_fit(candidate, age_floor)) if free else None
+        if athlete_id is None:
+            athlete_id = next_athlete_id
+            next_athlete_id += 1
+            new_athletes.append({
+                'id': athlete_id,
+                'name_key': key[0],
+                'nation_abbreviation': key[1],
+                'variant': len(candidates),
+                'display_name': full_name,
+            })
+            candidates.append(athlete_id)
+        divisions_by_athlete.setdefault(athlete_id, set()).add(division_id)
+        if age_floor is not None:
+            last_age_floors[athlete_id] = age_floor
+        assignments.append({'result_id': result_id, 'athlete_id': athlete_id})
+
+    # 5. Write back in batches
+    for start in range(0, len(new_athletes), BATCH_SIZE):
+        session.execute(insert(Athlete), new_athletes[start:start + BATCH_SIZE])
+    assign_statement = (
+        update(Result.__table__)
+        .where(Result.__table__.c.id == bindparam('result_id'))
+        .values(athlete_id=bindparam('athlete_id'))
+    )
+    for start in range(0, len(assignments), BATCH_SIZE):
+        session.connection().execute(assign_statement, assignments[start:start + BATCH_SIZE])
+    session.commit()
+
+    return {'resolved_results': len(assignments), 'new_athletes': len(new_athletes)}
+
+
+# --- 3. Per-Athlete Queries ---
+
+def get_athlete_history(session: Session, athlete_id: int) -> List[Dict[str, Any]]:
+    """Returns all results of one athlete, oldest season first (served by the results.athlete_id index)."""
+    rows = session.execute(
+        select(Result.id.label('result_id'), Result.full_name, Result.nation_abbreviation, Result.age_group,
+               Result.rank_overall, Result.rank_age_group, Result.total_time_ms,
+               Division.division, Division.gender,
+               Race.name.label('race_name'), Season.number.label('season_number'))
+        .join(Division, Result.division_id == Division.id)
+        .join(Race, Division.race_id == Race.id)
+        .join(Season, Race.season_id == Season.id)
+        .where(Result.athlete_id == athlete_id)
+        .order_by(Season.number.asc(), Race.name.asc())
+    )
+    return [dict(row._mapping) for row in rows]
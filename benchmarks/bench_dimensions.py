@@ -0,0 +1,211 @@
+"""
+Compact results table: size and scan time before and after the storage migrations.
+
+Builds a scratch SQLite database with one synthetic season in the old layout (age group and
+nation strings and the full detail page URL on every result), migrates a copy of it with
+db.prepare_schema (see migrations.py: interned ids, idp tokens) and measures the same queries
+on both.
+
+    $ python -m benchmarks.bench_dimensions
+    $ python -m benchmarks.bench_dimensions --results 500000
+"""
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+import click
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from db import Base, prepare_schema
+from dimensions import dimension_cache
+from models import Season, Race, Division, AgeGroup
+from models.division import DivisionName, Gender
+from rows import result_columns, BATCH_SIZE
+
+RESULTS_PER_DIVISION = 500
+AGE_GROUPS = ['16-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60-64', '65-69', '70+']
+NATIONS = ['GER', 'GBR', 'NED', 'ITA', 'FRA', 'ESP', 'USA', 'AUS', 'AUT', 'SUI', 'POL', 'IRL', 'BEL', 'SWE', 'DEN',
+           'NOR', 'CAN', 'MEX', 'BRA', 'RSA', 'NZL', 'JPN', 'KOR', 'HKG', 'SGP', 'UAE', 'POR', 'CZE', 'HUN', 'FIN']
+
+# The results table as created before age_groups / nations and Result.idp existed
+LEGACY_RESULTS_TABLE = """
+CREATE TABLE results (
+    id INTEGER NOT NULL PRIMARY KEY,
+    age_group VARCHAR,
+    rank_overall INTEGER NOT NULL,
+    rank_age_group INTEGER NOT NULL,
+    full_name VARCHAR,
+    nation_abbreviation VARCHAR,
+    total_time_ms INTEGER NOT NULL,
+    link_to_detail_page VARCHAR,
+    result_key VARCHAR,
+    vanished_at DATETIME,
+    division_id INTEGER NOT NULL REFERENCES divisions (id) ON DELETE CASCADE,
+    athlete_id INTEGER REFERENCES athletes (id) ON DELETE SET NULL
+)
+"""
+
+# A detail page link as found on the result list pages
+DETAIL_LINK = ('https://results.hyrox.com/season-8/?content=detail&fpid=list&pid=list&idp={idp}&lang=EN_CAP'
+               '&event={event}&lang=EN_CAP&num_results=100&search%5Bsex%5D=M&search%5Bage_class%5D=%25'
+               '&search%5Bnation%5D=%25')
+
+SCAN = 'scan labels (rows.py)'
+FILTERED_AGE_GROUP = '30-34'
+
+# name -> (query on the old layout, query on the interned layout); both return the same rows
+QUERIES = {
+    # The interned id is looked up once, as the ingest cache (dimensions.DimensionCache) does
+    'filter one age group': (
+        "SELECT count(*), avg(total_time_ms) FROM results WHERE age_group = :age_group",
+        "SELECT count(*), avg(total_time_ms) FROM results WHERE age_group_id = :age_group_id",
+    ),
+    'group by age group + nation': (
+        "SELECT age_group, nation_abbreviation, count(*), min(total_time_ms) FROM results "
+        "GROUP BY age_group, nation_abbreviation ORDER BY 1, 2",
+        "SELECT ag.name, n.abbreviation, g.results, g.best FROM ("
+        "  SELECT age_group_id, nation_id, count(*) AS results, min(total_time_ms) AS best FROM results"
+        "  GROUP BY age_group_id, nation_id) g "
+        "LEFT JOIN age_groups ag ON ag.id = g.age_group_id LEFT JOIN nations n ON n.id = g.nation_id "
+        "ORDER BY 1, 2",
+    ),
+}
+
+
+def build_legacy_season(session: Session, num_results: int):
+    connection = session.connection()
+    connection.execute(text(LEGACY_RESULTS_TABLE))
+    skipped = {'results', 'age_groups', 'nations'}
+    Base.metadata.create_all(connection, tables=[t for t in Base.metadata.sorted_tables if t.name not in skipped])
+    session.execute(insert(Season), [{'id': 1, 'name': 'Season 8', 'number': 8, 'results_url': 'season-8'}])
+    num_divisions = max(1, num_results // RESULTS_PER_DIVISION)
+    num_races = max(1, num_divisions // 20)
+    session.execute(insert(Race), [{'id': r + 1, 'name': f'2025 City{r:03d}', 'season_id': 1} for r in range(num_races)])
+    division_names, genders = list(DivisionName), [Gender.MEN, Gender.WOMEN]
+    session.execute(insert(Division), [
+        {'id': d + 1, 'race_id': d % num_races + 1, 'division': division_names[d % len(division_names)],
+         'gender': genders[d % 2], 'event_id': f'E{d}'}
+        for d in range(num_divisions)])
+    rng = random.Random(8)
+    connection.execute(text(
+        "INSERT INTO results (division_id, age_group, rank_overall, rank_age_group, full_name, nation_abbreviation, "
+        "total_time_ms, link_to_detail_page, result_key) VALUES (:division_id, :age_group, :rank, :rank, :full_name, "
+        ":nation, :total_time_ms, :link, :key)"), [
+        {'division_id': i % num_divisions + 1, 'age_group': rng.choice(AGE_GROUPS), 'rank': i // num_divisions + 1,
+         'full_name': f'Athlete{i}, Test', 'nation': NATIONS[min(int(rng.expovariate(0.3)), len(NATIONS) - 1)],
+         'total_time_ms': 3_000_000 + (i * 7919) % 2_000_000,
+         'link': DETAIL_LINK.format(idp=f'JGDMS4JI{i:07d}', event=f'E{i % num_divisions}'),
+         'key': f'JGDMS4JI{i:07d}'}
+        for i in range(num_results)])
+    session.commit()
+
+
+def table_bytes(session: Session, table: str) -> int:
+    """Bytes of all pages of a table (dbstat), independent of other tables and free pages."""
+    return session.execute(text("SELECT sum(pgsize) FROM dbstat WHERE name = :table"), {'table': table}).scalar()
+
+
+def best_times(runs, repeat: int = 5) -> list:
+    """Best wall time of every run over `repeat` interleaved rounds, and the result of its last call."""
+    timings, results = [[] for _ in runs], [None] * len(runs)
+    for _ in range(repeat):
+        for index, run in enumerate(runs):
+            start = time.perf_counter()
+            results[index] = run()
+            timings[index].append(time.perf_counter() - start)
+    return [(min(run_timings), result) for run_timings, result in zip(timings, results)]
+
+
+def scan_legacy_labels(session: Session) -> tuple:
+    """The old layout read like rows.result_columns(['age_group', 'nation_abbreviation', 'total_time_ms'])."""
+    columns = ([], [], array('q'))
+    result = session.connection().execute(
+        text("SELECT age_group, nation_abbreviation, total_time_ms FROM results ORDER BY id")
+        .execution_options(stream_results=True))
+    for partition in result.partitions(BATCH_SIZE):
+        for target, values in zip(columns, zip(*partition)):
+            target.extend(values)
+    return columns
+
+
+def scan_interned_labels(session: Session) -> tuple:
+    return tuple(result_columns(session, ['age_group', 'nation_abbreviation', 'total_time_ms']).values())
+
+
+def peak_memory(run) -> int:
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def measure(sessions: tuple) -> dict:
+    """(time, rows) of every query on both layouts (sessions of the old and of the migrated copy)."""
+    params = {'age_group': FILTERED_AGE_GROUP,
+              'age_group_id': dimension_cache(sessions[1]).id_of(AgeGroup, FILTERED_AGE_GROUP)}
+    timings = {}
+    for name, queries in QUERIES.items():
+        timings[name] = best_times([lambda session=session, query=query: session.execute(text(query), params).all()
+                                    for session, query in zip(sessions, queries)])
+    timings[SCAN] = best_times([lambda session=session, scan=scan: scan(session)
+                                for session, scan in zip(sessions, (scan_legacy_labels, scan_interned_labels))])
+    return timings
+
+
+@click.command()
+@click.option('--results', 'num_results', type=int, default=200_000, show_default=True,
+              help='Results in the synthetic season.')
+def main(num_results):
+    """Compares the old results table layout against the compact one."""
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        legacy_path, interned_path = Path(scratch_dir) / 'strings.db', Path(scratch_dir) / 'interned.db'
+        legacy_engine = create_engine(f"sqlite:///{legacy_path}")
+        with Session(legacy_engine) as session:
+            build_legacy_season(session, num_results)
+            session.execute(text("VACUUM"))
+        shutil.copyfile(legacy_path, interned_path)
+
+        interned_engine = create_engine(f"sqlite:///{interned_path}")
+        start = time.perf_counter()
+        with interned_engine.begin() as connection:
+            prepare_schema(connection)
+        migration_s = time.perf_counter() - start
+
+        with Session(legacy_engine) as legacy_session, Session(interned_engine) as interned_session:
+            interned_session.execute(text("VACUUM"))
+            sizes = (table_bytes(legacy_session, 'results'), table_bytes(interned_session, 'results'))
+            timings = measure((legacy_session, interned_session))
+            peaks = (peak_memory(lambda: scan_legacy_labels(legacy_session)),
+                     peak_memory(lambda: scan_interned_labels(interned_session)))
+        legacy_engine.dispose()
+        interned_engine.dispose()
+
+    for name, ((_, legacy_rows), (_, interned_rows)) in timings.items():
+        assert legacy_rows == interned_rows, f"{name} returned different rows"
+
+    legacy_bytes, interned_bytes = sizes
+    click.echo(f"\n📦 results table with {num_results:,} results (migrated in {migration_s:.2f}s)")
+    click.echo(f"{'layout':<28} {'size':>10} {'bytes/row':>10}")
+    click.echo("-" * 50)
+    for name, size in (('old layout', legacy_bytes), ('compact', interned_bytes)):
+        click.echo(f"{name:<28} {size / 2 ** 20:>6.1f} MiB {size / num_results:>10.1f}")
+    click.echo(f"{'saved':<28} {(legacy_bytes - interned_bytes) / 2 ** 20:>6.1f} MiB "
+               f"{1 - interned_bytes / legacy_bytes:>9.0%}")
+
+    click.echo(f"\n⏱️ Queries (best of 5)")
+    click.echo(f"{'query':<30} {'old':>9} {'compact':>9} {'speedup':>8}")
+    click.echo("-" * 60)
+    for name, ((legacy_s, _), (interned_s, _)) in timings.items():
+        click.echo(f"{name:<30} {legacy_s:>8.3f}s {interned_s:>8.3f}s {legacy_s / interned_s:>7.2f}x")
+    click.echo(f"{'scan peak memory':<30} {peaks[0] / 2 ** 20:>5.1f}MiB {peaks[1] / 2 ** 20:>5.1f}MiB "
+               f"{peaks[0] / peaks[1]:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import timeit
+
+from models.division import DivisionName
+from web_scraping.divisions import filter_events
+
+# Weekday variants published next to the "Overall" event of multi-day divisions
+DAYS = ["Overall", "Friday", "Saturday", "Sunday"]
+
+
+def make_pathological_events(copies: int) -> list:
+    """
+    Builds the event list of a race with hundreds of events:
+    every division on every day, repeated `copies` times (duplicate ids),
+    plus as many unmatched side events ("HYROX TEAM-CHALLENGE ...").
+    """
+    events = []
+    for division in DivisionName:
+        for day in DAYS:
+            event_id = f"{division.name}_{day.upper()}"
+            events.append({'v': [event_id, f"{division.value} - {day}"]})
+    for i in range(len(events)):
+        events.append({'v': [f"TC_{i}", f"HYROX TEAM-CHALLENGE {i}"]})
+    return events * copies
+
+
+def bench_filter_events(copies: int, repeat: int = 5, number: int = 20) -> float:
+    # filter_events does not modify the list it is given, so the same input can be reused
+    events = make_pathological_events(copies)
+    with contextlib.redirect_stdout(io.StringIO()):  # silence "unmatched event" warnings
+        best = min(timeit.repeat(lambda: filter_events(events), repeat=repeat, number=number))
+    return best / number
+
+
+def bench_from_string(repeat: int = 5, number: int = 10_000) -> float:
+    names = [f"{division.value} - {day}" for division in DivisionName for day in DAYS]
+    best = min(timeit.repeat(lambda: [DivisionName.from_string(name) for name in names], repeat=repeat, number=number))
+    return best / (number * len(names))
+
+
+if __name__ == '__main__':
+    print("⏱️ filter_events on pathological races")
+    print(f"{'events':>8} {'time per race':>16}")
+    for copies in [1, 5, 10, 50, 100]:
+        num_events = len(make_pathological_events(copies))
+        seconds = bench_filter_events(copies)
+        print(f"{num_events:>8} {seconds * 1e6:>13.1f} µs")
+
+    print(f"\n⏱️ DivisionName.from_string: {bench_from_string() * 1e9:.0f} ns per call")
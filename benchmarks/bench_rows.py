@@ -0,0 +1,131 @@
+"""
+Full-season scan: ORM entities vs. rows.py tuples and column arrays.
+
+Builds a scratch SQLite database with one synthetic season, then reads every result of
+the season with each read API and computes the mean finish time per division.
+
+    $ python -m benchmarks.bench_rows
+    $ python -m benchmarks.bench_rows --results 500000
+"""
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import click
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from db import Base
+from models import Season, Race, Division, Result, AgeGroup, Nation
+from models.division import DivisionName, Gender
+from rows import iter_result_rows, result_columns
+
+RESULTS_PER_DIVISION = 500
+
+
+def build_season(session, num_results: int):
+    session.execute(insert(Season), [{'id': 1, 'name': 'Season 8', 'number': 8, 'results_url': 'season-8'}])
+    num_divisions = max(1, num_results // RESULTS_PER_DIVISION)
+    num_races = max(1, num_divisions // 20)
+    session.execute(insert(Race), [{'id': r + 1, 'name': f'2025 City{r:03d}', 'season_id': 1} for r in range(num_races)])
+    division_names, genders = list(DivisionName), [Gender.MEN, Gender.WOMEN]
+    session.execute(insert(Division), [
+        {'id': d + 1, 'race_id': d % num_races + 1, 'division': division_names[d % len(division_names)],
+         'gender': genders[d % 2], 'event_id': f'E{d}'}
+        for d in range(num_divisions)])
+    session.execute(insert(AgeGroup), [{'id': 1, 'name': '30-34'}])
+    session.execute(insert(Nation), [{'id': 1, 'abbreviation': 'GER'}])
+    session.execute(insert(Result), [
+        {'division_id': i % num_divisions + 1, 'age_group_id': 1, 'rank_overall': i // num_divisions + 1,
+         'rank_age_group': i // num_divisions + 1, 'full_name': f'Athlete{i}, Test', 'nation_id': 1,
+         'total_time_ms': 3_000_000 + (i * 7919) % 2_000_000, 'idp': f'{i}'}
+        for i in range(num_results)])
+    session.commit()
+
+
+def mean_times(pairs) -> dict:
+    totals, counts = defaultdict(int), defaultdict(int)
+    for division_id, total_time_ms in pairs:
+        totals[division_id] += total_time_ms
+        counts[division_id] += 1
+    return {division_id: totals[division_id] / counts[division_id] for division_id in totals}
+
+
+def scan_orm(session):
+    results = (session.query(Result).join(Division).join(Race).join(Season)
+               .filter(Season.number == 8).order_by(Result.id).all())
+    return mean_times((r.division_id, r.total_time_ms) for r in results)
+
+
+def scan_orm_yield_per(session):
+    results = (session.query(Result).join(Division).join(Race).join(Season)
+               .filter(Season.number == 8).order_by(Result.id).yield_per(10_000))
+    return mean_times((r.division_id, r.total_time_ms) for r in results)
+
+
+def scan_rows(session):
+    return mean_times((r.division_id, r.total_time_ms) for r in iter_result_rows(session, season_number=8))
+
+
+def scan_columns(session):
+    columns = result_columns(session, ['division_id', 'total_time_ms'], season_number=8)
+    return mean_times(zip(columns['division_id'], columns['total_time_ms']))
+
+
+SCANS = {
+    'ORM entities (.all())': scan_orm,
+    'ORM entities (yield_per)': scan_orm_yield_per,
+    'rows.iter_result_rows': scan_rows,
+    'rows.result_columns': scan_columns,
+}
+
+
+def measure(make_session, scan) -> tuple:
+    """Best wall time of 3 runs, then peak traced memory of one more run (each in a fresh session)."""
+    timings = []
+    for _ in range(3):
+        session = make_session()
+        start = time.perf_counter()
+        scan(session)
+        timings.append(time.perf_counter() - start)
+        session.close()
+
+    session = make_session()
+    tracemalloc.start()
+    scan(session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    session.close()
+    return min(timings), peak
+
+
+@click.command()
+@click.option('--results', 'num_results', type=int, default=200_000, show_default=True,
+              help='Results in the synthetic season.')
+def main(num_results):
+    """Compares ORM loading with the lightweight row API on a full-season scan."""
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        engine = create_engine(f"sqlite:///{Path(scratch_dir) / 'rows.db'}")
+        Base.metadata.create_all(engine)
+        make_session = sessionmaker(bind=engine)
+        session = make_session()
+        build_season(session, num_results)
+        session.close()
+
+        expected = scan_rows(make_session())
+        click.echo(f"\n⏱️ Full-season scan of {num_results:,} results")
+        click.echo(f"{'read API':<28} {'time':>10} {'peak mem':>12} {'vs. ORM':>9}")
+        click.echo("-" * 62)
+        orm_s = None
+        for name, scan in SCANS.items():
+            assert scan(make_session()) == expected, f"{name} computed different means"
+            best_s, peak = measure(make_session, scan)
+            orm_s = orm_s or best_s
+            click.echo(f"{name:<28} {best_s:>9.3f}s {peak / 2 ** 20:>9.1f} MiB {orm_s / best_s:>8.1f}x")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
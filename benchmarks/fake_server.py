@@ -0,0 +1,146 @@
+"""
+Local fake of the results.hyrox.com endpoints used by the scrapers, with synthetic data.
+
+    GET  /season-<n>/                                 season dropdown (scrape_hyrox_seasons)
+    GET  /season-<n>/index.php?content=ajax2&...      getSearchFields JSON (races, events, sexes)
+    POST /season-<n>/?pid=list&pidp=ranking_nav       result list page (one page per request)
+
+The size of the data (seasons, races, divisions, pages, rows) and the latency of every
+response are configurable, so the whole crawl can be benchmarked without the network.
+"""
+import hashlib
+import json
+import multiprocessing
+import re
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any
+from urllib.parse import urlparse, parse_qs
+
+from models.division import DivisionName
+
+DEFAULT_CONFIG = {
+    'seasons': 2,
+    'races': 3,  # per season
+    'divisions': 4,  # per race (first n DivisionName values), each with a men's and a women's list
+    'pages': 3,  # per division and sex
+    'rows': 100,  # per page
+    'latency_ms': 20.0,  # added to every response
+}
+
+
+def race_name(season_number: int, race_index: int) -> str:
+    return f"{2016 + season_number} City{race_index:03d}"
+
+
+def event_id(season_number: int, race_index: int, division: DivisionName) -> str:
+    return f"{division.name}_S{season_number}R{race_index:03d}_OVERALL"
+
+
+def seasons_page(config: Dict[str, Any]) -> str:
+    links = "".join(f'<li><a href="/season-{n}/">Season {n}</a></li>' for n in range(1, config['seasons'] + 1))
+    return f'<html><body><ul class="dropdown-menu">{links}</ul></body></html>'
+
+
+def search_fields(config: Dict[str, Any], season_number: int, query: Dict[str, str]) -> Dict[str, Any]:
+    races = [{'v': [race_name(season_number, r), race_name(season_number, r)]} for r in range(config['races'])]
+    fields = {'event_main_group': {'data': races}}
+    selected_race = query.get('options[b][lists][event_main_group]', '')
+    race_match = re.search(r'City(\d+)', selected_race)
+    if race_match:
+        race_index = int(race_match.group(1))
+        divisions = list(DivisionName)[:config['divisions']]
+        fields['event'] = {'data': [{'v': [event_id(season_number, race_index, d), f"{d.value} - Overall"]}
+                                    for d in divisions]}
+        fields['sex'] = {'data': [{'v': ['M', 'Men']}, {'v': ['W', 'Women']}]}
+    return {'branches': {'lists': {'fields': fields}}}
+
+
+def result_row(event: str, sex: str, rank: int) -> str:
+    idp = hashlib.sha1(f"{event}|{sex}|{rank}".encode()).hexdigest()[:12].upper()
+    seconds = 3000 + rank * 7
+    total_time = f"{seconds // 3600:02}:{(seconds % 3600) // 60:02}:{seconds % 60:02}"
+    return (
+        f'<li class="list-group-item row">'
+        f'<div class="list-field type-place place-primary numeric">{rank}</div>'
+        f'<div class="list-field type-place place-secondary hidden-xs numeric">{(rank - 1) // 6 + 1}</div>'
+        f'<h4 class="list-field type-fullname"><a href="?content=detail&amp;fpid=list&amp;pid=list&amp;idp={idp}'
+        f'&amp;lang=EN_CAP&amp;event={event}">Athlete{rank:05d}, Runner {sex}</a></h4>'
+        f'<span class="nation__abbr">{["GER", "GBR", "NED", "ITA"][rank % 4]}</span>'
+        f'<div class="list-field type-age_class"><div class="list-label">Age Group</div>{25 + 5 * (rank % 6)}-{29 + 5 * (rank % 6)}</div>'
+        f'<div class="right list-field type-time"><div class="list-label">Total</div>{total_time}</div>'
+        f'</li>'
+    )
+
+
+def results_page(config: Dict[str, Any], form: Dict[str, str]) -> str:
+    page = int(form.get('page', 1))
+    rows = ""
+    if page <= config['pages']:
+        first_rank = (page - 1) * config['rows'] + 1
+        rows = "".join(result_row(form.get('event', ''), form.get('search[sex]', ''), rank)
+                       for rank in range(first_rank, first_rank + config['rows']))
+    return (f'<html><body><div class="col-sm-12 row-xs"><ul class="list-group list-group-multicolumn">'
+            f'{rows}</ul></div></body></html>')
+
+
+def make_handler(config: Dict[str, Any]):
+    class FakeResultsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling matters
+
+        def log_message(self, format, *args):
+            pass
+
+        def respond(self, body: str, content_type: str):
+            time.sleep(config['latency_ms'] / 1000)
+            payload = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def season_number(self) -> int | None:
+            match = re.match(r'/season-(\d+)/', urlparse(self.path).path)
+            return int(match.group(1)) if match else None
+
+        def do_GET(self):
+            season_number = self.season_number()
+            url = urlparse(self.path)
+            if season_number is None:
+                self.send_error(404)
+            elif url.path.endswith('index.php'):
+                query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+                self.respond(json.dumps(search_fields(config, season_number, query)), "application/json")
+            else:
+                self.respond(seasons_page(config), "text/html")
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode(), keep_blank_values=True).items()}
+            if self.season_number() is None:
+                self.send_error(404)
+                return
+            self.respond(results_page(config, form), "text/html")
+
+    return FakeResultsHandler
+
+
+def serve(config: Dict[str, Any], port_queue: multiprocessing.Queue):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(config))
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_fake_server(config: Dict[str, Any]) -> tuple:
+    """
+    Starts the fake server in a separate process (so it does not share the crawler's CPU time).
+
+    :return: (base_url, process) - terminate the process when done.
+    """
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(config, port_queue), daemon=True)
+    process.start()
+    port = port_queue.get(timeout=10)
+    return f"http://127.0.0.1:{port}", process
@@ -0,0 +1,158 @@
+"""
+End-to-end crawl benchmark: runs the scrape_cli.py pipeline (seasons -> races -> divisions -> results)
+against the local fake server in benchmarks/fake_server.py and a scratch SQLite database.
+
+    $ python -m benchmarks.macro
+    $ python -m benchmarks.macro --seasons 3 --races 10 --pages 5 --latency-ms 50 --report macro_report.json
+"""
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import click
+from click.testing import CliRunner
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+
+import db
+import scrape_cli
+from benchmarks.fake_server import DEFAULT_CONFIG, start_fake_server
+from models import Season, Race, Result
+from web_scraping import client
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class CrawlRecorder:
+    """Collects request latencies/bytes (via a response hook) and write-statement time (via engine events)."""
+
+    def __init__(self):
+        self.latencies_s = []
+        self.bytes_downloaded = 0
+        self.db_write_s = 0.0
+        self._statement_start = {}
+
+    def on_response(self, response, *args, **kwargs):
+        self.latencies_s.append(response.elapsed.total_seconds())
+        self.bytes_downloaded += len(response.content)
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._statement_start[id(cursor)] = time.perf_counter()
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = self._statement_start.pop(id(cursor), None)
+        if start is not None and not statement.lstrip().upper().startswith(("SELECT", "PRAGMA")):
+            self.db_write_s += time.perf_counter() - start
+
+    def install(self):
+        client.RESPONSE_HOOKS.append(self.on_response)
+        event.listen(Engine, "before_cursor_execute", self.before_execute)
+        event.listen(Engine, "after_cursor_execute", self.after_execute)
+
+    def uninstall(self):
+        client.RESPONSE_HOOKS.remove(self.on_response)
+        event.remove(Engine, "before_cursor_execute", self.before_execute)
+        event.remove(Engine, "after_cursor_execute", self.after_execute)
+
+
+def run_pipeline(runner: CliRunner):
+    """Runs the scrape_cli.py commands in pipeline order, the way a full refresh would."""
+
+    def invoke(*args):
+        outcome = runner.invoke(scrape_cli.cli, list(args), catch_exceptions=False)
+        if outcome.exit_code != 0:
+            raise click.ClickException(f"'{' '.join(args)}' failed:\n{outcome.output}")
+
+    invoke('scrape-seasons')
+    session = db.init_db()
+    season_numbers = [number for (number,) in session.query(Season.number).order_by(Season.number)]
+    session.close()
+    for season_number in season_numbers:
+        invoke('scrape-races', '--season', str(season_number))
+
+    session = db.init_db()
+    race_names = [name for (name,) in session.query(Race.name).order_by(Race.id)]
+    session.close()
+    for race_name in race_names:
+        invoke('scrape-divisions', '--race_name', race_name)
+    for race_name in race_names:
+        invoke('scrape-results', '--race_name', race_name)
+
+
+@click.command()
+@click.option('--seasons', type=int, default=DEFAULT_CONFIG['seasons'], show_default=True)
+@click.option('--races', type=int, default=DEFAULT_CONFIG['races'], show_default=True, help='Races per season.')
+@click.option('--divisions', type=int, default=DEFAULT_CONFIG['divisions'], show_default=True,
+              help='Divisions per race (each with a men\'s and a women\'s list).')
+@click.option('--pages', type=int, default=DEFAULT_CONFIG['pages'], show_default=True,
+              help='Result pages per division list.')
+@click.option('--rows', type=int, default=DEFAULT_CONFIG['rows'], show_default=True, help='Results per page.')
+@click.option('--latency-ms', type=float, default=DEFAULT_CONFIG['latency_ms'], show_default=True,
+              help='Latency the fake server adds to every response.')
+@click.option('--report', 'report_path', type=click.Path(dir_okay=False, path_type=Path),
+              default=Path('macro_report.json'), show_default=True, help='Where to write the JSON report.')
+def main(seasons, races, divisions, pages, rows, latency_ms, report_path):
+    """Benchmarks the full crawl pipeline against a local fake results site."""
+    config = {'seasons': seasons, 'races': races, 'divisions': divisions,
+              'pages': pages, 'rows': rows, 'latency_ms': latency_ms}
+    base_url, server = start_fake_server(config)
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        # Point the scrapers at the fake site and a scratch database, without politeness pauses
+        client.RESULTS_BASE_URL = base_url
+        client.POLITENESS_DELAY_S = 0
+        db.DB_URI = f"sqlite:///{Path(scratch_dir) / 'bench.db'}"
+
+        recorder = CrawlRecorder()
+        recorder.install()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            run_pipeline(CliRunner())
+        finally:
+            wall_s = time.perf_counter() - wall_start
+            cpu_s = time.process_time() - cpu_start
+            recorder.uninstall()
+            server.terminate()
+
+        session = db.init_db()
+        num_results = session.query(func.count(Result.id)).scalar()
+        session.close()
+
+    num_requests = len(recorder.latencies_s)
+    report = {
+        'config': config,
+        'wall_s': wall_s,
+        'cpu_s': cpu_s,
+        'cpu_utilisation': cpu_s / wall_s if wall_s else 0.0,
+        'requests': num_requests,
+        'requests_per_s': num_requests / wall_s if wall_s else 0.0,
+        'bytes_downloaded': recorder.bytes_downloaded,
+        'rows': num_results,
+        'rows_per_s': num_results / wall_s if wall_s else 0.0,
+        'latency_p50_ms': percentile(recorder.latencies_s, 0.50) * 1000,
+        'latency_p99_ms': percentile(recorder.latencies_s, 0.99) * 1000,
+        'latency_mean_ms': statistics.fmean(recorder.latencies_s) * 1000 if recorder.latencies_s else 0.0,
+        'db_write_s': recorder.db_write_s,
+    }
+    report_path.write_text(json.dumps(report, indent=2))
+
+    click.echo("\n🏁 Crawl benchmark")
+    click.echo("-" * 40)
+    click.echo(f"Wall time:        {report['wall_s']:.2f} s")
+    click.echo(f"Requests:         {report['requests']} ({report['requests_per_s']:.1f} req/s)")
+    click.echo(f"Rows inserted:    {report['rows']} ({report['rows_per_s']:.0f} rows/s)")
+    click.echo(f"Latency p50/p99:  {report['latency_p50_ms']:.1f} / {report['latency_p99_ms']:.1f} ms")
+    click.echo(f"CPU utilisation:  {report['cpu_utilisation']:.0%}")
+    click.echo(f"DB write time:    {report['db_write_s']:.2f} s")
+    click.echo(f"\n💾 Report written to {report_path}")
+
+
+if __name__ == '__main__':
+    main()
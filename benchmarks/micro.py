@@ -0,0 +1,219 @@
+"""
+Micro-benchmarks for the parsing, classification and ingest hot paths.
+
+Runs fully offline on the fixtures in benchmarks/fixtures (a result list page and a
+getSearchFields response with the same markup/shape as results.hyrox.com).
+
+    $ python -m benchmarks.micro                      # run and print timings
+    $ python -m benchmarks.micro --save-baseline      # store timings as the baseline
+    $ python -m benchmarks.micro --compare            # fail if a case got >20% slower
+    $ python -m benchmarks.micro --compare --threshold 0.1 -k parse
+"""
+import contextlib
+import io
+import json
+import statistics
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+import click
+from bs4 import BeautifulSoup
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import prepare_schema
+from models import Season, Race, Division, Result
+from models.division import DivisionName, Gender, _longest_division_match
+from benchmarks.bench_filter_events import make_pathological_events
+from web_scraping.divisions import filter_events, get_events_from_response
+from web_scraping.result_summaries import parse_results_page, parse_row_soup, ResultMerge
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+RESULTS_URL = "https://results.hyrox.com/season-8/?pid=list&pidp=ranking_nav"
+
+# Registry of benchmark cases: name -> setup function returning the callable to time
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def load_result_page() -> str:
+    return (FIXTURES_DIR / "result_page.html").read_text(encoding="utf-8")
+
+
+def load_race_events() -> list:
+    with open(FIXTURES_DIR / "race_events.json", encoding="utf-8") as f:
+        return get_events_from_response(json.load(f))
+
+
+def silenced(function: Callable) -> Callable:
+    """Wraps a callable so its progress/warning prints do not end up in the benchmark output."""
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+
+    return run
+
+
+# --- Cases ---
+
+@case("parse_results_page")
+def setup_parse_results_page():
+    page_html = load_result_page()
+    return lambda: parse_results_page(page_html, RESULTS_URL)
+
+
+@case("parse_row_soup")
+def setup_parse_row_soup():
+    rows_soup = BeautifulSoup(load_result_page(), "html.parser").find_all("li", {"class": "list-group-item row"})
+    return lambda: [parse_row_soup(row_soup, RESULTS_URL) for row_soup in rows_soup]
+
+
+@case("filter_events")
+def setup_filter_events():
+    events = load_race_events()
+    return silenced(lambda: filter_events(events))
+
+
+@case("filter_events_pathological")
+def setup_filter_events_pathological():
+    events = make_pathological_events(copies=50)
+    return silenced(lambda: filter_events(events))
+
+
+@case("division_from_string")
+def setup_division_from_string():
+    names = [event.get('v')[1] for event in load_race_events()]
+    return lambda: [DivisionName.from_string(name) for name in names]
+
+
+@case("division_from_string_uncached")
+def setup_division_from_string_uncached():
+    names = [event.get('v')[1] for event in load_race_events()]
+
+    def run():
+        _longest_division_match.cache_clear()
+        return [DivisionName.from_string(name) for name in names]
+
+    return run
+
+
+@case("parse_time_ms")
+def setup_parse_time_ms():
+    times = [row['total_time'] for row in parse_results_page(load_result_page(), RESULTS_URL)]
+    return lambda: [Result.parse_time_ms(t) for t in times]
+
+
+@case("parse_times_ms_batch")
+def setup_parse_times_ms_batch():
+    times = [row['total_time'] for row in parse_results_page(load_result_page(), RESULTS_URL)]
+    return lambda: Result.parse_times_ms(times)
+
+
+@case("insert_result_page")
+def setup_insert_result_page():
+    # In-memory database with the same schema, indexes and triggers as hyrox.db
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        prepare_schema(connection)
+    session = sessionmaker(bind=engine)()
+    season = Season(name="Season 8", number=8, results_url="https://results.hyrox.com/season-8/")
+    race = Race(name="2025 Stuttgart", season=season)
+    session.add_all([season, race])
+    session.commit()
+    rows_info = parse_results_page(load_result_page(), RESULTS_URL)
+
+    def run():
+        # A new division every run, so every run inserts the whole page (the first crawl of a division)
+        division = Division(division=DivisionName.HYROX_PRO, gender=Gender.MEN, race=race, event_id="HPRO_LR3MS4JIE9E")
+        session.add(division)
+        session.flush()
+        ResultMerge(session, division.id).merge_page(rows_info)
+        session.commit()
+
+    return run
+
+
+# --- Runner ---
+
+def measure(function: Callable, repeat: int) -> Dict[str, float]:
+    """Times a callable (best/median seconds per call over `repeat` rounds) and records its peak memory."""
+    number, _ = timeit.Timer(function).autorange()
+    timings = [t / number for t in timeit.repeat(function, repeat=repeat, number=number)]
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "peak_kib": peak / 1024,
+        "number": number,
+    }
+
+
+@click.command()
+@click.option('-k', 'keyword', type=str, default=None, help='Only run cases whose name contains this keyword.')
+@click.option('--repeat', type=int, default=5, show_default=True, help='Timing rounds per case.')
+@click.option('--baseline', 'baseline_path', type=click.Path(dir_okay=False, path_type=Path),
+              default=DEFAULT_BASELINE, show_default=True, help='Baseline file to save to / compare against.')
+@click.option('--save-baseline', is_flag=True, default=False, help='Store this run as the new baseline.')
+@click.option('--compare', is_flag=True, default=False, help='Compare against the baseline and fail on regressions.')
+@click.option('--threshold', type=float, default=0.2, show_default=True,
+              help='Allowed slowdown of the best time before a case counts as regressed (0.2 = 20%).')
+def main(keyword, repeat, baseline_path, save_baseline, compare, threshold):
+    """Runs the micro-benchmark suite."""
+    baseline = {}
+    if compare:
+        if not baseline_path.exists():
+            click.echo(f"❌ Error: No baseline found at {baseline_path}. Run with --save-baseline first.")
+            sys.exit(2)
+        baseline = json.loads(baseline_path.read_text())
+
+    results = {}
+    regressions = []
+    click.echo(f"{'case':<32} {'best':>12} {'median':>12} {'peak mem':>12} {'vs. baseline':>14}")
+    click.echo("-" * 86)
+    for name, setup in CASES.items():
+        if keyword and keyword not in name:
+            continue
+        result = measure(setup(), repeat=repeat)
+        results[name] = result
+
+        change = ""
+        if name in baseline:
+            ratio = result["best_s"] / baseline[name]["best_s"] - 1
+            change = f"{ratio:+.1%}"
+            if ratio > threshold:
+                regressions.append(name)
+                change += " ❌"
+        click.echo(f"{name:<32} {result['best_s'] * 1e6:>9.1f} µs {result['median_s'] * 1e6:>9.1f} µs "
+                   f"{result['peak_kib']:>8.1f} KiB {change:>14}")
+
+    if save_baseline:
+        # Keep baseline entries of cases that were not part of this (filtered) run
+        stored = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        stored.update(results)
+        baseline_path.write_text(json.dumps(stored, indent=2))
+        click.echo(f"\n💾 Baseline saved to {baseline_path}")
+
+    if regressions:
+        click.echo(f"\n❌ {len(regressions)} case(s) regressed by more than {threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
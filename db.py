@@ -1,8 +1,17 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path  # Import the modern path library
+from typing import Dict, Iterator, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text, make_url
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session, Session as OrmSession
+from sqlalchemy.pool import StaticPool
+
+from search import ensure_search_index
 
 # --- Configuration ---
 # 1. Get the directory where this 'db.py' file is located
@@ -14,24 +23,246 @@ DB_FILE = DB_DIR / "hyrox.db"
 # 3. Construct the absolute URI for SQLAlchemy
 # Note: three slashes are required for absolute paths in SQLite URI:
 # sqlite:///absolute/path/to/file.db
-DB_URI = f"sqlite:///{DB_FILE}"
+# HYROX_DB_URI overrides it, e.g. to run against a scratch database.
+DB_URI = os.environ.get("HYROX_DB_URI", f"sqlite:///{DB_FILE}")
+# In-memory database of the process (see memory_database)
+MEMORY_DB_URI = "sqlite://"
+
+# 4. Connection pool: one writer plus concurrent readers (WAL lets them run side by side)
+POOL_SIZE = 8
+# How long a connection waits for another connection's write lock before 'database is locked' (ms)
+BUSY_TIMEOUT_MS = 5_000
 # ---------------------
 
 Base = declarative_base()
 
+# --- Engine & Sessions ---
+# One engine (and connection pool) per database URI, shared by all threads of the process
+
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_uri: Optional[str] = None) -> Engine:
+    """The shared engine of a database (DB_URI by default); the schema is prepared on first use."""
+    db_uri = db_uri or DB_URI
+    with _engines_lock:
+        engine = _engines.get(db_uri)
+        if engine is None:
+            engine = _create_engine(db_uri)
+            with engine.begin() as connection:
+                prepare_schema(connection)
+            _engines[db_uri] = engine
+        return engine
+
+
+def _create_engine(db_uri: str) -> Engine:
+    if db_uri in (MEMORY_DB_URI, "sqlite:///:memory:"):
+        # An in-memory database lives in its connection: every session and thread shares that one connection
+        return create_engine(db_uri, poolclass=StaticPool, connect_args={'check_same_thread': False})
+    engine = create_engine(db_uri, pool_size=POOL_SIZE, max_overflow=POOL_SIZE)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _configure_sqlite_connection)
+    return engine
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # Write-ahead log: readers no longer block the writer (and the writer no readers)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Wait for a competing writer instead of failing immediately with 'database is locked'
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    # Durable at checkpoints instead of every commit; safe against corruption in WAL mode
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def get_session_factory(db_uri: Optional[str] = None) -> sessionmaker:
+    db_uri = db_uri or DB_URI
+    factory = _session_factories.get(db_uri)
+    if factory is None:
+        # Objects stay usable after commit: the scrapers commit per page and would otherwise
+        # reload every race/division they touch again (one query each) after every commit
+        factory = _session_factories[db_uri] = sessionmaker(bind=get_engine(db_uri), expire_on_commit=False)
+    return factory
+
+
+# Thread-local session registry: Session() returns the calling thread's own session
+# (call Session.remove() when the thread is done with it)
+Session = scoped_session(lambda: get_session_factory()())
+
+
+@contextmanager
+def session_scope(db_uri: Optional[str] = None) -> Iterator[OrmSession]:
+    """
+    A new session owned by the with-block: committed when the block succeeds, rolled back
+    when it raises, and closed either way. Functions that are handed a session never close it.
+
+    Example:
+        with session_scope() as session:
+            update_seasons_in_db(session, scrape_hyrox_seasons())
+    """
+    session = get_session_factory(db_uri)()
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def init_db() -> OrmSession:
+    """
+    Returns a new session of the database at DB_URI (creating or upgrading its schema on first use).
+
+    The caller owns the session and closes it; prefer session_scope() where a with-block fits.
+    """
+    return get_session_factory()()
 
-def init_db():
-    """Initializes the database using the absolute path relative to this file."""
-    # Use the pre-calculated absolute DB_URI
-    engine = create_engine(DB_URI)
 
+def prepare_schema(connection: Connection):
+    """Creates missing tables, columns, indexes and the search index (also used by async_db.py)."""
     # Ensure all models are imported before calling create_all
     # (Assuming all models are imported elsewhere and registered with Base)
     # If not, you might need a local import, e.g., from . import models
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(connection)
+    # create_all only creates missing tables: add columns/indexes introduced since
+    upgrade_schema(connection)
+    if 'results' in Base.metadata.tables:
+        # Data of older databases moves into the new columns (see migrations.py)
+        from migrations import run_migrations
+        run_migrations(connection)
+        # Full-text athlete search index (FTS5, kept in sync by triggers)
+        ensure_search_index(connection)
+
+
+def upgrade_schema(connection: Connection):
+    """
+    Adds columns and indexes that were added to a model after its table was created.
+
+    SQLite can only add nullable (or defaulted) columns this way, so new columns on
+    existing tables must be nullable.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+# --- In-Memory Database ---
+
+@contextmanager
+def memory_database(db_file: Optional[Path] = None, write_back: bool = True) -> Iterator[Engine]:
+    """
+    Runs the with-block against an in-memory copy of a database file (the file of DB_URI by
+    default): DB_URI points at
+    MEMORY_DB_URI, so init_db(), session_scope() and Session() all use the copy.
+
+    The copy is loaded with SQLite's online backup API (an empty database if the file does not
+    exist yet). With `write_back` it replaces the file atomically at the end (see save_memory_database),
+    also when the block raises: like the per-page commits of a disk ingest, what was committed stays.
+
+    Example:
+        with memory_database():
+            with session_scope() as session:
+                scrape_race_results(session, race)
+    """
+    global DB_URI
+    db_file = db_file or database_file()
+    engine = load_memory_database(db_file)
+    previous_uri, DB_URI = DB_URI, MEMORY_DB_URI
+    try:
+        yield engine
+    finally:
+        DB_URI = previous_uri
+        Session.remove()
+        if write_back:
+            save_memory_database(db_file)
+        _discard_engine(MEMORY_DB_URI)
+
+
+def database_file() -> Path:
+    """The file of the SQLite database at DB_URI."""
+    return Path(make_url(DB_URI).database)
+
+
+def load_memory_database(db_file: Path) -> Engine:
+    """Copies a database file into the in-memory database (upgrading its schema) and returns its engine."""
+    _discard_engine(MEMORY_DB_URI)
+    engine = _create_engine(MEMORY_DB_URI)
+    if Path(db_file).exists():
+        # Read-only: loading never creates or changes the file
+        source = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+        try:
+            with _driver_connection(engine) as memory:
+                source.backup(memory)
+        finally:
+            source.close()
+    with engine.begin() as connection:
+        prepare_schema(connection)
+    with _engines_lock:
+        _engines[MEMORY_DB_URI] = engine
+    return engine
+
+
+def save_memory_database(db_file: Path) -> int:
+    """
+    Writes the in-memory database to a file atomically and returns its size in bytes.
+
+    The backup goes to a temporary file next to `db_file`, which then replaces it (os.replace),
+    so readers see either the old or the new database, never a partly written one. No other
+    process may have the file open while it is replaced.
+    """
+    db_file = Path(db_file)
+    temporary_file = db_file.with_name(db_file.name + ".tmp")
+    temporary_file.unlink(missing_ok=True)
+    target = sqlite3.connect(temporary_file)
+    try:
+        with _driver_connection(get_engine(MEMORY_DB_URI)) as memory:
+            memory.backup(target)
+    finally:
+        target.close()
+    if db_file.exists():
+        # Close this process's connections to the old file and fold its write-ahead log into it;
+        # the last connection to close deletes the -wal/-shm files, which must not outlive the file
+        _discard_engine(f"sqlite:///{db_file}")
+        old = sqlite3.connect(db_file)
+        try:
+            old.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            old.close()
+    os.replace(temporary_file, db_file)
+    return db_file.stat().st_size
+
+
+@contextmanager
+def _driver_connection(engine: Engine) -> Iterator[sqlite3.Connection]:
+    """The sqlite3 connection behind an engine connection (what Connection.backup() needs)."""
+    connection = engine.raw_connection()
+    try:
+        yield connection.driver_connection
+    finally:
+        connection.close()
+
+
+def _discard_engine(db_uri: str):
+    with _engines_lock:
+        engine = _engines.pop(db_uri, None)
+        _session_factories.pop(db_uri, None)
+    if engine is not None:
+        engine.dispose()
 
-    Session = sessionmaker(bind=engine)
-    return Session()
 
 # --- OLD CODE REFERENCE (No longer needed) ---
 # The function signature no longer needs the db_uri argument.
@@ -1,11 +1,22 @@
+import sys
+import time
+from datetime import datetime, timedelta
 from typing import Optional
 
 import click
-from sqlalchemy import func
 
-from db import init_db
-from models import Season, Race, Division
-from models.associations import race_divisions
+import profiling
+import query_log
+from db import init_db, get_engine, memory_database
+from models import Season, Result
+from models.division import DivisionName, Gender
+from export import iter_results, write_csv, write_ndjson
+from athletes import resolve_athletes, get_athlete_history
+from search import search_athletes, rebuild_search_index
+from maintenance import maintain, database_stats, table_row_counts, VACUUM_MODES
+from integrity import iter_season_findings, CHECKS
+from reports import iter_division_frequencies, iter_races_with_counts, iter_divisions_with_counts, \
+    iter_changed_divisions
 
 
 # --- Assume these imports are correct based on your project structure ---
@@ -17,14 +28,69 @@ from models.associations import race_divisions
 # --- 1. Top-Level Group ---
 
 @click.group()
-def cli():
+@click.option(
+    '--profile',
+    'profile_mode',
+    type=click.Choice(['sampling', 'deterministic']),
+    default=None,
+    help='Profile the command: "sampling" writes flamegraph-ready collapsed stacks, '
+         '"deterministic" a cProfile .prof file. Both print per-stage wall times and the hottest functions.')
+@click.option(
+    '--profile-output',
+    type=str,
+    default='profile',
+    show_default=True,
+    help='Path prefix of the profile files (<prefix>.collapsed / <prefix>.prof and <prefix>.txt).')
+@click.option(
+    '--sql-report',
+    is_flag=True,
+    default=False,
+    help='Time every SQL statement and print a report: slowest statements and repeated SELECTs (N+1).')
+@click.option(
+    '--sql-log',
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help='Also write the SQL report and the slow-query log to this file (implies --sql-report).')
+@click.option(
+    '--slow-query-ms',
+    type=float,
+    default=query_log.DEFAULT_SLOW_QUERY_MS,
+    show_default=True,
+    help='Statements slower than this go to the slow-query log.')
+@click.option(
+    '--explain',
+    is_flag=True,
+    default=False,
+    help='Add the EXPLAIN QUERY PLAN of the slowest SELECTs to the SQL report.')
+@click.option(
+    '--in-memory',
+    is_flag=True,
+    default=False,
+    help='Load the database into memory first, for read-heavy analytics. Changes are discarded '
+         'unless --write-back is given.')
+@click.option(
+    '--write-back',
+    is_flag=True,
+    default=False,
+    help='With --in-memory: write the in-memory database back to the database file atomically at the end.')
+@click.pass_context
+def cli(ctx: click.Context, profile_mode: Optional[str], profile_output: str,
+        sql_report: bool, sql_log: Optional[str], slow_query_ms: float, explain: bool,
+        in_memory: bool, write_back: bool):
     """
     \b
     HYROX Data Management CLI (Click)
     ---------------------------------
     A tool for inspecting and managing the scraped HYROX data.
     """
-    pass
+    if profile_mode:
+        profiling.profile_command(ctx, profile_mode, profile_output)
+    if sql_report or sql_log:
+        query_log.log_command(ctx, slow_query_ms, sql_log, explain)
+    if in_memory:
+        ctx.with_resource(memory_database(write_back=write_back))
+    elif write_back:
+        click.echo("⚠️ --write-back only applies with --in-memory; ignoring it.")
 
 
 # --- 2. Command: list-seasons ---
@@ -71,32 +137,19 @@ def list_races_command(season_number: Optional[int]):
     """
     session = init_db()
 
-    # Handle specific season filtering
-    if season_number is not None:
-        season = session.query(Season).filter(Season.number == season_number).first()
-        if not season:
-            click.echo(f"❌ Error: No season found with number {season_number}.")
-            session.close()
-            return
-
-        races = session.query(Race).filter(Race.season_id == season.id).order_by(Race.name.asc()).all()
-        click.echo(f"\n🏙️ Races for Season {season.number}: {season.name}")
-        click.echo("-" * 30)
-
-        for race in races:
-            click.echo(race)
-
-    # Handle listing all races across all seasons
-    else:
-        seasons = session.query(Season).order_by(Season.number.asc()).all()
+    # One query for all races with their counts, streamed and grouped by season as it arrives
+    if season_number is not None and not session.query(Season.id).filter(Season.number == season_number).first():
+        click.echo(f"❌ Error: No season found with number {season_number}.")
+        session.close()
+        return
 
-        for season in seasons:
-            click.echo(f"\n🏙️ Races for Season {season.number}: {season.name}")
+    current_season = None
+    for race, number, name, races_in_season, divisions, results in iter_races_with_counts(session, season_number):
+        if number != current_season:
+            current_season = number
+            click.echo(f"\n🏙️ Races for Season {number}: {name} ({races_in_season} races)")
             click.echo("-" * 30)
-
-            races = session.query(Race).filter(Race.season_id == season.id).order_by(Race.name.asc()).all()
-            for race in races:
-                click.echo(f"  {race}")
+        click.echo(f"  {race} [{divisions} divisions, {results} results]")
 
     session.close()
 
@@ -107,7 +160,8 @@ def list_races_command(season_number: Optional[int]):
 def rank_divisions_command():
     """
     \b
-    Ranks divisions based on how many races they appear in.
+    Ranks division types (per gender) by how many races they appear in,
+    with their number of divisions and results.
     Useful for identifying the most common divisions.
     """
     session = init_db()
@@ -115,27 +169,368 @@ def rank_divisions_command():
     click.echo("\n🥇 Ranking Divisions by Frequency:")
     click.echo("-" * 40)
 
-    try:
-        # This is your core SQLAlchemy query, adapted for a CLI function
-        divisions = (
-            session.query(Division)
-            .outerjoin(race_divisions, Division.id == race_divisions.c.division_id)
-            .group_by(Division.id)
-            .order_by(func.count(race_divisions.c.race_id).desc())
-            .all()
-        )
+    found = False
+    for division, gender, races, divisions, results in iter_division_frequencies(session):
+        found = True
+        click.echo(f"[{races:<3}] {division.value} {gender.value} ({divisions} divisions, {results} results)")
+
+    if not found:
+        click.echo("No divisions found in the database.")
+
+    session.close()
+
+
+# --- 4b. Command: list-divisions ---
+
+@cli.command('list-divisions')
+@click.option(
+    '--race_name',
+    required=True,
+    type=str,
+    help='Name of the race, e.g. "2025 Hamburg".'
+)
+def list_divisions_command(race_name: str):
+    """
+    \b
+    Lists the divisions of a race with their number of results.
+    Example:
+      $ python db_cli.py list-divisions --race_name "2025 Hamburg"
+    """
+    session = init_db()
+
+    click.echo(f"\n🏅 Divisions of {race_name}:")
+    click.echo("-" * 40)
+
+    found = False
+    for division_id, division, gender, event_id, results in iter_divisions_with_counts(session, race_name):
+        found = True
+        click.echo(f"[{results:>5}] {division.value} {gender.value} (id: {event_id})")
+
+    if not found:
+        click.echo(f"❌ No divisions found for race '{race_name}'.")
+
+    session.close()
+
+
+# --- 4c. Command: changed-divisions ---
+
+@cli.command('changed-divisions')
+@click.option(
+    '--since-hours',
+    type=float,
+    default=24,
+    show_default=True,
+    help='Report result pages that changed within this many hours.'
+)
+def changed_divisions_command(since_hours: float):
+    """
+    \b
+    Lists the divisions whose result pages changed recently (as seen by
+    scrape_cli.py sync and tail), e.g. to see what the last sync picked up.
+    Example:
+      $ python db_cli.py changed-divisions
+      $ python db_cli.py changed-divisions --since-hours 2
+    """
+    session = init_db()
+    since = datetime.now() - timedelta(hours=since_hours)
+
+    click.echo(f"\n🔄 Divisions changed since {since:%Y-%m-%d %H:%M}:")
+    click.echo("-" * 40)
+
+    found = False
+    for race_name, division, gender, event_id, changed_pages, pages, rows, last_changed in \
+            iter_changed_divisions(session, since):
+        found = True
+        click.echo(f"{last_changed:%Y-%m-%d %H:%M}  {race_name} - {division.value} {gender.value}: "
+                   f"{changed_pages}/{pages} page(s) changed, {rows} result(s) (id: {event_id})")
+
+    if not found:
+        click.echo("✅ No changes.")
+
+    session.close()
+
+
+# --- 5. Command: search-athlete ---
+
+@cli.command('search-athlete')
+@click.argument('query', type=str)
+@click.option(
+    '--limit',
+    type=int,
+    default=20,
+    show_default=True,
+    help='Maximum number of matches to show.'
+)
+def search_athlete_command(query: str, limit: int):
+    """
+    \b
+    Fuzzy-searches athlete names (and nations) across all seasons.
+    Example:
+      $ python db_cli.py search-athlete "john smith"
+      $ python db_cli.py search-athlete "smiht GER" --limit 5
+    """
+    session = init_db()
+
+    start = time.perf_counter()
+    with profiling.span("search_athletes"):
+        matches = search_athletes(session, query, limit=limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    click.echo(f"\n🔎 Matches for '{query}':")
+    click.echo("-" * 40)
+
+    if not matches:
+        click.echo("No matching athletes found.")
+    for m in matches:
+        athlete = f"[athlete {m['athlete_id']}] " if m['athlete_id'] is not None else ""
+        click.echo(f"{athlete}{m['full_name']} ({m['nation_abbreviation']}) - Season {m['season_number']}, "
+                   f"{m['race_name']}, {DivisionName[m['division']].value} {Gender[m['gender']].value}, "
+                   f"Rank {m['rank_overall']}, {Result.time_ms_to_string(m['total_time_ms'])}")
 
-        if not divisions:
-            click.echo("No divisions found in the database.")
-            session.close()
-            return
+    click.echo(f"\n⏱️ {len(matches)} match(es) in {elapsed_ms:.1f} ms")
+    session.close()
+
+
+# --- 6. Command: rebuild-search-index ---
 
-        for d in divisions:
-            click.echo(f"[{len(d.races):<3}] {d}")
+@cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuilds the athlete full-text search index from the results table."""
+    session = init_db()
+    start = time.perf_counter()
+    rebuild_search_index(session)
+    click.echo(f"✅ Search index rebuilt in {time.perf_counter() - start:.2f} s.")
+    session.close()
 
-    except Exception as e:
-        click.echo(f"❌ An error occurred during ranking: {e}")
 
+# --- 7. Command: resolve-athletes ---
+
+@cli.command('resolve-athletes')
+@click.option(
+    '--full',
+    is_flag=True,
+    default=False,
+    help='Discard all existing athlete assignments and re-resolve every result.'
+)
+def resolve_athletes_command(full: bool):
+    """
+    \b
+    Links results of the same person across races and seasons to one athlete id.
+    Without --full, only results that have no athlete yet are resolved.
+    Example:
+      $ python db_cli.py resolve-athletes
+      $ python db_cli.py resolve-athletes --full
+    """
+    session = init_db()
+
+    start = time.perf_counter()
+    counts = resolve_athletes(session, full=full)
+    elapsed = time.perf_counter() - start
+
+    click.echo(f"✅ Resolved {counts['resolved_results']} result(s) in {elapsed:.2f} s.")
+    click.echo(f"   - {counts['new_athletes']} new athlete(s) created.")
+    session.close()
+
+
+# --- 8. Command: athlete-history ---
+
+@cli.command('athlete-history')
+@click.argument('athlete_id', type=int)
+def athlete_history_command(athlete_id: int):
+    """
+    \b
+    Lists all results of one athlete across races and seasons.
+    Example:
+      $ python db_cli.py athlete-history 42
+    """
+    session = init_db()
+
+    history = get_athlete_history(session, athlete_id)
+    if not history:
+        click.echo(f"❌ Error: No results found for athlete {athlete_id}.")
+        session.close()
+        return
+
+    click.echo(f"\n🏃 History of athlete {athlete_id}: {history[0]['full_name']} ({history[0]['nation_abbreviation']})")
+    click.echo("-" * 40)
+    for h in history:
+        click.echo(f"Season {h['season_number']}, {h['race_name']}, "
+                   f"{h['division'].value} {h['gender'].value}, "
+                   f"Age Group {h['age_group']}, Rank {h['rank_overall']}, "
+                   f"{Result.time_ms_to_string(h['total_time_ms'])}")
+    session.close()
+
+
+# --- 9. Command: export-results ---
+
+@cli.command('export-results')
+@click.option('--season', 'season_number', type=int, default=None, help='Only export this season number.')
+@click.option('--race', 'race_name', type=str, default=None, help='Only export this race (e.g. "2025 Hamburg").')
+@click.option(
+    '--division',
+    'division_name',
+    type=click.Choice([d.value for d in DivisionName], case_sensitive=False),
+    default=None,
+    help='Only export this division.'
+)
+@click.option(
+    '--gender',
+    'gender_name',
+    type=click.Choice([g.value for g in Gender], case_sensitive=False),
+    default=None,
+    help='Only export this gender.'
+)
+@click.option('--age-group', 'age_group', type=str, default=None, help='Only export this age group (e.g. "30-34").')
+@click.option(
+    '--format',
+    'output_format',
+    type=click.Choice(['csv', 'ndjson']),
+    default='csv',
+    show_default=True,
+    help='Output format written to stdout.'
+)
+def export_results_command(season_number: Optional[int],
+                           race_name: Optional[str],
+                           division_name: Optional[str],
+                           gender_name: Optional[str],
+                           age_group: Optional[str],
+                           output_format: str):
+    """
+    \b
+    Streams results to stdout as CSV or NDJSON with constant memory use.
+    Example:
+      $ python db_cli.py export-results --season 8 > season8.csv
+      $ python db_cli.py export-results --race "2025 Hamburg" --division "HYROX PRO" --format ndjson
+    """
+    session = init_db()
+
+    records = iter_results(
+        session,
+        season_number=season_number,
+        race_name=race_name,
+        division=DivisionName(division_name.upper()) if division_name else None,
+        gender=Gender(gender_name.upper()) if gender_name else None,
+        age_group=age_group,
+    )
+    writer = write_csv if output_format == 'csv' else write_ndjson
+
+    start = time.perf_counter()
+    count = writer(records, sys.stdout)
+    elapsed = time.perf_counter() - start
+
+    # Report on stderr so stdout stays a clean data stream
+    click.echo(f"✅ Exported {count} result(s) in {elapsed:.2f} s "
+               f"({count / elapsed if elapsed > 0 else 0:.0f} rows/s).", err=True)
+    session.close()
+
+
+# --- 10. Command: maintain ---
+
+@cli.command('maintain')
+@click.option(
+    '--vacuum',
+    type=click.Choice(VACUUM_MODES),
+    default=None,
+    help='Also vacuum: "incremental" returns free pages to the file system, "full" rebuilds the '
+         'defragmented file (and enables incremental vacuums from then on).'
+)
+@click.option(
+    '--full-analyze',
+    is_flag=True,
+    default=False,
+    help='Re-analyze every table instead of only those with stale statistics (PRAGMA optimize).'
+)
+def maintain_command(vacuum: Optional[str], full_analyze: bool):
+    """
+    \b
+    Refreshes the query planner statistics, optionally vacuums, checkpoints the
+    write-ahead log and reports table/index sizes before and after.
+    Run it on a schedule and after large ingests or re-scrapes.
+    Example:
+      $ python db_cli.py maintain
+      $ python db_cli.py maintain --vacuum full
+    """
+    engine = get_engine()
+    with engine.connect() as connection:
+        before = database_stats(connection)
+
+    steps = maintain(engine, vacuum=vacuum, full_analyze=full_analyze)
+
+    with engine.connect() as connection:
+        after = database_stats(connection)
+        rows = table_row_counts(connection)
+
+    click.echo("\n🧹 Maintenance:")
+    click.echo("-" * 40)
+    for name, seconds in steps:
+        click.echo(f"  {name:<24} {seconds:>8.2f} s")
+
+    def mib(size: int) -> str:
+        return f"{size / 2 ** 20:.1f} MiB"
+
+    click.echo("\n📏 Database (before → after):")
+    click.echo("-" * 40)
+    click.echo(f"  file       {mib(before.file_bytes)} → {mib(after.file_bytes)}")
+    click.echo(f"  free pages {before.free_pages} ({before.free_ratio:.1%}) → {after.free_pages} ({after.free_ratio:.1%})")
+    click.echo(f"  WAL        {mib(before.wal_bytes)} → {mib(after.wal_bytes)}")
+
+    click.echo(f"\n{'table / index':<36} {'type':<6} {'rows':>10} {'before':>11} {'after':>11} {'unused':>7}")
+    click.echo("-" * 86)
+    names = sorted(before.objects.keys() | after.objects.keys(),
+                   key=lambda name: -(after.objects.get(name) or before.objects[name]).bytes)
+    for name in names:
+        old, new = before.objects.get(name), after.objects.get(name)
+        current = new or old
+        row_count = f"{rows[name]:,}" if name in rows else ""
+        unused = f"{current.unused_bytes / current.bytes:.0%}" if current.bytes else ""
+        click.echo(f"{name:<36} {current.type:<6} {row_count:>10} {mib(old.bytes) if old else '-':>11} "
+                   f"{mib(new.bytes) if new else '-':>11} {unused:>7}")
+
+
+# --- 11. Command: check-integrity ---
+
+@cli.command('check-integrity')
+@click.option(
+    '--season',
+    'season_number',
+    type=int,
+    default=None,
+    help='Only check this season number (default: every season).'
+)
+def check_integrity_command(season_number: Optional[int]):
+    """
+    \b
+    Checks the stored results of a season: rank gaps and duplicates (overall and
+    per age group), ranks that disagree with the finish times, divisions without
+    results and divisions in a gender they are not run in.
+    Example:
+      $ python db_cli.py check-integrity --season 8
+    """
+    session = init_db()
+    query = session.query(Season).order_by(Season.number)
+    if season_number is not None:
+        query = query.filter(Season.number == season_number)
+    seasons = query.all()
+    if not seasons:
+        click.echo(f"❌ Error: Season {season_number} not found in the database.")
+        session.close()
+        return
+
+    for season in seasons:
+        start = time.perf_counter()
+        counts = dict.fromkeys(CHECKS, 0)
+        click.echo(f"\n🩺 Integrity of {season.name}:")
+        click.echo("-" * 40)
+        for finding in iter_season_findings(session, season.id):
+            counts[finding.check] += 1
+            click.echo(f"  ⚠️ {finding.label}: {finding.detail}")
+        elapsed = time.perf_counter() - start
+        if not any(counts.values()):
+            click.echo("  ✅ No findings.")
+        for check, count in counts.items():
+            if count:
+                click.echo(f"  {count:>5} × {check} ({CHECKS[check]})")
+        click.echo(f"⏱️ Checked in {elapsed:.2f} s")
     session.close()
 
 
@@ -0,0 +1,88 @@
+from typing import Dict, Optional
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from models import AgeGroup, Nation
+
+# --- Configuration ---
+# Readable result field -> (id column on results, dimension model, value column of the dimension).
+# Results only store the small integer id; the few distinct labels live once in their dimension table.
+INTERNED_FIELDS = {
+    'age_group': ('age_group_id', AgeGroup, AgeGroup.name),
+    'nation_abbreviation': ('nation_id', Nation, Nation.abbreviation),
+}
+
+
+# --- Interning Cache ---
+
+class DimensionCache:
+    """
+    In-memory label -> id maps of the dimension tables, used while ingesting results.
+
+    Every dimension table is loaded once; a label that is not stored yet is inserted on first
+    sight and cached, so ingesting a page costs no dimension queries at all once the (few dozen)
+    age groups and nations of a season were seen. Get the cache of a session with dimension_cache().
+
+    Example:
+        dimensions = dimension_cache(session)
+        session.execute(insert(Result), [dimensions.intern_values(values) for values in pages])
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self._ids: Dict[type, Dict[str, int]] = {}
+
+    def id_of(self, model: type, value: Optional[str]) -> Optional[int]:
+        """The id of a label in the dimension table of `model`, inserting the label if it is new."""
+        if value is None:
+            return None
+        ids = self._ids.get(model)
+        if ids is None:
+            ids = self._ids[model] = self._load(model)
+        dimension_id = ids.get(value)
+        if dimension_id is None:
+            value_column = _value_column(model)
+            dimension_id = self.session.execute(insert(model).values({value_column.key: value})).inserted_primary_key[0]
+            ids[value] = dimension_id
+        return dimension_id
+
+    def intern_values(self, values: dict) -> dict:
+        """Replaces the readable INTERNED_FIELDS of a result dict by their id columns."""
+        interned = dict(values)
+        for field, (id_column, model, _) in INTERNED_FIELDS.items():
+            if field in interned:
+                interned[id_column] = self.id_of(model, interned.pop(field))
+        return interned
+
+    def clear(self):
+        self._ids = {}
+
+    def _load(self, model: type) -> Dict[str, int]:
+        value_column = _value_column(model)
+        return {value: dimension_id for dimension_id, value in self.session.execute(select(model.id, value_column))}
+
+
+def _value_column(model: type):
+    return next(value_column for _, dimension, value_column in INTERNED_FIELDS.values() if dimension is model)
+
+
+def dimension_cache(session: Session) -> DimensionCache:
+    """
+    The interning cache of a session (created on first use).
+
+    It lives as long as the session. A rollback clears it, since ids of labels inserted in the
+    rolled back transaction no longer exist.
+    """
+    cache = session.info.get('dimension_cache')
+    if cache is None:
+        cache = session.info['dimension_cache'] = DimensionCache(session)
+        event.listen(session, 'after_rollback', lambda rolled_back: cache.clear())
+    return cache
+
+
+def dimension_labels(session: Session) -> Dict[str, Dict[int, str]]:
+    """id -> label of every interned field, for translating ids read in bulk (see rows.py)."""
+    return {field: dict(session.execute(select(model.id, value_column)).all())
+            for field, (_, model, value_column) in INTERNED_FIELDS.items()}
+
@@ -0,0 +1,105 @@
+import csv
+import json
+from typing import Iterator, Dict, Any, Optional, TextIO
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Result, Division, Race, Season, AgeGroup, Nation
+from models.division import DivisionName, Gender
+
+# Rows fetched per keyset page (and per cursor batch inside a page)
+PAGE_SIZE = 5_000
+
+EXPORT_COLUMNS = [
+    'result_id', 'season_number', 'race_name', 'division', 'gender', 'age_group',
+    'rank_overall', 'rank_age_group', 'full_name', 'nation_abbreviation',
+    'total_time_ms', 'total_time', 'athlete_id', 'link_to_detail_page',
+]
+
+
+def iter_results(session: Session,
+                 season_number: Optional[int] = None,
+                 race_name: Optional[str] = None,
+                 division: Optional[DivisionName] = None,
+                 gender: Optional[Gender] = None,
+                 age_group: Optional[str] = None,
+                 page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Streams results (joined with their division, race and season) as plain dicts.
+
+    Uses keyset pagination on results.id: every page is a fresh 'id > last_id ORDER BY id LIMIT n'
+    query, so no page holds more than page_size rows and no ORM objects are created.
+    """
+    query = (
+        select(Result.id.label('result_id'), Season.number.label('season_number'), Race.name.label('race_name'),
+               Division.division, Division.gender, AgeGroup.name.label('age_group'),
+               Result.rank_overall, Result.rank_age_group, Result.full_name,
+               Nation.abbreviation.label('nation_abbreviation'),
+               Result.total_time_ms, Result.athlete_id, Result.idp, Division.event_id, Season.results_url)
+        .join(Division, Result.division_id == Division.id)
+        .join(Race, Division.race_id == Race.id)
+        .join(Season, Race.season_id == Season.id)
+        # Interned labels (see dimensions.py)
+        .outerjoin(AgeGroup, Result.age_group_id == AgeGroup.id)
+        .outerjoin(Nation, Result.nation_id == Nation.id)
+    )
+    if season_number is not None:
+        query = query.where(Season.number == season_number)
+    if race_name is not None:
+        query = query.where(Race.name == race_name)
+    if division is not None:
+        query = query.where(Division.division == division)
+    if gender is not None:
+        query = query.where(Division.gender == gender)
+    if age_group is not None:
+        # Filter on the interned id (one lookup) instead of the joined label of every row
+        age_group_id = session.scalar(select(AgeGroup.id).where(AgeGroup.name == age_group))
+        if age_group_id is None:
+            return
+        query = query.where(Result.age_group_id == age_group_id)
+
+    last_id = 0
+    while True:
+        page = session.execute(
+            query.where(Result.id > last_id)
+            .order_by(Result.id.asc())
+            .limit(page_size)
+            .execution_options(yield_per=page_size)
+        )
+        num_rows = 0
+        for row in page:
+            num_rows += 1
+            last_id = row.result_id
+            record = dict(row._mapping)
+            record['division'] = row.division.value
+            record['gender'] = row.gender.value
+            record['total_time'] = Result.time_ms_to_string(row.total_time_ms)
+            # Only the idp token is stored: rebuild the link
+            del record['idp'], record['event_id'], record['results_url']
+            record['link_to_detail_page'] = (Result.detail_url(row.results_url, row.idp, row.event_id)
+                                             if row.idp is not None else None)
+            yield record
+        if num_rows < page_size:
+            return
+
+
+def write_csv(records: Iterator[Dict[str, Any]], out: TextIO) -> int:
+    """Writes records as CSV (with header) and returns the number of rows written."""
+    writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_ndjson(records: Iterator[Dict[str, Any]], out: TextIO) -> int:
+    """Writes one JSON object per line and returns the number of rows written."""
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write('\n')
+        count += 1
+    return count
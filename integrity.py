@@ -0,0 +1,173 @@
+from typing import Iterator, NamedTuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+import metrics
+from models.division import DivisionName, Gender
+
+# --- Configuration ---
+# The only divisions with mixed teams; every other division is run by men or by women
+MIXED_DIVISIONS = frozenset({DivisionName.HYROX_DOUBLES, DivisionName.HYROX_PRO_DOUBLES,
+                             DivisionName.HYROX_ELITE_15_DOUBLES, DivisionName.HYROX_TEAM_RELAY})
+
+# Check name -> what a finding of it means
+CHECKS = {
+    'rank_gap': "overall ranks are missing",
+    'duplicate_rank': "results share an overall rank but not their time",
+    'rank_time_order': "results are faster than the result ranked before them",
+    'age_group_rank_gap': "age groups have missing ranks",
+    'duplicate_age_group_rank': "results share an age group rank but not their time",
+    'empty_division': "division has no results",
+    'impossible_gender': "division is not run in this gender",
+}
+
+# Divisions of the season (or the single division) checked; {scope} is one of _SCOPES
+_SCOPED_DIVISIONS = """
+SELECT d.id, ra.name AS race_name, d.division, d.gender
+FROM divisions d
+JOIN races ra ON ra.id = d.race_id
+WHERE {scope}
+"""
+_SCOPES = {'season': "ra.season_id = :season_id", 'division': "d.id = :division_id"}
+
+# One pass over the results: every window runs over the same rows, ordered once per partitioning.
+# position is the competition rank (1, 2, 2, 4) a result would have, so rank > position means
+# ranks before it are missing; ties (same rank and time) are no findings.
+_RANK_CHECKS = """
+WITH scoped AS ({divisions}),
+ranked AS (
+    SELECT r.division_id, r.age_group_id, r.rank_overall, r.rank_age_group, r.total_time_ms,
+           RANK() OVER (PARTITION BY r.division_id ORDER BY r.rank_overall) AS position,
+           RANK() OVER (PARTITION BY r.division_id, r.age_group_id ORDER BY r.rank_age_group) AS age_group_position,
+           LAG(r.rank_overall) OVER by_rank AS previous_rank,
+           LAG(r.total_time_ms) OVER by_rank AS previous_time,
+           LAG(r.rank_age_group) OVER by_age_group_rank AS previous_age_group_rank,
+           LAG(r.total_time_ms) OVER by_age_group_rank AS previous_age_group_time
+    FROM results r
+    JOIN scoped ON scoped.id = r.division_id
+    WHERE r.vanished_at IS NULL
+    WINDOW by_rank AS (PARTITION BY r.division_id ORDER BY r.rank_overall, r.total_time_ms),
+           by_age_group_rank AS (PARTITION BY r.division_id, r.age_group_id ORDER BY r.rank_age_group, r.total_time_ms)
+),
+checked AS (
+    SELECT division_id,
+           max(rank_overall - position) AS missing_ranks,
+           min(CASE WHEN rank_overall > position THEN position END) AS first_missing_rank,
+           sum(rank_overall = previous_rank AND total_time_ms <> previous_time) AS duplicate_ranks,
+           min(CASE WHEN rank_overall = previous_rank AND total_time_ms <> previous_time THEN rank_overall END)
+               AS first_duplicate_rank,
+           sum(total_time_ms < previous_time) AS time_inversions,
+           min(CASE WHEN total_time_ms < previous_time THEN rank_overall END) AS first_inversion_rank,
+           count(DISTINCT CASE WHEN rank_age_group > age_group_position THEN coalesce(age_group_id, 0) END)
+               AS age_groups_with_gaps,
+           sum(rank_age_group = previous_age_group_rank AND total_time_ms <> previous_age_group_time)
+               AS duplicate_age_group_ranks
+    FROM ranked
+    GROUP BY division_id
+    HAVING missing_ranks > 0 OR duplicate_ranks > 0 OR time_inversions > 0
+        OR age_groups_with_gaps > 0 OR duplicate_age_group_ranks > 0
+)
+-- Labels are looked up by primary key for the few divisions with findings
+SELECT ra.name AS race_name, d.division, d.gender, checked.*
+FROM checked
+JOIN divisions d ON d.id = checked.division_id
+JOIN races ra ON ra.id = d.race_id
+ORDER BY ra.name, d.division, d.gender
+"""
+
+_DIVISION_CHECKS = """
+WITH scoped AS ({divisions})
+SELECT scoped.race_name, scoped.division, scoped.gender,
+       NOT EXISTS (SELECT 1 FROM results r WHERE r.division_id = scoped.id AND r.vanished_at IS NULL) AS empty,
+       scoped.gender = 'MIXED' AND scoped.division NOT IN :mixed_divisions AS impossible_gender
+FROM scoped
+WHERE empty OR impossible_gender
+ORDER BY scoped.race_name, scoped.division, scoped.gender
+"""
+
+
+class Finding(NamedTuple):
+    # One of CHECKS
+    check: str
+    race_name: str
+    division: DivisionName
+    gender: Gender
+    detail: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.race_name}, {self.division.value} {self.gender.value}"
+
+
+def iter_season_findings(session: Session, season_id: int) -> Iterator[Finding]:
+    """
+    Streams the integrity findings of a whole season: rank gaps and duplicates (overall and
+    per age group), ranks that disagree with the time order, divisions without results and
+    divisions in a gender they are not run in. Rank findings come first, then division
+    findings, each ordered by race, division and gender.
+
+    Vanished results (see ResultMerge.finish) are not checked. Two queries in total, so a
+    season of millions of results is checked in seconds.
+
+    Example:
+        for finding in iter_season_findings(session, season.id):
+            print(f"{finding.label}: {finding.detail}")
+    """
+    yield from _iter_findings(session, 'season', {'season_id': season_id}, divisions=True)
+
+
+def iter_division_findings(session: Session, division_id: int) -> Iterator[Finding]:
+    """The rank findings of a single division (see iter_season_findings), e.g. right after scraping it."""
+    yield from _iter_findings(session, 'division', {'division_id': division_id}, divisions=False)
+
+
+def report_division_findings(session: Session, division_id: int) -> int:
+    """
+    Prints the rank findings of a freshly scraped division as warnings and counts them in
+    metrics.INTEGRITY_FINDINGS; the crawl goes on either way. Returns the number of findings.
+    """
+    findings = 0
+    for finding in iter_division_findings(session, division_id):
+        findings += 1
+        metrics.INTEGRITY_FINDINGS.inc(check=finding.check)
+        print(f"  ⚠️ Warning: {finding.label}: {finding.detail}")
+    return findings
+
+
+def _iter_findings(session: Session, scope: str, params: dict, divisions: bool) -> Iterator[Finding]:
+    scoped_divisions = _SCOPED_DIVISIONS.format(scope=_SCOPES[scope])
+    for row in session.execute(text(_RANK_CHECKS.format(divisions=scoped_divisions)), params):
+        yield from _rank_findings(row)
+    if not divisions:
+        return
+    query = text(_DIVISION_CHECKS.format(divisions=scoped_divisions)).bindparams(
+        bindparam('mixed_divisions', expanding=True))
+    for race_name, division, gender, empty, impossible_gender in session.execute(
+            query, dict(params, mixed_divisions=[division.name for division in MIXED_DIVISIONS])):
+        division, gender = DivisionName[division], Gender[gender]
+        if impossible_gender:
+            yield Finding('impossible_gender', race_name, division, gender, CHECKS['impossible_gender'])
+        if empty:
+            yield Finding('empty_division', race_name, division, gender, CHECKS['empty_division'])
+
+
+def _rank_findings(row) -> Iterator[Finding]:
+    division, gender = DivisionName[row.division], Gender[row.gender]
+
+    def finding(check: str, detail: str) -> Finding:
+        return Finding(check, row.race_name, division, gender, detail)
+
+    if row.missing_ranks > 0:
+        yield finding('rank_gap', f"{row.missing_ranks} overall rank(s) missing, the first is {row.first_missing_rank}")
+    if row.duplicate_ranks:
+        yield finding('duplicate_rank', f"{row.duplicate_ranks} result(s) share an overall rank with a different "
+                                        f"time, the first at rank {row.first_duplicate_rank}")
+    if row.time_inversions:
+        yield finding('rank_time_order', f"{row.time_inversions} result(s) are faster than the result ranked "
+                                         f"before them, the first at rank {row.first_inversion_rank}")
+    if row.age_groups_with_gaps:
+        yield finding('age_group_rank_gap', f"{row.age_groups_with_gaps} age group(s) have missing ranks")
+    if row.duplicate_age_group_ranks:
+        yield finding('duplicate_age_group_rank', f"{row.duplicate_age_group_ranks} result(s) share an age group "
+                                                  f"rank with a different time")
@@ -0,0 +1,126 @@
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from search import FTS_TABLE
+
+# --- Configuration ---
+VACUUM_MODES = ('incremental', 'full')
+# auto_vacuum values of PRAGMA auto_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class ObjectSize(NamedTuple):
+    name: str
+    # 'table' or 'index'
+    type: str
+    pages: int
+    bytes: int
+    # Bytes of its pages that hold no data (dbstat.unused)
+    unused_bytes: int
+
+
+class DatabaseStats(NamedTuple):
+    page_size: int
+    page_count: int
+    free_pages: int
+    # Size of the write-ahead log next to the database file
+    wal_bytes: int
+    objects: Dict[str, ObjectSize]
+
+    @property
+    def file_bytes(self) -> int:
+        return self.page_size * self.page_count
+
+    @property
+    def free_ratio(self) -> float:
+        return self.free_pages / self.page_count if self.page_count else 0.0
+
+
+def database_stats(connection: Connection) -> DatabaseStats:
+    """
+    Page counts of the database and the size of every table and index, read from the dbstat
+    virtual table (one pass over the b-trees; no table data is read).
+    """
+    def pragma(name: str) -> int:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+    db_file = connection.execute(text("PRAGMA database_list")).first()[2]
+    wal_file = f"{db_file}-wal"
+    wal_bytes = os.path.getsize(wal_file) if db_file and os.path.exists(wal_file) else 0
+    objects = {
+        name: ObjectSize(name, object_type or 'table', pages, size, unused)
+        for name, object_type, pages, size, unused in connection.execute(text(
+            "SELECT d.name, s.type, count(*), sum(d.pgsize), sum(d.unused) FROM dbstat d "
+            "LEFT JOIN sqlite_schema s ON s.name = d.name GROUP BY d.name"))
+    }
+    return DatabaseStats(pragma("page_size"), pragma("page_count"), pragma("freelist_count"), wal_bytes, objects)
+
+
+def table_row_counts(connection: Connection) -> Dict[str, int]:
+    """Rows of every stored table (the FTS shadow tables, not the virtual table reading the results)."""
+    tables = connection.execute(text(
+        "SELECT name FROM sqlite_schema WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%' ORDER BY name"))
+    return {table: connection.execute(text(f'SELECT count(*) FROM "{table}"')).scalar() for table in tables.scalars()}
+
+
+def maintain(engine: Engine, vacuum: Optional[str] = None, full_analyze: bool = False) -> List[Tuple[str, float]]:
+    """
+    Keeps query plans and the file size of a database healthy; meant to run on a schedule,
+    e.g. after large ingests or re-scrapes that delete divisions. Returns (step, seconds) of
+    every step run.
+
+    1. Planner statistics: ANALYZE when there are none yet (or with `full_analyze`), otherwise
+       PRAGMA optimize, which only re-analyzes tables whose statistics are stale.
+    2. Merges the b-tree segments of the athlete search index (FTS5 'optimize').
+    3. `vacuum`: 'incremental' returns the free pages to the file system (needs auto_vacuum=
+       INCREMENTAL); 'full' rebuilds the file defragmented and switches it to auto_vacuum=
+       INCREMENTAL, so later runs can vacuum incrementally. A full VACUUM rewrites the whole
+       file and needs as much free disk space as the database.
+    4. Checkpoints the write-ahead log into the database file and truncates it.
+
+    Example:
+        steps = maintain(get_engine(), vacuum='incremental')
+    """
+    if vacuum not in (None,) + VACUUM_MODES:
+        raise ValueError(f"Unknown vacuum mode '{vacuum}', expected one of {', '.join(VACUUM_MODES)}.")
+    steps = []
+
+    def step(name: str, *statements: str):
+        start = time.perf_counter()
+        for statement in statements:
+            result = connection.execute(text(statement))
+            rows = result.all() if result.returns_rows else []
+        steps.append((name, time.perf_counter() - start))
+        return rows
+
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        has_statistics = connection.execute(
+            text("SELECT count(*) FROM sqlite_schema WHERE name = 'sqlite_stat1'")).scalar() \
+            and connection.execute(text("SELECT count(*) FROM sqlite_stat1")).scalar()
+        if full_analyze or not has_statistics:
+            step("ANALYZE", "ANALYZE")
+        else:
+            step("PRAGMA optimize", "PRAGMA optimize")
+        if inspect(connection).has_table(FTS_TABLE):
+            step("optimize search index", f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        if vacuum == 'full':
+            step("VACUUM", f"PRAGMA auto_vacuum={AUTO_VACUUM_INCREMENTAL}", "VACUUM")
+        elif vacuum == 'incremental':
+            if connection.execute(text("PRAGMA auto_vacuum")).scalar() != AUTO_VACUUM_INCREMENTAL:
+                print("⚠️ The database is not in auto_vacuum=INCREMENTAL mode; run one full VACUUM "
+                      "(--vacuum full) to switch it. Skipping the incremental vacuum.")
+            else:
+                # sqlite3 steps a statement once per execute(), and every step frees a single page:
+                # executescript() runs the pragma to completion
+                start = time.perf_counter()
+                connection.connection.driver_connection.executescript("PRAGMA incremental_vacuum")
+                steps.append(("incremental VACUUM", time.perf_counter() - start))
+        busy, _, _ = step("WAL checkpoint", "PRAGMA wal_checkpoint(TRUNCATE)")[0]
+        if busy:
+            print("⚠️ Another connection is using the database: the write-ahead log was not fully checkpointed.")
+    return steps
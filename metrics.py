@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Optional
+
+# Label values of one time series, as a sorted tuple of (label, value) pairs
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Default histogram buckets (seconds): 1 ms .. 60 s
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def series(self) -> List[Tuple[LabelKey, object]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, value in self.series():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    """A value that only goes up (requests made, rows inserted, ...)."""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down (queue depths, work items left, ...)."""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram(Metric):
+    """Distribution of observations (latencies, durations) in cumulative buckets."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = HistogramValue(self.buckets)
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    histogram.bucket_counts[i] += 1
+            histogram.count += 1
+            histogram.sum += value
+            histogram.max = max(histogram.max, value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wall-clock duration of the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, histogram in self.series():
+            for upper_bound, bucket_count in zip(self.buckets, histogram.bucket_counts):
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': repr(upper_bound)})} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {histogram.sum}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {histogram.count}")
+        return lines
+
+
+# --- Registry ---
+
+REGISTRY: Dict[str, Metric] = {}
+
+
+def _register(metric: Metric) -> Metric:
+    REGISTRY[metric.name] = metric
+    return metric
+
+
+HTTP_REQUESTS = _register(Counter(
+    "hyrox_http_requests_total", "HTTP requests to the results site by endpoint and status."))
+HTTP_REQUEST_SECONDS = _register(Histogram(
+    "hyrox_http_request_seconds", "HTTP request latency by endpoint."))
+HTTP_BYTES = _register(Counter(
+    "hyrox_http_downloaded_bytes_total", "Response bytes downloaded by endpoint."))
+HTTP_RETRIES = _register(Counter(
+    "hyrox_http_retries_total", "Requests retried after a timeout or server error, by endpoint."))
+PARSE_SECONDS = _register(Histogram(
+    "hyrox_parse_seconds", "Time spent parsing one downloaded page, by page type."))
+ROWS_INSERTED = _register(Counter(
+    "hyrox_db_rows_inserted_total", "Rows inserted into the database by table."))
+ROWS_UPDATED = _register(Counter(
+    "hyrox_db_rows_updated_total", "Stored rows changed by a re-crawl, by table."))
+DB_COMMIT_SECONDS = _register(Histogram(
+    "hyrox_db_commit_seconds", "Latency of session commits by writer."))
+QUEUE_DEPTH = _register(Gauge(
+    "hyrox_queue_depth", "Work items waiting to be processed, by queue."))
+INTEGRITY_FINDINGS = _register(Counter(
+    "hyrox_integrity_findings_total", "Data problems reported instead of failing the crawl, by check."))
+
+
+def reset():
+    """Clears all recorded values (e.g. between two commands in one process)."""
+    for metric in REGISTRY.values():
+        metric.reset()
+
+
+def recorded() -> bool:
+    """Whether any metric has a value (e.g. not after --help or a command without downloads)."""
+    return any(metric.series() for metric in REGISTRY.values())
+
+
+# --- Exporters ---
+
+def render_textfile() -> str:
+    """Renders all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY.values():
+        if metric.series():
+            lines.extend(metric.exposition())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str):
+    """
+    Writes the metrics for the node_exporter textfile collector.
+
+    The file is written next to its destination and renamed into place, so the
+    collector never reads a half-written file.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        f.write(render_textfile())
+    os.replace(temporary_path, path)
+
+
+def format_summary() -> str:
+    """Formats all recorded metrics as a plain-text table."""
+    rows = []
+    for metric in REGISTRY.values():
+        for key, value in metric.series():
+            labels = ", ".join(f"{name}={label_value}" for name, label_value in key)
+            if isinstance(value, HistogramValue):
+                average = value.sum / value.count if value.count else 0.0
+                shown = f"n={value.count} avg={average * 1000:.1f}ms max={value.max * 1000:.1f}ms sum={value.sum:.2f}s"
+            elif float(value).is_integer():
+                shown = f"{value:,.0f}"
+            else:
+                shown = f"{value:,.3f}"
+            rows.append((metric.name, labels, shown))
+    if not rows:
+        return "No metrics recorded."
+    name_width = max(len(row[0]) for row in rows)
+    labels_width = max(len(row[1]) for row in rows)
+    return "\n".join(f"{name:<{name_width}}  {labels:<{labels_width}}  {shown}" for name, labels, shown in rows)
@@ -0,0 +1,93 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from dimensions import INTERNED_FIELDS
+from models import Result
+from search import drop_search_index
+
+# Rows read and rewritten per round trip
+BATCH_SIZE = 10_000
+# Detail links without an idp token, kept by migrate_detail_links when it drops the column
+LEGACY_DETAIL_LINKS_TABLE = 'legacy_detail_links'
+
+
+def run_migrations(connection: Connection):
+    """
+    Data migrations of databases created by older versions, run by db.prepare_schema after
+    upgrade_schema added the new columns. Each one is a no-op once applied.
+
+    Both free space inside the file; a VACUUM returns it to the file system.
+    """
+    migrate_interned_columns(connection)
+    migrate_detail_links(connection)
+
+
+def _result_columns(connection: Connection) -> set:
+    inspector = inspect(connection)
+    if not inspector.has_table('results'):
+        return set()
+    return {column['name'] for column in inspector.get_columns('results')}
+
+
+def migrate_interned_columns(connection: Connection):
+    """
+    Moves the age group and nation strings of a database created before the dimension tables
+    into them: fills the tables, sets the id columns and drops the string columns from results.
+
+    The search index reads the nation of every result, so it is dropped as well and rebuilt by
+    ensure_search_index.
+    """
+    legacy_fields = [field for field in INTERNED_FIELDS if field in _result_columns(connection)]
+    if not legacy_fields:
+        return
+    # DROP COLUMN refuses columns that triggers or views still refer to
+    drop_search_index(connection)
+    for field in legacy_fields:
+        id_column, model, value_column = INTERNED_FIELDS[field]
+        table = model.__tablename__
+        connection.execute(text(
+            f"INSERT OR IGNORE INTO {table} ({value_column.key}) "
+            f"SELECT DISTINCT {field} FROM results WHERE {field} IS NOT NULL ORDER BY {field}"))
+        connection.execute(text(
+            f"UPDATE results SET {id_column} = "
+            f"(SELECT id FROM {table} WHERE {table}.{value_column.key} = results.{field}) "
+            f"WHERE {field} IS NOT NULL"))
+        connection.execute(text(f"ALTER TABLE results DROP COLUMN {field}"))
+    print(f"🔧 Moved results.{', results.'.join(legacy_fields)} into dimension tables (VACUUM to shrink the file).")
+
+
+def migrate_detail_links(connection: Connection):
+    """
+    Replaces the stored detail page URL of every result by its idp token (Result.idp) and drops
+    results.link_to_detail_page. The URL is rebuilt on demand (Result.link_to_detail_page).
+
+    Links without an idp token cannot be rebuilt: they are kept in legacy_detail_links
+    (result_id, link) and reported instead of being dropped with the column.
+    """
+    if 'link_to_detail_page' not in _result_columns(connection):
+        return
+    select_links = text("SELECT id, link_to_detail_page FROM results "
+                        "WHERE id > :last_id AND link_to_detail_page IS NOT NULL ORDER BY id LIMIT :limit")
+    set_idp = text("UPDATE results SET idp = :idp WHERE id = :id")
+    keep_link = text(f"INSERT OR REPLACE INTO {LEGACY_DETAIL_LINKS_TABLE} (result_id, link) VALUES (:id, :link)")
+    create_kept_links = text(f"CREATE TABLE IF NOT EXISTS {LEGACY_DETAIL_LINKS_TABLE} ("
+                             f"result_id INTEGER PRIMARY KEY REFERENCES results (id) ON DELETE CASCADE, "
+                             f"link VARCHAR NOT NULL)")
+    migrated, kept, first_kept, last_id = 0, 0, None, 0
+    while batch := connection.execute(select_links, {'last_id': last_id, 'limit': BATCH_SIZE}).all():
+        tokens = [{'id': result_id, 'idp': Result.parse_idp(link), 'link': link} for result_id, link in batch]
+        connection.execute(set_idp, tokens)
+        unparsed = [token for token in tokens if token['idp'] is None]
+        if unparsed:
+            connection.execute(create_kept_links)
+            connection.execute(keep_link, unparsed)
+            kept += len(unparsed)
+            first_kept = first_kept or unparsed[0]
+        migrated += len(batch)
+        last_id = batch[-1][0]
+    connection.execute(text("ALTER TABLE results DROP COLUMN link_to_detail_page"))
+    print(f"🔧 Replaced the detail links of {migrated - kept:,} result(s) by their idp token "
+          f"(VACUUM to shrink the file).")
+    if kept:
+        print(f"⚠️ {kept:,} detail link(s) have no idp token and were kept in {LEGACY_DETAIL_LINKS_TABLE}, "
+              f"e.g. result {first_kept['id']}: {first_kept['link']}")
@@ -1,4 +1,8 @@
+from .age_group import AgeGroup
+from .athlete import Athlete
 from .division import Division
+from .nation import Nation
 from .race import Race
 from .result import Result
 from .season import Season
+from .scrape_state import RaceScrapeState, DivisionScrapeState, PageFingerprint
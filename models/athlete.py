@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from db import Base
+
+
+class Athlete(Base):
+    __tablename__ = 'athletes'
+    __table_args__ = (
+        UniqueConstraint('name_key', 'nation_abbreviation', 'variant', name='uq_athlete_identity'),
+    )
+    id = Column(Integer, primary_key=True)
+    # Blocking key: normalized, order-independent name ("Smith, John" and "John Smith" -> "john smith")
+    name_key = Column(String, nullable=False)
+    nation_abbreviation = Column(String, nullable=False, default='')
+    # Distinguishes different people sharing name and nation (e.g. two "John Smith (GBR)" in one race)
+    variant = Column(Integer, nullable=False, default=0)
+    # Name as first seen on the results page
+    display_name = Column(String, nullable=True)
+
+    # An athlete has many results (one per race entered).
+    results = relationship("Result", back_populates="athlete")
+
+    def __repr__(self):
+        return f"<Athlete {self.display_name} ({self.nation_abbreviation}), id: {self.id}>"
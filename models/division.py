@@ -1,4 +1,6 @@
 import enum
+import re
+from functools import lru_cache
 
 from sqlalchemy import Column, Integer, Enum, ForeignKey, String
 from sqlalchemy.orm import relationship
@@ -20,13 +22,26 @@ class DivisionName(enum.Enum):
     @classmethod
     def from_string(cls, input_string: str) -> 'DivisionName | None':
         # TODO: improve matching logic: "HYROX DOUBLES ELITE 15" is sometimes called "HYROX PRO DOUBLES ELITE 15 - Saturday" geez..z
-        # find exact matches of enum values contained in the input string
-        matches = [role for role in cls if role.value in input_string.upper()]
-        # reduce the matches to the longest match
-        if matches:
-            return max(matches, key=lambda role: len(role.value))
-        else:
-            return None
+        # find the longest enum value contained in the input string (see _longest_division_match)
+        return _longest_division_match(input_string.upper())
+
+
+# The division vocabulary compiled once: a zero-width lookahead finds every enum value at every
+# position of the input in a single scan, longest alternatives first.
+_DIVISION_ORDER = {division: index for index, division in enumerate(DivisionName)}
+_DIVISION_BY_VALUE = {division.value: division for division in DivisionName}
+_DIVISION_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(value) for value in sorted(_DIVISION_BY_VALUE, key=len, reverse=True)) + "))"
+)
+
+
+@lru_cache(maxsize=1024)
+def _longest_division_match(input_string: str) -> 'DivisionName | None':
+    # Longest match wins, ties go to the earlier enum member (same result as max() over the enum)
+    matches = {_DIVISION_BY_VALUE[match.group(1)] for match in _DIVISION_PATTERN.finditer(input_string)}
+    if not matches:
+        return None
+    return max(matches, key=lambda division: (len(division.value), -_DIVISION_ORDER[division]))
 
 
 class Gender(enum.Enum):
@@ -46,7 +61,7 @@ class Division(Base):
     division = Column(Enum(DivisionName), nullable=False)
     gender = Column(Enum(Gender), nullable=False)
     # Relationship back to races via the association table
-    race_id = Column(Integer, ForeignKey('races.id', ondelete="CASCADE"), nullable=False)
+    race_id = Column(Integer, ForeignKey('races.id', ondelete="CASCADE"), nullable=False, index=True)
     race = relationship(
         "Race",
         back_populates="divisions"
@@ -56,9 +71,19 @@ class Division(Base):
 
     # A division has many results.
     results = relationship("Result", back_populates="division", cascade="all, delete-orphan")
+    # When the results were last scraped (see web_scraping/sync.py)
+    scrape_state = relationship("DivisionScrapeState", back_populates="division", uselist=False,
+                                cascade="all, delete-orphan")
+    # What every result page looked like when it was last fetched (see web_scraping/fingerprints.py)
+    page_fingerprints = relationship("PageFingerprint", back_populates="division", order_by="PageFingerprint.page",
+                                     cascade="all, delete-orphan")
 
     def __repr__(self):
-        return f"<Division {self.division.value} {self.gender.value} ({self.race.name}, id: {self.event_id})).>"
+        # Only name the race if it is already loaded: printing a list of divisions must not
+        # issue one query per division (load it with a repository.py profile instead)
+        race = self.__dict__.get('race')
+        race_name = race.name if race is not None else f"race_id={self.race_id}"
+        return f"<Division {self.division.value} {self.gender.value} ({race_name}, id: {self.event_id})).>"
 
     @classmethod
     def valid_combination(cls, division, gender) -> bool:
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+
+from db import Base
+
+
+class Nation(Base):
+    """Interned nation abbreviation ('GER'); results reference it by its small integer id."""
+    __tablename__ = 'nations'
+    id = Column(Integer, primary_key=True)
+    abbreviation = Column(String, nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Nation {self.abbreviation}, id: {self.id}>"
@@ -17,14 +17,16 @@ class Race(Base):
     is_world_championship = Column(Integer, nullable=False, default=0)
     is_regional_championship = Column(Integer, nullable=False, default=0)
     is_national_championship = Column(Integer, nullable=False, default=0)
-    season_id = Column(Integer, ForeignKey('seasons.id', ondelete="CASCADE"), nullable=False)
+    season_id = Column(Integer, ForeignKey('seasons.id', ondelete="CASCADE"), nullable=False, index=True)
     season = relationship("Season", back_populates="races")
     # One-to-many: a race can have multiple divisions
     divisions = relationship(
         "Division",
         back_populates="race",
-        lazy='dynamic',
+        lazy='select',
         cascade='all, delete-orphan')
+    # When the divisions were last scraped (see web_scraping/sync.py)
+    scrape_state = relationship("RaceScrapeState", back_populates="race", uselist=False, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f"<Race {self.name}, country={self.country}, city={self.city}, date_start={self.date_start}, date_end={self.date_end}>"
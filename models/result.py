@@ -1,42 +1,87 @@
-from sqlalchemy import Column, Integer, ForeignKey, String
-from sqlalchemy.orm import relationship
+import re
+from typing import Iterable, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Index, select
+from sqlalchemy.orm import relationship, column_property
 
 from db import Base
+from .age_group import AgeGroup
+from .division import Division
+from .nation import Nation
+from .race import Race
+from .season import Season
+
+# 'HH:MM:SS', 'MM:SS' (without hours the minutes may exceed 59: '120:05'), each optionally followed
+# by a fraction ('01:02:03.4', '58:07,25'). Anything else ('DNF', 'DSQ', '-', '') is not a time.
+TIME_PATTERN = re.compile(r'^\s*(?:(\d+):(\d{1,2})|(\d+)):(\d{1,2})(?:[.,](\d{1,3}))?\s*$')
 
 
 class Result(Base):
     __tablename__ = 'results'
+    __table_args__ = (
+        # A unique index (not a constraint) so upgrade_schema can add it to existing databases;
+        # results stored before result_key existed have NULL keys, which never collide
+        Index('ix_results_division_result_key', 'division_id', 'result_key', unique=True),
+    )
     id = Column(Integer, primary_key=True)
 
     # Summary data from table view
-    age_group = Column(String, nullable=True)
+    # Age group and nation are interned (see dimensions.py): the table stores small integer ids
+    age_group_id = Column(Integer, ForeignKey('age_groups.id'), nullable=True)
     rank_overall = Column(Integer, nullable=False)
     rank_age_group = Column(Integer, nullable=False)
     full_name = Column(String, nullable=True)
-    nation_abbreviation = Column(String, nullable=True)
+    nation_id = Column(Integer, ForeignKey('nations.id'), nullable=True)
     total_time_ms = Column(Integer, nullable=False)
-    link_to_detail_page = Column(String, nullable=True)
+    # Token of the detail page link; the URL itself is rebuilt on demand (see link_to_detail_page)
+    idp = Column(String, nullable=True)
+
+    # Stable identity of the result within its division (see make_key), used to merge re-crawls
+    result_key = Column(String, nullable=True)
+    # Set when a complete crawl of the division no longer listed this result
+    vanished_at = Column(DateTime, nullable=True)
 
     # one-to-many relationship with divisions
-    division_id = Column(Integer, ForeignKey('divisions.id', ondelete="CASCADE"), nullable=False)
+    division_id = Column(Integer, ForeignKey('divisions.id', ondelete="CASCADE"), nullable=False, index=True)
     division = relationship("Division", back_populates="results")
 
+    # Resolved athlete identity (see athletes.py), shared by all results of the same person
+    athlete_id = Column(Integer, ForeignKey('athletes.id', ondelete="SET NULL"), nullable=True, index=True)
+    athlete = relationship("Athlete", back_populates="results")
+
+    # Readable values of the interned ids: loaded with the result and usable in queries
+    # (Result.age_group == '30-34'), but read-only; write age_group_id / nation_id instead
+    age_group = column_property(
+        select(AgeGroup.name).where(AgeGroup.id == age_group_id).correlate_except(AgeGroup).scalar_subquery())
+    nation_abbreviation = column_property(
+        select(Nation.abbreviation).where(Nation.id == nation_id).correlate_except(Nation).scalar_subquery())
+    # What link_to_detail_page is built from: deferred, so only loaded (in one query) when the link is
+    # read; undefer them (undefer_group('detail_link')) when reading the links of many results
+    season_results_url = column_property(
+        select(Season.results_url).join(Race, Race.season_id == Season.id).join(Division, Division.race_id == Race.id)
+        .where(Division.id == division_id).correlate_except(Season, Race, Division).scalar_subquery(),
+        deferred=True, group='detail_link')
+    division_event_id = column_property(
+        select(Division.event_id).where(Division.id == division_id).correlate_except(Division).scalar_subquery(),
+        deferred=True, group='detail_link')
+
     def __init__(self,
-                 age_group: str,
+                 age_group_id: Optional[int],
                  rank_overall: int,
                  rank_age_group: int,
                  full_name: str,
-                 nation_abbreviation: str,
+                 nation_id: Optional[int],
                  total_time_ms: int,
-                 link_to_detail_page: str
+                 idp: Optional[str]
                  ):
-        self.age_group = age_group
+        self.age_group_id = age_group_id
         self.rank_overall = rank_overall
         self.rank_age_group = rank_age_group
         self.full_name = full_name
-        self.nation_abbreviation = nation_abbreviation
+        self.nation_id = nation_id
         self.total_time_ms = total_time_ms
-        self.link_to_detail_page = link_to_detail_page
+        self.idp = idp
         super().__init__()
 
     def __repr__(self):
@@ -44,22 +89,85 @@ class Result(Base):
                 f"Overall Rank: {self.rank_overall}, Age Group: {self.age_group}, "
                 f"Age Group Rank: {self.rank_age_group}, "
                 f"Total Time: {self.time_ms_to_string(self.total_time_ms)} - "
-                f"link: {self.link_to_detail_page}>")
+                f"idp: {self.idp}>")
+
+    @property
+    def link_to_detail_page(self) -> Optional[str]:
+        """The detail page URL, rebuilt from idp and the stored URL of the season (see detail_url)."""
+        if self.idp is None:
+            return None
+        return self.detail_url(self.season_results_url, self.idp, self.division_event_id)
+
+    @classmethod
+    def detail_url(cls, season_results_url: str, idp: str, event_id: Optional[str] = None) -> str:
+        """
+        URL of the detail page of a result, rebuilt from its idp token (only the token is stored);
+        the inverse of parse_idp.
+
+        The links on the result list also repeat the list state (page size, filters), which is
+        left out here.
+
+        Example:
+            Result.detail_url('https://results.hyrox.com/season-8/', 'JGDMS4JI62AB1')
+            # 'https://results.hyrox.com/season-8/?content=detail&fpid=list&pid=list&idp=JGDMS4JI62AB1&lang=EN_CAP'
+        """
+        url = f"{season_results_url}?content=detail&fpid=list&pid=list&idp={idp}&lang=EN_CAP"
+        return f"{url}&event={event_id}" if event_id else url
+
+    @classmethod
+    def parse_idp(cls, link_to_detail_page: Optional[str]) -> Optional[str]:
+        """
+        The idp token of a detail page link (None if there is none).
+
+        Example:
+            Result.parse_idp('https://results.hyrox.com/season-8/?content=detail&idp=JGDMS4JI62AB1&lang=EN_CAP')
+            # 'JGDMS4JI62AB1'
+        """
+        idp = parse_qs(urlparse(link_to_detail_page or '').query).get('idp')
+        return idp[0] if idp else None
+
+    @classmethod
+    def make_key(cls, idp: Optional[str], rank_overall: Optional[int], full_name: Optional[str]) -> str:
+        """
+        The result key: the idp token of the detail page link, else overall rank and name.
+
+        Example:
+            Result.make_key('JGDMS4JI62AB1', 12, 'Doe, Jane')  # 'JGDMS4JI62AB1'
+            Result.make_key(None, 12, 'Doe, Jane')  # '12|Doe, Jane'
+        """
+        return idp or f"{rank_overall}|{full_name}"
 
     @classmethod
     def parse_time_ms(cls, time_str: str) -> int:
-        """Parse a time string in the format 'HH:MM:SS' or 'MM:SS' into milliseconds."""
-        parts = time_str.split(':')
-        parts = [int(part) for part in parts]
-        if len(parts) == 3:
-            hours, minutes, seconds = parts
-        elif len(parts) == 2:
-            hours = 0
-            minutes, seconds = parts
-        else:
+        """Parse a time string in the format 'HH:MM:SS' or 'MM:SS' (optionally with a fraction) into milliseconds."""
+        time_ms = cls.parse_times_ms([time_str])[0]
+        if time_ms is None:
             raise ValueError(f"Invalid time format: {time_str}")
-        total_ms = (hours * 3600 + minutes * 60 + seconds) * 1000
-        return total_ms
+        return time_ms
+
+    @classmethod
+    def parse_times_ms(cls, time_strs: Iterable[Optional[str]]) -> List[Optional[int]]:
+        """
+        Parse a whole column of time strings into milliseconds in one pass.
+
+        Supports 'HH:MM:SS', 'MM:SS' (also 'MMM:SS', e.g. '120:05') and fractional seconds
+        ('MM:SS.f', 'HH:MM:SS,ff').
+        Entries that are not a time (None, 'DNF', 'DSQ', '') come back as None,
+        so the None positions act as the null mask of the column.
+        """
+        match = TIME_PATTERN.match
+        times_ms = []
+        for time_str in time_strs:
+            parts = match(time_str) if time_str else None
+            if parts is None:
+                times_ms.append(None)
+                continue
+            hours, minutes, long_minutes, seconds, fraction = parts.groups()
+            total_ms = ((int(hours) if hours else 0) * 3600 + int(minutes or long_minutes) * 60 + int(seconds)) * 1000
+            if fraction:
+                total_ms += int(fraction.ljust(3, '0'))
+            times_ms.append(total_ms)
+        return times_ms
 
     @classmethod
     def time_ms_to_string(cls, time_ms: int) -> str:
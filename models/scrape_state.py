@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+
+from db import Base
+
+
+class RaceScrapeState(Base):
+    """When the divisions of a race were last fetched (see web_scraping/sync.py)."""
+    __tablename__ = 'race_scrape_states'
+    race_id = Column(Integer, ForeignKey('races.id', ondelete="CASCADE"), primary_key=True)
+    race = relationship("Race", back_populates="scrape_state")
+    last_fetched = Column(DateTime, nullable=False)
+    division_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RaceScrapeState race_id={self.race_id}, divisions={self.division_count}, last_fetched={self.last_fetched}>"
+
+
+class DivisionScrapeState(Base):
+    """When the results of a division were last fetched and changed."""
+    __tablename__ = 'division_scrape_states'
+    division_id = Column(Integer, ForeignKey('divisions.id', ondelete="CASCADE"), primary_key=True)
+    division = relationship("Division", back_populates="scrape_state")
+    # Last time the division was checked (whether or not anything had changed)
+    last_fetched = Column(DateTime, nullable=False)
+    # Last time a page differed from its stored fingerprint (i.e. the results were re-scraped)
+    last_changed = Column(DateTime, nullable=False)
+    result_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (f"<DivisionScrapeState division_id={self.division_id}, results={self.result_count}, "
+                f"last_fetched={self.last_fetched}, last_changed={self.last_changed}>")
+
+
+class PageFingerprint(Base):
+    """What one result page of a division looked like when it was last fetched."""
+    __tablename__ = 'page_fingerprints'
+    division_id = Column(Integer, ForeignKey('divisions.id', ondelete="CASCADE"), primary_key=True)
+    page = Column(Integer, primary_key=True)
+    division = relationship("Division", back_populates="page_fingerprints")
+    # sha256 of the normalized rows of the page (see web_scraping/fingerprints.py)
+    fingerprint = Column(String(64), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    last_fetched = Column(DateTime, nullable=False)
+    last_changed = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (f"<PageFingerprint division_id={self.division_id}, page={self.page}, rows={self.row_count}, "
+                f"last_changed={self.last_changed}>")
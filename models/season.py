@@ -13,7 +13,7 @@ class Season(Base):
     number = Column(Integer, nullable=False, unique=True, index=True)
     results_url = Column(String(255), nullable=False, unique=True)
     # One season can have many races
-    races = relationship('Race', back_populates='season', lazy='dynamic', cascade='all, delete-orphan')
+    races = relationship('Race', back_populates='season', lazy='select', cascade='all, delete-orphan')
     last_updated = Column(
         DateTime,
         nullable=False,
@@ -0,0 +1,206 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+# Interval between two stack samples of the sampling profiler (seconds)
+SAMPLE_INTERVAL_S = 0.005
+# Number of functions listed in the hot-function summary
+TOP_N = 20
+
+# Returned by span() while profiling is off: entering/leaving it does nothing
+_NULL_SPAN = nullcontext()
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the Python stacks of all other threads at a fixed interval.
+
+    Every sample is stored as a collapsed stack ('thread;outer;...;inner'), the input
+    format of flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval_s: float = SAMPLE_INTERVAL_S):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval_s):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def hot_functions(self, top_n: int = TOP_N) -> List[str]:
+        """Functions by self samples (leaf of the stack) and total samples (anywhere on the stack)."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # drop the thread name
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for function in set(frames):
+                total_counts[function] += count
+        all_samples = sum(self.stacks.values()) or 1
+        lines = [f"{'self %':>7} {'total %':>8}  function"]
+        for function, count in self_counts.most_common(top_n):
+            lines.append(f"{count / all_samples:>7.1%} {total_counts[function] / all_samples:>8.1%}  {function}")
+        return lines
+
+
+class Profiler:
+    """CPU profile (sampling or deterministic) plus wall-clock spans per pipeline stage."""
+
+    def __init__(self, mode: str = "sampling"):
+        self.mode = mode
+        self.spans: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._start = 0.0
+        self.wall_s = 0.0
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.mode == "deterministic":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler()
+            self._sampler.start()
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.wall_s = time.perf_counter() - self._start
+
+    def record_span(self, name: str, duration_s: float):
+        with self._lock:
+            self.spans.setdefault(name, []).append(duration_s)
+
+    def write(self, output_prefix: str) -> List[str]:
+        """Writes the profile files and returns the paths written."""
+        written = []
+        if self._sampler is not None:
+            self._sampler.write_collapsed(f"{output_prefix}.collapsed")
+            written.append(f"{output_prefix}.collapsed")
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(f"{output_prefix}.prof")
+            written.append(f"{output_prefix}.prof")
+        with open(f"{output_prefix}.txt", "w", encoding="utf-8") as f:
+            f.write(self.format_summary() + "\n")
+        written.append(f"{output_prefix}.txt")
+        return written
+
+    def format_spans(self) -> List[str]:
+        lines = [f"{'stage':<28} {'calls':>6} {'total':>10} {'max':>10} {'% wall':>7}"]
+        ordered = sorted(self.spans.items(), key=lambda item: sum(item[1]), reverse=True)
+        for name, durations in ordered:
+            total = sum(durations)
+            lines.append(f"{name:<28} {len(durations):>6} {total:>9.2f}s {max(durations):>9.3f}s "
+                         f"{total / self.wall_s if self.wall_s else 0:>7.1%}")
+        return lines
+
+    def format_hot_functions(self, top_n: int = TOP_N) -> List[str]:
+        if self._sampler is not None:
+            return self._sampler.hot_functions(top_n)
+        stream = io.StringIO()
+        pstats.Stats(self._cprofile, stream=stream).sort_stats("tottime").print_stats(top_n)
+        return stream.getvalue().strip().splitlines()
+
+    def format_summary(self) -> str:
+        lines = [f"Wall time: {self.wall_s:.2f} s ({self.mode} profile)", "", "Stages:"]
+        lines += self.format_spans() if self.spans else ["(no spans recorded)"]
+        lines += ["", f"Top {TOP_N} hot functions:"]
+        lines += self.format_hot_functions()
+        return "\n".join(lines)
+
+
+# --- Module-level switch ---
+
+_active: Optional[Profiler] = None
+
+
+def start(mode: str = "sampling") -> Profiler:
+    global _active
+    _active = Profiler(mode)
+    _active.start()
+    return _active
+
+
+def stop() -> Optional[Profiler]:
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def profile_command(ctx, mode: str, output_prefix: str):
+    """
+    Profiles the rest of a click command: starts the profiler now and, when the command's
+    context closes, writes the profile files and prints the summary.
+    """
+    import click
+
+    start(mode)
+
+    def finish():
+        profiler = stop()
+        written = profiler.write(output_prefix)
+        click.echo("\n🔬 Profile:", err=True)
+        click.echo("-" * 40, err=True)
+        click.echo(profiler.format_summary(), err=True)
+        click.echo(f"\n💾 Profile written to {', '.join(written)}", err=True)
+
+    ctx.call_on_close(finish)
+
+
+def span(name: str):
+    """
+    Context manager timing one pipeline stage while profiling is on.
+
+    When profiling is off it returns a shared no-op context, so instrumented code
+    pays only for one global lookup.
+    """
+    if _active is None:
+        return _NULL_SPAN
+    return _timed_span(_active, name)
+
+
+@contextmanager
+def _timed_span(profiler: Profiler, name: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record_span(name, time.perf_counter() - start_time)
@@ -0,0 +1,172 @@
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements slower than this are written to the slow-query log (milliseconds)
+DEFAULT_SLOW_QUERY_MS = 50.0
+# A SELECT shape executed at least this often within one command is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = 10
+# Number of statements listed under "slowest statements" (and explained with --explain)
+TOP_N = 10
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Reduces a statement to its shape: literals become '?' and IN-lists collapse to '(?...)',
+    so the same query with different parameters groups together.
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?...)", shape)
+
+
+def _is_select(statement: str) -> bool:
+    return statement.lstrip().upper().startswith(("SELECT", "WITH"))
+
+
+class StatementStats:
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+
+class QueryLog:
+    """
+    Times every statement run through any SQLAlchemy engine (via cursor-execute events)
+    and aggregates them by statement shape.
+    """
+
+    def __init__(self, slow_query_ms: float = DEFAULT_SLOW_QUERY_MS):
+        self.slow_query_s = slow_query_ms / 1000
+        self.by_shape: Dict[str, StatementStats] = {}
+        # (duration, statement, parameters, engine) of the slowest individual executions
+        self.slowest: List[Tuple[float, str, object, Engine]] = []
+        self.slow_entries: List[str] = []
+        self.count = 0
+        self.total_s = 0.0
+        self._lock = threading.Lock()
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_log_start", []).append(time.perf_counter())
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_log_start")
+        if not starts:
+            return
+        duration_s = time.perf_counter() - starts.pop()
+        shape = normalize_statement(statement)
+        with self._lock:
+            self.count += 1
+            self.total_s += duration_s
+            stats = self.by_shape.get(shape)
+            if stats is None:
+                stats = self.by_shape[shape] = StatementStats()
+            stats.count += 1
+            stats.total_s += duration_s
+            stats.max_s = max(stats.max_s, duration_s)
+
+            if len(self.slowest) < TOP_N or duration_s > self.slowest[-1][0]:
+                self.slowest.append((duration_s, statement, None if executemany else parameters, conn.engine))
+                self.slowest.sort(key=lambda entry: entry[0], reverse=True)
+                del self.slowest[TOP_N:]
+            if duration_s >= self.slow_query_s:
+                self.slow_entries.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {duration_s * 1000:.1f}ms "
+                                         f"{_WHITESPACE.sub(' ', statement).strip()} -- {_short(parameters)}")
+
+    def install(self):
+        event.listen(Engine, "before_cursor_execute", self.before_execute)
+        event.listen(Engine, "after_cursor_execute", self.after_execute)
+
+    def uninstall(self):
+        event.remove(Engine, "before_cursor_execute", self.before_execute)
+        event.remove(Engine, "after_cursor_execute", self.after_execute)
+
+    def repeated_statements(self) -> List[Tuple[str, StatementStats]]:
+        """SELECT shapes run at least N_PLUS_ONE_THRESHOLD times: usually a query inside a loop."""
+        repeated = [(shape, stats) for shape, stats in self.by_shape.items()
+                    if stats.count >= N_PLUS_ONE_THRESHOLD and _is_select(shape)]
+        return sorted(repeated, key=lambda item: item[1].count, reverse=True)
+
+    def explain_slowest(self) -> List[str]:
+        """Runs EXPLAIN QUERY PLAN (SQLite) on the slowest SELECTs. Call after uninstall()."""
+        lines = []
+        for duration_s, statement, parameters, engine in self.slowest:
+            if not _is_select(statement) or engine.dialect.name != "sqlite":
+                continue
+            with engine.connect() as conn:
+                plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).all()
+            lines.append(f"[{duration_s * 1000:.1f}ms] {_shorten(_WHITESPACE.sub(' ', statement).strip(), 160)}")
+            lines.extend(f"    {row[-1]}" for row in plan)
+        return lines
+
+    def format_report(self, explain: bool = False) -> str:
+        lines = [f"Statements: {self.count:,} in {self.total_s:.3f} s "
+                 f"({len(self.by_shape):,} distinct, {len(self.slow_entries):,} slower than "
+                 f"{self.slow_query_s * 1000:g} ms)"]
+
+        lines += ["", "By total time:", f"{'calls':>7} {'total':>9} {'max':>9}  statement"]
+        ordered = sorted(self.by_shape.items(), key=lambda item: item[1].total_s, reverse=True)
+        for shape, stats in ordered[:TOP_N]:
+            lines.append(f"{stats.count:>7,} {stats.total_s * 1000:>7.1f}ms {stats.max_s * 1000:>7.1f}ms  "
+                         f"{_shorten(shape, 120)}")
+
+        repeated = self.repeated_statements()
+        if repeated:
+            lines += ["", f"⚠️ Possible N+1 queries (same SELECT run ≥ {N_PLUS_ONE_THRESHOLD} times):"]
+            for shape, stats in repeated:
+                lines.append(f"{stats.count:>7,}x  {_shorten(shape, 120)}")
+
+        if explain:
+            lines += ["", "Query plans of the slowest SELECTs:"]
+            lines += self.explain_slowest() or ["(no SELECTs recorded)"]
+        return "\n".join(lines)
+
+    def write(self, path: str, report: str):
+        """Writes the report followed by the slow-query log."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+            f.write(f"\nSlow queries (≥ {self.slow_query_s * 1000:g} ms):\n")
+            for entry in self.slow_entries:
+                f.write(entry + "\n")
+
+
+def _shorten(text: str, width: int) -> str:
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def _short(parameters) -> str:
+    return _shorten(repr(parameters), 200)
+
+
+def log_command(ctx, slow_query_ms: float, log_file: Optional[str], explain: bool):
+    """
+    Records every statement of the rest of a click command and, when the command's context
+    closes, prints the query report and optionally writes it (plus the slow-query log) to a file.
+    """
+    import click
+
+    query_log = QueryLog(slow_query_ms)
+    query_log.install()
+
+    def finish():
+        query_log.uninstall()
+        click.echo("\n🗄️ SQL queries:", err=True)
+        click.echo("-" * 40, err=True)
+        report = query_log.format_report(explain)
+        click.echo(report, err=True)
+        if log_file:
+            query_log.write(log_file, report)
+            click.echo(f"\n💾 Query log written to {log_file}", err=True)
+
+    ctx.call_on_close(finish)
@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select, func, distinct, case
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from models import Season, Race, Division, Result, PageFingerprint
+
+# Rows fetched per cursor batch while streaming a listing
+BATCH_SIZE = 1_000
+
+
+def _results_per_division():
+    return (
+        select(Result.division_id, func.count().label('results'))
+        .group_by(Result.division_id)
+        .subquery()
+    )
+
+
+def iter_division_frequencies(session: Session) -> Iterator[Row]:
+    """
+    Streams one row per division type and gender, most frequent first:
+    (division, gender, races, divisions, results).
+
+    Everything is counted in one query; results are pre-aggregated per division id, so
+    the join to divisions never multiplies rows.
+    """
+    result_counts = _results_per_division()
+    races = func.count(distinct(Division.race_id)).label('races')
+    query = (
+        select(Division.division, Division.gender, races,
+               func.count(Division.id).label('divisions'),
+               func.coalesce(func.sum(result_counts.c.results), 0).label('results'))
+        .outerjoin(result_counts, result_counts.c.division_id == Division.id)
+        .group_by(Division.division, Division.gender)
+        .order_by(races.desc(), Division.division, Division.gender)
+    )
+    yield from session.execute(query.execution_options(yield_per=BATCH_SIZE))
+
+
+def iter_races_with_counts(session: Session, season_number: Optional[int] = None) -> Iterator[Row]:
+    """
+    Streams races ordered by season and name, each with its counts:
+    (Race, season_number, season_name, races_in_season, divisions, results).
+    """
+    division_counts = (
+        select(Division.race_id, func.count().label('divisions'))
+        .group_by(Division.race_id)
+        .subquery()
+    )
+    result_counts = (
+        select(Division.race_id, func.count(Result.id).label('results'))
+        .join(Result, Result.division_id == Division.id)
+        .group_by(Division.race_id)
+        .subquery()
+    )
+    query = (
+        select(Race, Season.number.label('season_number'), Season.name.label('season_name'),
+               func.count().over(partition_by=Race.season_id).label('races_in_season'),
+               func.coalesce(division_counts.c.divisions, 0).label('divisions'),
+               func.coalesce(result_counts.c.results, 0).label('results'))
+        .join(Season, Race.season_id == Season.id)
+        .outerjoin(division_counts, division_counts.c.race_id == Race.id)
+        .outerjoin(result_counts, result_counts.c.race_id == Race.id)
+        .order_by(Season.number.asc(), Race.name.asc())
+    )
+    if season_number is not None:
+        query = query.where(Season.number == season_number)
+    yield from session.execute(query.execution_options(yield_per=BATCH_SIZE))
+
+
+def iter_divisions_with_counts(session: Session, race_name: str) -> Iterator[Row]:
+    """
+    Streams the divisions of a race with their result counts:
+    (division_id, division, gender, event_id, results).
+    """
+    results = (
+        select(func.count())
+        .where(Result.division_id == Division.id)
+        .scalar_subquery()
+        .label('results')
+    )
+    query = (
+        select(Division.id.label('division_id'), Division.division, Division.gender, Division.event_id, results)
+        .join(Race, Division.race_id == Race.id)
+        .where(Race.name == race_name)
+        .order_by(Division.division, Division.gender)
+    )
+    yield from session.execute(query.execution_options(yield_per=BATCH_SIZE))
+
+
+def iter_changed_divisions(session: Session, since: datetime) -> Iterator[Row]:
+    """
+    Streams the divisions with a result page that changed since `since` (per the stored page
+    fingerprints, see web_scraping/fingerprints.py), most recently changed first:
+    (race_name, division, gender, event_id, changed_pages, pages, rows, last_changed).
+    """
+    last_changed = func.max(PageFingerprint.last_changed).label('last_changed')
+    query = (
+        select(Race.name.label('race_name'), Division.division, Division.gender, Division.event_id,
+               func.sum(case((PageFingerprint.last_changed >= since, 1), else_=0)).label('changed_pages'),
+               func.count().label('pages'),
+               func.sum(PageFingerprint.row_count).label('rows'),
+               last_changed)
+        .join(Division, PageFingerprint.division_id == Division.id)
+        .join(Race, Division.race_id == Race.id)
+        .group_by(PageFingerprint.division_id)
+        .having(last_changed >= since)
+        .order_by(last_changed.desc(), Race.name, Division.division, Division.gender)
+    )
+    yield from session.execute(query.execution_options(yield_per=BATCH_SIZE))
@@ -0,0 +1,81 @@
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from models import Season, Race, Division
+
+# --- Loading Profiles ---
+# Named sets of loader options for the common traversals season -> races -> divisions -> results.
+# Every level is fetched with one extra 'WHERE parent_id IN (...)' query (selectinload) or joined
+# into the parent query (joinedload, for many-to-one), so walking a whole season costs a constant
+# number of queries instead of one per parent row.
+
+SEASON_PROFILES: Dict[str, Sequence[LoaderOption]] = {
+    'bare': (),
+    'races': (selectinload(Season.races),),
+    'divisions': (selectinload(Season.races).selectinload(Race.divisions),),
+    'results': (selectinload(Season.races).selectinload(Race.divisions).selectinload(Division.results),),
+    'scrape_state': (selectinload(Season.races).selectinload(Race.scrape_state),
+                     selectinload(Season.races).selectinload(Race.divisions).selectinload(Division.scrape_state),
+                     selectinload(Season.races).selectinload(Race.divisions).selectinload(Division.page_fingerprints)),
+}
+
+RACE_PROFILES: Dict[str, Sequence[LoaderOption]] = {
+    'bare': (joinedload(Race.season),),
+    'divisions': (joinedload(Race.season), selectinload(Race.divisions)),
+    'results': (joinedload(Race.season), selectinload(Race.divisions).selectinload(Division.results)),
+    'page_fingerprints': (joinedload(Race.season), selectinload(Race.divisions).selectinload(Division.page_fingerprints)),
+}
+
+DIVISION_PROFILES: Dict[str, Sequence[LoaderOption]] = {
+    'bare': (),
+    'race': (joinedload(Division.race).joinedload(Race.season),),
+    'results': (joinedload(Division.race).joinedload(Race.season), selectinload(Division.results)),
+}
+
+
+def _options(profiles: Dict[str, Sequence[LoaderOption]], profile: str) -> Sequence[LoaderOption]:
+    if profile not in profiles:
+        raise ValueError(f"Unknown loading profile '{profile}', expected one of: {', '.join(profiles)}")
+    return profiles[profile]
+
+
+# --- Seasons ---
+
+def get_season(session: Session, number: int, profile: str = 'bare') -> Optional[Season]:
+    query = select(Season).where(Season.number == number).options(*_options(SEASON_PROFILES, profile))
+    return session.scalars(query).first()
+
+
+def get_seasons(session: Session, profile: str = 'bare') -> List[Season]:
+    query = select(Season).order_by(Season.number.asc()).options(*_options(SEASON_PROFILES, profile))
+    return list(session.scalars(query))
+
+
+# --- Races ---
+
+def get_race(session: Session, name: str, profile: str = 'bare') -> Optional[Race]:
+    query = select(Race).where(Race.name == name).options(*_options(RACE_PROFILES, profile))
+    return session.scalars(query).first()
+
+
+def get_races(session: Session, season_number: Optional[int] = None, profile: str = 'bare') -> List[Race]:
+    query = select(Race).join(Race.season).order_by(Season.number.asc(), Race.name.asc())
+    if season_number is not None:
+        query = query.where(Season.number == season_number)
+    return list(session.scalars(query.options(*_options(RACE_PROFILES, profile))))
+
+
+# --- Divisions ---
+
+def get_divisions(session: Session, race_name: str, profile: str = 'race') -> List[Division]:
+    query = (
+        select(Division)
+        .join(Division.race)
+        .where(Race.name == race_name)
+        .order_by(Division.division, Division.gender)
+        .options(*_options(DIVISION_PROFILES, profile))
+    )
+    return list(session.scalars(query))
@@ -0,0 +1,135 @@
+from array import array
+from typing import Iterator, NamedTuple, Optional, Dict, Sequence, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from dimensions import INTERNED_FIELDS, dimension_labels
+from models import Season, Race, Division, Result
+from models.division import DivisionName, Gender
+
+# Rows fetched per cursor batch
+BATCH_SIZE = 10_000
+
+
+class ResultRow(NamedTuple):
+    id: int
+    division_id: int
+    age_group: str
+    rank_overall: int
+    rank_age_group: int
+    full_name: Optional[str]
+    nation_abbreviation: Optional[str]
+    total_time_ms: int
+    athlete_id: Optional[int]
+
+
+class DivisionRow(NamedTuple):
+    id: int
+    race_id: int
+    division: DivisionName
+    gender: Gender
+    event_id: Optional[str]
+
+
+RESULT_COLUMNS = {name: getattr(Result, name) for name in ResultRow._fields}
+# Interned fields (see dimensions.py) are selected as ids and translated with their small label maps:
+# cheaper than looking up the dimension tables per row, and all rows share the same label strings
+RESULT_COLUMNS.update({field: getattr(Result, id_column) for field, (id_column, _, _) in INTERNED_FIELDS.items()})
+DIVISION_COLUMNS = {name: getattr(Division, name) for name in DivisionRow._fields}
+
+# Column arrays use typed arrays for these (non-nullable integer) columns, lists for the rest
+_INTEGER_COLUMNS = {'id', 'division_id', 'race_id', 'rank_overall', 'rank_age_group', 'total_time_ms'}
+
+
+def _filtered(query, season_number: Optional[int], race_name: Optional[str]):
+    if season_number is not None or race_name is not None:
+        query = query.join(Race, Division.race_id == Race.id)
+    if season_number is not None:
+        query = query.join(Season, Race.season_id == Season.id).where(Season.number == season_number)
+    if race_name is not None:
+        query = query.where(Race.name == race_name)
+    return query
+
+
+def _results_query(columns: Sequence[str], season_number: Optional[int], race_name: Optional[str]):
+    query = select(*(RESULT_COLUMNS[name] for name in columns))
+    if season_number is not None or race_name is not None:
+        query = query.join(Division, Result.division_id == Division.id)
+    return _filtered(query, season_number, race_name).order_by(Result.id)
+
+
+def _translations(session: Session, columns: Sequence[str]) -> List[Tuple[int, Dict[int, str]]]:
+    """(position, id -> label) of every interned field among the columns."""
+    interned = [(index, name) for index, name in enumerate(columns) if name in INTERNED_FIELDS]
+    if not interned:
+        return []
+    labels = dimension_labels(session)
+    return [(index, labels[name]) for index, name in interned]
+
+
+def _translated(partition, translations: List[Tuple[int, Dict[int, str]]]):
+    for row in partition:
+        values = list(row)
+        for index, labels in translations:
+            values[index] = labels.get(values[index])
+        yield values
+
+
+def _stream(session: Session, query, batch_size: int):
+    # Core execution on the session's connection: no ORM entities, no identity map
+    result = session.connection().execute(query.execution_options(stream_results=True))
+    for partition in result.partitions(batch_size):
+        yield partition
+
+
+def iter_result_rows(session: Session,
+                     season_number: Optional[int] = None,
+                     race_name: Optional[str] = None,
+                     batch_size: int = BATCH_SIZE) -> Iterator[ResultRow]:
+    """
+    Streams results as ResultRow tuples, for analytics over many rows.
+
+    Example:
+        fastest = min(iter_result_rows(session, season_number=8), key=lambda r: r.total_time_ms)
+    """
+    query = _results_query(ResultRow._fields, season_number, race_name)
+    translations = _translations(session, ResultRow._fields)
+    for partition in _stream(session, query, batch_size):
+        yield from map(ResultRow._make, _translated(partition, translations))
+
+
+def iter_division_rows(session: Session,
+                       season_number: Optional[int] = None,
+                       race_name: Optional[str] = None,
+                       batch_size: int = BATCH_SIZE) -> Iterator[DivisionRow]:
+    """Streams divisions as DivisionRow tuples."""
+    query = _filtered(select(*DIVISION_COLUMNS.values()), season_number, race_name).order_by(Division.id)
+    for partition in _stream(session, query, batch_size):
+        yield from map(DivisionRow._make, partition)
+
+
+def result_columns(session: Session,
+                   columns: Sequence[str] = ('id', 'division_id', 'rank_overall', 'total_time_ms'),
+                   season_number: Optional[int] = None,
+                   race_name: Optional[str] = None,
+                   batch_size: int = BATCH_SIZE) -> Dict[str, Sequence]:
+    """
+    Loads the given result columns as column arrays: array('q') for integer columns,
+    lists for text/nullable ones. Only the requested columns are selected.
+
+    Example:
+        times = result_columns(session, ['total_time_ms'], season_number=8)['total_time_ms']
+    """
+    unknown = set(columns) - set(RESULT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown result column(s): {', '.join(sorted(unknown))}")
+    arrays = {name: array('q') if name in _INTEGER_COLUMNS else [] for name in columns}
+    targets = [arrays[name] for name in columns]
+    query = _results_query(columns, season_number, race_name)
+    for partition in _stream(session, query, batch_size):
+        for target, values in zip(targets, zip(*partition)):
+            target.extend(values)
+    for index, labels in _translations(session, columns):
+        arrays[columns[index]] = list(map(labels.get, arrays[columns[index]]))
+    return arrays
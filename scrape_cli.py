@@ -1,21 +1,105 @@
-from typing import Optional
+import contextlib
+import sys
+from datetime import timedelta
+from typing import Optional, List, TextIO
 
 import click
 
-from db import init_db
+import metrics
+import profiling
+import query_log
+from db import session_scope, memory_database, database_file
 from models import Season, Race
 from web_scraping.divisions import scrape_divisions
+from web_scraping.result_summaries import scrape_race_results
 from web_scraping.races import get_races, update_races_in_db
+from repository import get_race
+from web_scraping.pipeline import ScrapePipeline, STAGES, DEFAULT_WORKERS
+from web_scraping.sync import SyncPipeline, DEFAULT_RECHECK_AFTER, DEFAULT_FINAL_AFTER
+from web_scraping.tail import RaceTail, ndjson_hook, DEFAULT_MIN_INTERVAL_S, DEFAULT_MAX_INTERVAL_S
 from web_scraping.seasons import scrape_hyrox_seasons, update_seasons_in_db
 
 
 @click.group()
-def cli():
+@click.option(
+    '--metrics-file',
+    type=click.Path(dir_okay=False, writable=True),
+    envvar='HYROX_METRICS_FILE',
+    default=None,
+    help='Write crawl metrics to this Prometheus textfile (e.g. for the node_exporter textfile collector).')
+@click.option(
+    '--profile',
+    'profile_mode',
+    type=click.Choice(['sampling', 'deterministic']),
+    default=None,
+    help='Profile the command: "sampling" writes flamegraph-ready collapsed stacks, '
+         '"deterministic" a cProfile .prof file. Both print per-stage wall times and the hottest functions.')
+@click.option(
+    '--profile-output',
+    type=str,
+    default='profile',
+    show_default=True,
+    help='Path prefix of the profile files (<prefix>.collapsed / <prefix>.prof and <prefix>.txt).')
+@click.option(
+    '--sql-report',
+    is_flag=True,
+    default=False,
+    help='Time every SQL statement and print a report: slowest statements and repeated SELECTs (N+1).')
+@click.option(
+    '--sql-log',
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help='Also write the SQL report and the slow-query log to this file (implies --sql-report).')
+@click.option(
+    '--slow-query-ms',
+    type=float,
+    default=query_log.DEFAULT_SLOW_QUERY_MS,
+    show_default=True,
+    help='Statements slower than this go to the slow-query log.')
+@click.option(
+    '--explain',
+    is_flag=True,
+    default=False,
+    help='Add the EXPLAIN QUERY PLAN of the slowest SELECTs to the SQL report.')
+@click.option(
+    '--in-memory',
+    is_flag=True,
+    default=False,
+    help='Ingest into an in-memory copy of the database and write it back to the database file atomically '
+         'when the command ends (no disk I/O per commit). No other process may use the file meanwhile.')
+@click.pass_context
+def cli(ctx: click.Context, metrics_file: Optional[str], profile_mode: Optional[str], profile_output: str,
+        sql_report: bool, sql_log: Optional[str], slow_query_ms: float, explain: bool, in_memory: bool):
     """
     \b
     Command-line interface for scraping HYROX data
     """
-    pass
+    metrics.reset()
+    ctx.call_on_close(lambda: report_metrics(metrics_file))
+    if profile_mode:
+        profiling.profile_command(ctx, profile_mode, profile_output)
+    if sql_report or sql_log:
+        query_log.log_command(ctx, slow_query_ms, sql_log, explain)
+    if in_memory:
+        # Close callbacks run last-registered first: the message follows the write-back
+        db_file = database_file()
+        ctx.call_on_close(lambda: click.echo(f"💾 Wrote the in-memory database to {db_file}.", err=True))
+        ctx.with_resource(memory_database(db_file))
+
+
+def report_metrics(metrics_file: Optional[str]):
+    """
+    Prints the crawl metrics summary at the end of every command that recorded any and exports
+    the textfile. Like every diagnostic it goes to stderr, so stdout can carry data
+    (e.g. `tail --ndjson -`).
+    """
+    if metrics.recorded():
+        click.echo("\n📊 Crawl metrics:", err=True)
+        click.echo("-" * 40, err=True)
+        click.echo(metrics.format_summary(), err=True)
+    if metrics_file:
+        metrics.write_textfile(metrics_file)
+        click.echo(f"\n💾 Metrics written to {metrics_file}", err=True)
 
 
 @cli.command('scrape-seasons')
@@ -34,15 +118,13 @@ def scrape_seasons_command(force: Optional[bool]):
       $ python scrape_cli.py scrape-seasons --force
     """
 
-    # 1. Initialize DB and get session
-    session = init_db()
-
-    # 2. Scrape the data
-    scraped_seasons = scrape_hyrox_seasons()
+    # 1. Scrape the data
+    with profiling.span('fetch_seasons'):
+        scraped_seasons = scrape_hyrox_seasons()
 
-    # 3. Update the database
-    # Note: We pass the session to the update function, which closes it.
-    update_seasons_in_db(session, scraped_seasons, overwrite_existing=force)
+    # 2. Update the database
+    with session_scope() as session, profiling.span('write_seasons'):
+        update_seasons_in_db(session, scraped_seasons, overwrite_existing=force)
 
 
 @cli.command('scrape-races')
@@ -61,23 +143,22 @@ def scrape_races_command(season_number: int):
     if not season_number:
         click.echo("❌ Error: --season option is required.")
         return
-    # 1. Initialize DB and get session
-    session = init_db()
-    # 2. Get the season from the DB
-    existing_season = session.query(Season).filter(Season.number == season_number).first()
-    if not existing_season:
-        click.echo(f"❌ Error: No season found with number {season_number}.")
-        session.close()
-        return
-    # 3. Scrape the races for the season
-    scraped_races = get_races(season_number=season_number)
-    if len(scraped_races) == 0:
-        click.echo(f"❌ Error: No races found for season {season_number}.")
-        session.close()
-        return
-    click.echo(f"✅ Scraped {len(scraped_races)} races.")
-    # 4. Update the database with the scraped
-    update_races_in_db(session, existing_season, scraped_races)
+    with session_scope() as session:
+        # 1. Get the season from the DB
+        existing_season = session.query(Season).filter(Season.number == season_number).first()
+        if not existing_season:
+            click.echo(f"❌ Error: No season found with number {season_number}.")
+            return
+        # 2. Scrape the races for the season
+        with profiling.span('fetch_races'):
+            scraped_races = get_races(season_number=season_number)
+        if len(scraped_races) == 0:
+            click.echo(f"❌ Error: No races found for season {season_number}.")
+            return
+        click.echo(f"✅ Scraped {len(scraped_races)} races.")
+        # 3. Update the database with the scraped
+        with profiling.span('write_races'):
+            update_races_in_db(session, existing_season, scraped_races)
 
 
 @cli.command('scrape-divisions')
@@ -95,19 +176,225 @@ def scrape_divisions_command(race_name: str):
     if not race_name:
         click.echo("❌ Error: --race_name option is required.")
         return
-    # 1. Initialize DB and get session
-    session = init_db()
-    # 2. Get the race from the DB
-
-    existing_race = session.query(Race).filter(Race.name == race_name).first()
-    if not existing_race:
-        click.echo(f"❌ Error: No race found with name '{race_name}'.")
-        session.close()
+    with session_scope() as session:
+        # 1. Get the race from the DB
+        existing_race = get_race(session, race_name, profile='divisions')
+        if not existing_race:
+            click.echo(f"❌ Error: No race found with name '{race_name}'.")
+            return
+        # 2. Scrape the divisions for the race
+        scrape_divisions(season_number=existing_race.season.number,
+                         session=session,
+                         race=existing_race)
+
+
+@cli.command('scrape-results')
+@click.option(
+    '--race_name',
+    required=True,
+    type=str,
+    default=None,
+    help='Enter the race name to scrape results for (e.g. "HYROX Hamburg 2025").')
+def scrape_results_command(race_name: str):
+    """
+    \b
+    Scrape Hyrox result summaries for all divisions of a given race and update the database.
+    """
+    if not race_name:
+        click.echo("❌ Error: --race_name option is required.")
         return
-    # 3. Scrape the divisions for the race
-    scrape_divisions(season_number=existing_race.season.number,
-                     session=session,
-                     race=existing_race)
+    with session_scope() as session:
+        # 1. Get the race from the DB
+        existing_race = get_race(session, race_name, profile='divisions')
+        if not existing_race:
+            click.echo(f"❌ Error: No race found with name '{race_name}'.")
+            return
+        # 2. Scrape the results of every division of the race
+        insert_count = scrape_race_results(session=session, race=existing_race)
+    click.echo(f"✅ Inserted {insert_count} results for '{race_name}'.")
+
+
+def parse_season_numbers(ctx, param, value: Optional[str]) -> Optional[List[int]]:
+    """Parses '8', '7,8' or '5-8' into season numbers."""
+    if not value:
+        return None
+    numbers = []
+    try:
+        for part in value.split(','):
+            first, _, last = part.strip().partition('-')
+            numbers.extend(range(int(first), int(last or first) + 1))
+    except ValueError:
+        raise click.BadParameter(f"expected season numbers like '8', '7,8' or '5-8', got '{value}'")
+    return numbers
+
+
+def parse_stages(ctx, param, value: str) -> List[str]:
+    """Parses a comma-separated list of consecutive pipeline stages."""
+    stages = [stage.strip() for stage in value.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown or not stages:
+        raise click.BadParameter(f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(STAGES)}")
+    indexes = sorted(STAGES.index(stage) for stage in stages)
+    if indexes != list(range(indexes[0], indexes[-1] + 1)):
+        raise click.BadParameter(f"stages must be consecutive (in order: {', '.join(STAGES)})")
+    return [STAGES[i] for i in indexes]
+
+
+@cli.command('scrape-all')
+@click.option(
+    '--workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    help='Number of concurrent downloads (together at most one request per HYROX_POLITENESS_DELAY seconds).')
+@click.option(
+    '--seasons',
+    'season_numbers',
+    type=str,
+    default=None,
+    callback=parse_season_numbers,
+    help='Only crawl these seasons, e.g. "8", "7,8" or "5-8" (default: all).')
+@click.option(
+    '--stages',
+    type=str,
+    default=','.join(STAGES),
+    show_default=True,
+    callback=parse_stages,
+    help='Consecutive stages to run; the parents of the first stage are read from the database.')
+def scrape_all_command(workers: int, season_numbers: Optional[List[int]], stages: List[str]):
+    """
+    \b
+    Scrape seasons, races, divisions and results as one streaming pipeline.
+    Every download starts as soon as its parent is stored, so all stages overlap.
+    Divisions that already have results are skipped.
+    Example:
+      $ python scrape_cli.py scrape-all
+      $ python scrape_cli.py scrape-all --seasons 8 --workers 8
+      $ python scrape_cli.py scrape-all --seasons 7,8 --stages divisions,results
+    """
+    with session_scope() as session:
+        pipeline = ScrapePipeline(session, workers=workers, season_numbers=season_numbers, stages=stages)
+        counts = pipeline.run()
+    summary = ", ".join(f"{count} {stage}" for stage, count in counts.items())
+    click.echo(f"✅ Scraped {summary} ({pipeline.failures} failed download(s)).")
+
+
+@cli.command('sync')
+@click.option(
+    '--workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    help='Number of concurrent downloads (together at most one request per HYROX_POLITENESS_DELAY seconds).')
+@click.option(
+    '--seasons',
+    'season_numbers',
+    type=str,
+    default=None,
+    callback=parse_season_numbers,
+    help='Only sync these seasons, e.g. "8", "7,8" or "5-8" (default: all).')
+@click.option(
+    '--recheck-after-hours',
+    type=float,
+    default=DEFAULT_RECHECK_AFTER.total_seconds() / 3600,
+    show_default=True,
+    help='Do not check races/divisions again that were checked less than this many hours ago.')
+@click.option(
+    '--final-after-days',
+    type=float,
+    default=DEFAULT_FINAL_AFTER.days,
+    show_default=True,
+    help='Treat divisions whose result pages have not changed for this many days as final.')
+def sync_command(workers: int, season_numbers: Optional[List[int]], recheck_after_hours: float,
+                 final_after_days: float):
+    """
+    \b
+    Incremental update: scrape only what can have changed since the last sync.
+    Complete past seasons and final divisions are skipped; other divisions download
+    page 1 and their last page and are only re-scraped if either changed.
+    Example:
+      $ python scrape_cli.py sync
+      $ python scrape_cli.py sync --seasons 8 --recheck-after-hours 1
+    """
+    with session_scope() as session:
+        pipeline = SyncPipeline(session,
+                                workers=workers,
+                                season_numbers=season_numbers,
+                                recheck_after=timedelta(hours=recheck_after_hours),
+                                final_after=timedelta(days=final_after_days))
+        counts = pipeline.run()
+    summary = ", ".join(f"{count} {stage}" for stage, count in counts.items())
+    skipped = ", ".join(f"{count} {stage}" for stage, count in pipeline.skipped.items())
+    click.echo(f"✅ Synced {summary} ({pipeline.failures} failed download(s)).")
+    click.echo(f"⏭️ Skipped {skipped}; {pipeline.unchanged} checked division(s) unchanged.")
+
+
+@cli.command('tail')
+@click.option(
+    '--race_name',
+    type=str,
+    required=True,
+    help='Name of the live race, e.g. "2025 Hamburg".')
+@click.option(
+    '--ndjson',
+    type=click.File('w', lazy=False),
+    default=None,
+    help='Write one JSON line per new finisher to this file ("-" for stdout).')
+@click.option(
+    '--min-interval',
+    type=click.FloatRange(min=1),
+    default=DEFAULT_MIN_INTERVAL_S,
+    show_default=True,
+    help='Shortest poll interval of a division in seconds (used while new finishers keep coming).')
+@click.option(
+    '--max-interval',
+    type=click.FloatRange(min=1),
+    default=DEFAULT_MAX_INTERVAL_S,
+    show_default=True,
+    help='Longest poll interval of a division in seconds (reached while nothing changes).')
+@click.option(
+    '--max-polls',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Stop after polling every division this many times (default: run until Ctrl+C).')
+@click.option(
+    '--workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    help='Number of concurrent downloads (together at most one request per HYROX_POLITENESS_DELAY seconds).')
+def tail_command(race_name: str, ndjson, min_interval: float, max_interval: float, max_polls: Optional[int],
+                 workers: int):
+    """
+    \b
+    Live race-day mode: poll the divisions of a race and store new finishers as they appear.
+    Only result pages that changed since the last poll are downloaded.
+    Example:
+      $ python scrape_cli.py tail --race_name "2025 Hamburg"
+      $ python scrape_cli.py tail --race_name "2025 Hamburg" --ndjson finishers.ndjson --min-interval 10
+    """
+    # With --ndjson - the finisher lines are the only output on stdout: progress goes to stderr
+    diagnostics = contextlib.redirect_stdout(sys.stderr) if _is_stdout(ndjson) else contextlib.nullcontext()
+    with diagnostics, session_scope() as session:
+        tail = RaceTail(session,
+                        race_name,
+                        on_finisher=ndjson_hook(ndjson) if ndjson else None,
+                        workers=workers,
+                        min_interval_s=min_interval,
+                        max_interval_s=max(min_interval, max_interval),
+                        max_polls=max_polls)
+        try:
+            counts = tail.run()
+        except ValueError as err:
+            click.echo(f"❌ Error: {err}", err=ndjson is not None)
+            return
+    click.echo(f"✅ {counts['inserted']} new and {counts['updated']} updated result(s) from {counts['polls']} poll(s) "
+               f"with {counts['requests']} request(s) ({tail.failures} failed poll(s)).", err=ndjson is not None)
+
+
+def _is_stdout(stream: Optional[TextIO]) -> bool:
+    # click.File opens '-' as a writer of its own on the stdout buffer
+    return stream is not None and getattr(stream, 'name', None) in ('-', '<stdout>')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,161 @@
+import re
+from typing import List, Dict, Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# --- Configuration ---
+# External-content FTS5 table over results(full_name, nation_abbreviation).
+# The trigram tokenizer indexes every 3-character substring, so "mith" finds "Smith, John"
+# and misspelled names still share most of their trigrams with the stored spelling.
+FTS_TABLE = "results_fts"
+# Results only store the nation id (see dimensions.py): the index reads its content from this view
+SEARCH_VIEW = "results_search"
+
+_CREATE_SEARCH_VIEW = f"""
+CREATE VIEW IF NOT EXISTS {SEARCH_VIEW} AS
+SELECT r.id, r.full_name, n.abbreviation AS nation_abbreviation
+FROM results r
+LEFT JOIN nations n ON n.id = r.nation_id
+"""
+
+_CREATE_FTS_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    full_name,
+    nation_abbreviation,
+    content='{SEARCH_VIEW}',
+    content_rowid='id',
+    tokenize='trigram'
+)
+"""
+
+_NEW_NATION = "(SELECT abbreviation FROM nations WHERE id = new.nation_id)"
+_OLD_NATION = "(SELECT abbreviation FROM nations WHERE id = old.nation_id)"
+
+# Triggers keep the index in sync with every insert/update/delete on results.
+_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON results BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, full_name, nation_abbreviation)
+        VALUES (new.id, new.full_name, {_NEW_NATION});
+    END
+    """,
+    f"{FTS_TABLE}_ad": f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON results BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, full_name, nation_abbreviation)
+        VALUES ('delete', old.id, old.full_name, {_OLD_NATION});
+    END
+    """,
+    f"{FTS_TABLE}_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF full_name, nation_id ON results BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, full_name, nation_abbreviation)
+        VALUES ('delete', old.id, old.full_name, {_OLD_NATION});
+        INSERT INTO {FTS_TABLE}(rowid, full_name, nation_abbreviation)
+        VALUES (new.id, new.full_name, {_NEW_NATION});
+    END
+    """,
+}
+
+# Column weights for bm25(): a name hit counts far more than a nation hit.
+_NAME_WEIGHT = 10.0
+_NATION_WEIGHT = 1.0
+
+
+def ensure_search_index(connection: Connection):
+    """
+    Creates the FTS5 table and its sync triggers if they do not exist yet.
+
+    When the index is created on a database that already contains results,
+    it is populated once with a full rebuild.
+    """
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first()
+    connection.execute(text(_CREATE_SEARCH_VIEW))
+    connection.execute(text(_CREATE_FTS_TABLE))
+    for statement in _TRIGGERS.values():
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def drop_search_index(connection: Connection):
+    """Drops the FTS5 table, its triggers and its content view (ensure_search_index recreates them)."""
+    for trigger in _TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    connection.execute(text(f"DROP VIEW IF EXISTS {SEARCH_VIEW}"))
+
+
+def rebuild_search_index(session: Session):
+    """Rebuilds the whole FTS5 index from the results table (e.g. after a bulk load with triggers disabled)."""
+    session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    session.commit()
+
+
+def make_match_expression(query: str) -> str | None:
+    """
+    Turns a free-text query into an FTS5 MATCH expression of OR-ed trigrams.
+
+    Example: 'John Smith' -> '"joh" OR "ohn" OR "smi" OR "mit" OR "ith"'
+    Rows sharing more trigrams with the query get a better bm25 rank, which makes
+    the search tolerant to typos and to 'Smith, John' vs. 'John Smith' ordering.
+    """
+    words = re.findall(r"\w+", query.lower())
+    trigrams = []
+    for word in words:
+        for i in range(len(word) - 2):
+            trigram = word[i:i + 3]
+            if trigram not in trigrams:
+                trigrams.append(trigram)
+    if not trigrams:
+        return None
+    return " OR ".join('"' + trigram.replace('"', '""') + '"' for trigram in trigrams)
+
+
+def search_athletes(session: Session, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Returns results whose athlete name or nation fuzzily matches the query, best match first.
+
+    :param session: The SQLAlchemy Session object.
+    :param query: Free-text name (and optionally nation) to look for, e.g. 'smith ger'.
+    :param limit: Maximum number of matches to return.
+    """
+    match_expression = make_match_expression(query)
+    select_columns = """
+        r.id AS result_id, r.athlete_id, r.full_name, n.abbreviation AS nation_abbreviation, ag.name AS age_group,
+        r.total_time_ms, r.rank_overall, d.division, d.gender,
+        ra.name AS race_name, s.number AS season_number
+    """
+    if match_expression is None:
+        # Queries shorter than one trigram cannot use the index: fall back to a prefix scan.
+        rows = session.execute(text(f"""
+            SELECT {select_columns}, 0.0 AS score
+            FROM results r
+            JOIN divisions d ON d.id = r.division_id
+            JOIN races ra ON ra.id = d.race_id
+            JOIN seasons s ON s.id = ra.season_id
+            LEFT JOIN nations n ON n.id = r.nation_id
+            LEFT JOIN age_groups ag ON ag.id = r.age_group_id
+            WHERE r.full_name LIKE :prefix
+            ORDER BY r.full_name
+            LIMIT :limit
+        """), {"prefix": f"{query.strip()}%", "limit": limit})
+    else:
+        rows = session.execute(text(f"""
+            SELECT {select_columns}, bm25({FTS_TABLE}, {_NAME_WEIGHT}, {_NATION_WEIGHT}) AS score
+            FROM {FTS_TABLE}
+            JOIN results r ON r.id = {FTS_TABLE}.rowid
+            JOIN divisions d ON d.id = r.division_id
+            JOIN races ra ON ra.id = d.race_id
+            JOIN seasons s ON s.id = ra.season_id
+            LEFT JOIN nations n ON n.id = r.nation_id
+            LEFT JOIN age_groups ag ON ag.id = r.age_group_id
+            WHERE {FTS_TABLE} MATCH :match
+            ORDER BY score
+            LIMIT :limit
+        """), {"match": match_expression, "limit": limit})
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import models  # registers every model with Base before the schema is created
+from db import prepare_schema
+from models import Season, Race, Division
+from models.division import DivisionName, Gender
+
+
+@pytest.fixture
+def session():
+    """A session on a fresh in-memory database with the full schema (indexes, search triggers)."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as connection:
+        prepare_schema(connection)
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def division(session) -> Division:
+    season = Season(name="Season 8", number=8, results_url="https://results.hyrox.com/season-8/")
+    race = Race(name="2025 Hamburg", season=season)
+    division = Division(division=DivisionName.HYROX, gender=Gender.MEN, race=race, event_id="H_HAMBURG25_OVERALL")
+    session.add_all([season, race, division])
+    session.commit()
+    return division
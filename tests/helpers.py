@@ -0,0 +1,27 @@
+from models import Division
+from web_scraping.result_summaries import ResultMerge
+
+DETAIL_LINK = "https://results.hyrox.com/season-8/?content=detail&fpid=list&pid=list&idp={idp}&lang=EN_CAP"
+
+
+def row(rank: int, name: str, total_time: str, idp: str, age_group: str = "30-34", nation: str = "GER") -> dict:
+    """A parsed result row as returned by parse_results_page."""
+    return {
+        "fullname": name,
+        "nation_abbreviation": nation,
+        "rank_overall": rank,
+        "rank_age_group": rank,
+        "age_group": age_group,
+        "total_time": total_time,
+        "detailed_results_page_link": DETAIL_LINK.format(idp=idp),
+    }
+
+
+def crawl(session, division: Division, *pages) -> dict:
+    """Merges the pages (lists of rows) as one complete crawl of the division and commits it."""
+    merge = ResultMerge(session, division.id)
+    for rows_info in pages:
+        merge.merge_page(rows_info)
+    counts = merge.finish()
+    session.commit()
+    return counts
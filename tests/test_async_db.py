@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+from async_db import AsyncWriter, init_async_db  # noqa: E402
+from helpers import row  # noqa: E402
+from models import Season, Race, Division, Result  # noqa: E402
+from models.division import DivisionName, Gender  # noqa: E402
+
+PAGE = [
+    row(1, "Doe, John", "00:58:01", "IDP1"),
+    row(2, "Roe, Richard", "01:02:30", "IDP2"),
+    row(3, "Poe, Edgar", "01:05:12", "IDP3"),
+]
+
+
+@pytest.fixture
+def db_uri(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'hyrox.db'}"
+
+
+@pytest.fixture
+def division_id(db_uri) -> int:
+    async def create_schema():
+        await (await init_async_db(db_uri)).dispose()
+    asyncio.run(create_schema())
+    engine = create_engine(db_uri)
+    with Session(engine) as session:
+        season = Season(name="Season 8", number=8, results_url="https://results.hyrox.com/season-8/")
+        division = Division(division=DivisionName.HYROX, gender=Gender.MEN, event_id="H_HAMBURG25_OVERALL",
+                            race=Race(name="2025 Hamburg", season=season))
+        session.add(division)
+        session.commit()
+        division_id = division.id
+    engine.dispose()
+    return division_id
+
+
+def stored(db_uri: str) -> dict:
+    """result_key -> vanished of every stored result."""
+    engine = create_engine(db_uri)
+    with Session(engine) as session:
+        results = dict(session.execute(select(Result.result_key, Result.vanished_at.is_not(None))).all())
+    engine.dispose()
+    return results
+
+
+async def crawl(db_uri: str, division_id: int, *pages) -> AsyncWriter:
+    """
+    Queues every page at once, like a crawler faster than the writer, then finishes the division.
+    The outcomes of the pages and the finish end up in writer.outcomes.
+    """
+    engine = await init_async_db(db_uri)
+    async with AsyncWriter(engine) as writer:
+        queued = [await writer.queue_results(division_id, rows_info) for rows_info in pages]
+        writer.outcomes = await asyncio.gather(*queued, return_exceptions=True)
+        writer.outcomes.append(await writer.finish_division(division_id))
+    await engine.dispose()
+    return writer
+
+
+def test_queued_pages_are_committed_in_one_batch(db_uri, division_id):
+    writer = asyncio.run(crawl(db_uri, division_id, PAGE[:2], PAGE[2:]))
+
+    # Both pages in one batch, the finish in the next
+    assert writer.counts == {'batches': 2, 'writes': 3, 'results': 3}
+    assert writer.outcomes == [2, 1, {'inserted': 3, 'updated': 0, 'unchanged': 0, 'vanished': 0}]
+    assert stored(db_uri) == {"IDP1": False, "IDP2": False, "IDP3": False}
+
+
+def test_failed_batch_is_rolled_back_without_flagging_vanished_results(db_uri, division_id):
+    asyncio.run(crawl(db_uri, division_id, PAGE))
+    newcomer = row(4, "Moe, Max", "01:10:00", "IDP4")
+    broken = dict(row(5, "Loe, Lisa", "01:11:00", "IDP5"))
+    del broken['fullname']
+
+    # The second page fails the whole batch, including the newcomer of the first page
+    writer = asyncio.run(crawl(db_uri, division_id, [PAGE[0], newcomer], [broken]))
+
+    assert [type(outcome) for outcome in writer.outcomes[:2]] == [KeyError, KeyError]
+    # The crawl lost pages: IDP2 and IDP3 were not listed, but are not flagged as vanished
+    assert writer.counts == {'batches': 1, 'writes': 1, 'results': 0}
+    assert stored(db_uri) == {"IDP1": False, "IDP2": False, "IDP3": False}
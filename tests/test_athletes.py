@@ -0,0 +1,58 @@
+from sqlalchemy import select
+
+from athletes import resolve_athletes, age_group_floor
+from helpers import row, crawl
+from models import Season, Race, Division, Result
+from models.division import DivisionName, Gender
+
+
+def add_division(session, season_number: int, race_name: str, name: DivisionName = DivisionName.HYROX) -> Division:
+    season = session.scalar(select(Season).where(Season.number == season_number)) or Season(
+        name=f"Season {season_number}", number=season_number,
+        results_url=f"https://results.hyrox.com/season-{season_number}/")
+    race = session.scalar(select(Race).where(Race.name == race_name)) or Race(name=race_name, season=season)
+    division = Division(division=name, gender=Gender.MEN, race=race, event_id=f"{name.name}_{race_name}_OVERALL")
+    session.add(division)
+    session.commit()
+    return division
+
+
+def athletes_by_age_group(session) -> dict:
+    """age group -> athlete ids of John Doe's results, in resolving order."""
+    athletes = {}
+    for age_group, athlete_id in session.execute(select(Result.age_group, Result.athlete_id).order_by(Result.id)):
+        athletes.setdefault(age_group, []).append(athlete_id)
+    return athletes
+
+
+def test_age_group_floor():
+    assert [age_group_floor(label) for label in ("30-34", "70+", "U24", "", None)] == [30, 70, 0, None, None]
+
+
+def test_one_athlete_may_start_in_several_divisions_of_a_race(session):
+    single = add_division(session, 8, "2025 Hamburg")
+    doubles = add_division(session, 8, "2025 Hamburg", DivisionName.HYROX_DOUBLES)
+    crawl(session, single, [row(1, "Doe, John", "00:58:01", "IDP1")])
+    crawl(session, doubles, [row(1, "Doe, John", "00:52:10", "IDP2")])
+
+    counts = resolve_athletes(session)
+
+    assert counts == {'resolved_results': 2, 'new_athletes': 1}
+
+
+def test_namesakes_in_one_division_are_told_apart_by_age_group(session):
+    first_race = add_division(session, 7, "2024 Berlin")
+    crawl(session, first_race, [row(1, "Doe, John", "00:58:01", "IDP1", age_group="30-34"),
+                                row(2, "Doe, John", "01:02:30", "IDP2", age_group="50-54")])
+    resolve_athletes(session)
+    next_race = add_division(session, 8, "2025 Hamburg")
+    crawl(session, next_race, [row(1, "Doe, John", "00:57:10", "IDP3", age_group="50-54"),
+                               row(2, "Doe, John", "01:01:00", "IDP4", age_group="35-39")])
+
+    counts = resolve_athletes(session)
+
+    assert counts == {'resolved_results': 2, 'new_athletes': 0}
+    athletes = athletes_by_age_group(session)
+    assert athletes["30-34"] == athletes["35-39"]
+    assert athletes["50-54"][0] == athletes["50-54"][1]
+    assert athletes["30-34"] != athletes["50-54"]
@@ -0,0 +1,23 @@
+from click.testing import CliRunner
+
+import metrics
+from scrape_cli import cli, report_metrics
+
+
+def test_help_prints_no_metrics_summary():
+    result = CliRunner().invoke(cli, ['sync', '--help'])
+
+    assert result.exit_code == 0
+    assert "Crawl metrics" not in result.output + result.stderr
+
+
+def test_metrics_summary_goes_to_stderr(capsys):
+    metrics.reset()
+    metrics.HTTP_REQUESTS.inc(endpoint="result_list", status=200)
+
+    report_metrics(None)
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "hyrox_http_requests_total" in captured.err
+    metrics.reset()
@@ -0,0 +1,24 @@
+from web_scraping import client
+
+
+def test_requests_are_spaced_by_the_politeness_delay(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(client, 'POLITENESS_DELAY_S', 0.5)
+    monkeypatch.setattr(client, '_next_request_at', 0.0)
+    monkeypatch.setattr(client.time, 'monotonic', lambda: 100.0)
+    monkeypatch.setattr(client.time, 'sleep', sleeps.append)
+
+    for _ in range(3):
+        client.wait_for_turn()
+
+    assert sleeps == [0.5, 1.0]
+
+
+def test_no_delay_turns_the_limit_off(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(client, 'POLITENESS_DELAY_S', 0)
+    monkeypatch.setattr(client.time, 'sleep', sleeps.append)
+
+    client.wait_for_turn()
+
+    assert sleeps == []
@@ -0,0 +1,48 @@
+from sqlalchemy import insert, select, text
+
+from helpers import DETAIL_LINK
+from migrations import migrate_detail_links, LEGACY_DETAIL_LINKS_TABLE
+from models import Result
+
+
+def add_result(session, division, rank: int, idp) -> Result:
+    result = Result(age_group_id=None, rank_overall=rank, rank_age_group=rank, full_name="Doe, John",
+                    nation_id=None, total_time_ms=3_600_000 + rank, idp=idp)
+    result.division = division
+    session.add(result)
+    session.commit()
+    return result
+
+
+def test_link_is_built_from_the_stored_season_url(session, division):
+    division.race.season.results_url = "http://mirror.example/season-8/"
+    result = add_result(session, division, 1, "IDP1")
+    session.expire_all()
+
+    assert session.get(Result, result.id).link_to_detail_page == (
+        "http://mirror.example/season-8/?content=detail&fpid=list&pid=list&idp=IDP1&lang=EN_CAP"
+        "&event=H_HAMBURG25_OVERALL")
+
+
+def test_result_without_idp_has_no_link(session, division):
+    assert add_result(session, division, 1, None).link_to_detail_page is None
+
+
+def test_migration_keeps_links_without_idp(session, division):
+    session.execute(text("ALTER TABLE results ADD COLUMN link_to_detail_page VARCHAR"))
+    broken_link = "https://results.hyrox.com/season-8/?content=detail&lang=EN_CAP"
+    session.execute(insert(Result), [
+        {'division_id': division.id, 'rank_overall': rank, 'rank_age_group': rank, 'total_time_ms': rank}
+        for rank in (1, 2)])
+    session.execute(text("UPDATE results SET link_to_detail_page = :link WHERE rank_overall = 1"),
+                    {'link': DETAIL_LINK.format(idp="IDP1")})
+    session.execute(text("UPDATE results SET link_to_detail_page = :link WHERE rank_overall = 2"),
+                    {'link': broken_link})
+
+    migrate_detail_links(session.connection())
+
+    assert session.execute(select(Result.rank_overall, Result.idp).order_by(Result.rank_overall)).all() == [
+        (1, "IDP1"), (2, None)]
+    kept = session.execute(text(f"SELECT r.rank_overall, l.link FROM {LEGACY_DETAIL_LINKS_TABLE} l "
+                                f"JOIN results r ON r.id = l.result_id")).all()
+    assert kept == [(2, broken_link)]
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers import row
+from web_scraping import pipeline, sync, tail
+from web_scraping.fingerprints import page_fingerprint, probe_page
+from web_scraping.pipeline import ScrapePipeline
+from web_scraping.sync import SyncPipeline
+from web_scraping.tail import poll_division
+
+PAGE_SIZE = 3
+
+
+class FakeResultList:
+    """The result list of one division, served PAGE_SIZE rows per page; counts the page requests."""
+
+    def __init__(self, results: int):
+        self.rows = [self.result(rank) for rank in range(1, results + 1)]
+        self.requests = []
+
+    @staticmethod
+    def result(rank: int, name: str = "") -> dict:
+        return row(rank, name or f"Athlete {rank}", f"01:{rank:02d}:00", f"IDP{name or rank}")
+
+    def append(self):
+        self.rows.append(self.result(len(self.rows) + 1))
+
+    def insert(self, rank: int):
+        """A late finisher at `rank`: everyone from there on moves down one rank."""
+        self.rows.insert(rank - 1, self.result(rank, name="Late"))
+        for new_rank, shifted in enumerate(self.rows[rank:], start=rank + 1):
+            shifted['rank_overall'] = shifted['rank_age_group'] = new_rank
+
+    def pages(self) -> tuple:
+        """(fingerprint, row count) of every page, as stored after a complete crawl."""
+        return tuple((page_fingerprint(rows_info), len(rows_info)) for rows_info in self._pages())
+
+    def _pages(self) -> list:
+        return [self.rows[start:start + PAGE_SIZE] for start in range(0, len(self.rows), PAGE_SIZE)]
+
+    def fetch(self, season_number, division, page: int) -> list:
+        self.requests.append(page)
+        pages = self._pages()
+        return [dict(row_info) for row_info in pages[page - 1]] if page <= len(pages) else []
+
+
+@pytest.fixture
+def result_list(monkeypatch) -> FakeResultList:
+    fake = FakeResultList(8)
+    for module in (pipeline, sync, tail):
+        monkeypatch.setattr(module, 'fetch_results_page', fake.fetch)
+    return fake
+
+
+# --- probe_page ---
+
+def test_probe_page_is_the_last_page_or_the_next_one_if_it_is_full():
+    assert probe_page([100, 100, 37]) == 3
+    assert probe_page([100, 100]) == 3
+    assert probe_page([37]) == 1
+    assert probe_page([100]) == 2
+    assert probe_page([]) == 0
+
+
+# --- poll_division ---
+
+def poll(result_list: FakeResultList, pages: tuple):
+    result_list.requests.clear()
+    return poll_division(8, None, pages)
+
+
+def test_poll_without_changes_downloads_only_the_probe_page(result_list):
+    result = poll(result_list, result_list.pages())
+
+    assert result.changed_pages == {}
+    assert result.pages == list(result_list.pages())
+    assert result_list.requests == [3]
+    assert result.requests == 1
+
+
+def test_poll_finds_an_appended_result_on_the_last_page(result_list):
+    known = result_list.pages()
+    result_list.append()
+
+    result = poll(result_list, known)
+
+    assert sorted(result.changed_pages) == [3]
+    assert result.pages == list(result_list.pages())
+    # Probe page, binary search (page 2 unchanged), then up to the first empty page
+    assert result_list.requests == [3, 2, 4]
+    assert result.requests == 3
+
+
+def test_poll_finds_the_first_page_of_a_rank_inserted_mid_list(result_list):
+    known = result_list.pages()
+    result_list.insert(rank=5)
+
+    result = poll(result_list, known)
+
+    assert sorted(result.changed_pages) == [2, 3]
+    assert result.pages == list(result_list.pages())
+    assert result_list.requests == [3, 2, 1, 4]
+    assert result.requests == 4
+
+
+def test_poll_of_a_full_last_page_probes_the_next_page(result_list):
+    result_list.append()
+    known = result_list.pages()
+
+    unchanged = poll(result_list, known)
+    assert (unchanged.changed_pages, result_list.requests) == ({}, [4])
+
+    result_list.append()
+    result = poll(result_list, known)
+
+    assert sorted(result.changed_pages) == [4]
+    assert result.pages == list(result_list.pages())
+    assert result_list.requests == [4, 2, 3, 5]
+    assert result.requests == 4
+
+
+def test_first_poll_downloads_every_page(result_list):
+    result = poll(result_list, ())
+
+    assert sorted(result.changed_pages) == [1, 2, 3]
+    assert result_list.requests == [1, 2, 3, 4]
+
+
+# --- SyncPipeline ---
+
+def run_results(crawler: ScrapePipeline, race) -> ScrapePipeline:
+    """Runs only the results stage of the race (no season, race or division downloads)."""
+    crawler._seed = lambda: crawler._queue_results(race)
+    crawler.run()
+    return crawler
+
+
+def run_sync(session, result_list: FakeResultList, division, now: datetime) -> SyncPipeline:
+    result_list.requests.clear()
+    return run_results(SyncPipeline(session, recheck_after=timedelta(0), now=now), division.race)
+
+
+def test_sync_checks_two_pages_and_recrawls_only_changed_divisions(session, division, result_list):
+    run_results(ScrapePipeline(session, stages=('results',)), division.race)
+    assert result_list.requests == [1, 2, 3, 4]
+    scraped_at = division.scrape_state.last_fetched
+
+    unchanged = run_sync(session, result_list, division, scraped_at + timedelta(hours=1))
+    # Page 1 and the probe page match the fingerprints scrape-all stored
+    assert sorted(result_list.requests) == [1, 3]
+    assert (unchanged.unchanged, unchanged.counts['results']) == (1, 0)
+
+    result_list.append()
+    changed = run_sync(session, result_list, division, scraped_at + timedelta(hours=2))
+    # Check pages, then the rest of a full crawl; only the new result is inserted
+    assert sorted(result_list.requests) == [1, 2, 3, 3, 4]
+    assert (changed.unchanged, changed.counts['results']) == (0, 1)
+    assert division.scrape_state.last_changed == scraped_at + timedelta(hours=2)
+
+
+def test_sync_skips_recently_checked_and_final_divisions(session, division, result_list):
+    run_results(ScrapePipeline(session, stages=('results',)), division.race)
+    scraped_at = division.scrape_state.last_fetched
+
+    result_list.requests.clear()
+    recent = run_results(SyncPipeline(session, now=scraped_at + timedelta(hours=1)), division.race)
+    assert (recent.skipped['divisions'], result_list.requests) == (1, [])
+
+    # Unchanged for final_after: checked once more, then final
+    run_sync(session, result_list, division, scraped_at + sync.DEFAULT_FINAL_AFTER)
+    assert sorted(result_list.requests) == [1, 3]
+    final = run_sync(session, result_list, division, scraped_at + sync.DEFAULT_FINAL_AFTER + timedelta(days=1))
+    assert (final.skipped['divisions'], result_list.requests) == (1, [])
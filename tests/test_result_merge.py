@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from helpers import row, crawl
+from models import Result
+from web_scraping.result_summaries import ResultMerge
+
+PAGE = [
+    row(1, "Doe, John", "00:58:01", "IDP1"),
+    row(2, "Roe, Richard", "01:02:30", "IDP2"),
+    row(3, "Poe, Edgar", "01:05:12", "IDP3"),
+]
+
+
+def stored(session, division) -> dict:
+    """result_key -> (rank_overall, total_time_ms, vanished) of the division's results."""
+    return {key: (rank, time_ms, vanished_at is not None) for key, rank, time_ms, vanished_at in session.execute(
+        select(Result.result_key, Result.rank_overall, Result.total_time_ms, Result.vanished_at)
+        .where(Result.division_id == division.id))}
+
+
+def test_first_crawl_inserts_every_result(session, division):
+    counts = crawl(session, division, PAGE)
+
+    assert counts == {'inserted': 3, 'updated': 0, 'unchanged': 0, 'vanished': 0}
+    assert set(stored(session, division)) == {"IDP1", "IDP2", "IDP3"}
+
+
+def test_recrawl_updates_only_the_changed_row(session, division):
+    crawl(session, division, PAGE)
+    corrected = [PAGE[0], row(2, "Roe, Richard", "01:01:59", "IDP2"), PAGE[2]]
+
+    counts = crawl(session, division, corrected)
+
+    assert counts == {'inserted': 0, 'updated': 1, 'unchanged': 2, 'vanished': 0}
+    assert stored(session, division)["IDP2"] == (2, 3_719_000, False)
+    assert session.query(Result).filter(Result.division_id == division.id).count() == 3
+
+
+def test_result_that_disappears_is_flagged_and_cleared_when_it_comes_back(session, division):
+    crawl(session, division, PAGE)
+
+    counts = crawl(session, division, PAGE[:2])
+    assert counts['vanished'] == 1
+    assert stored(session, division)["IDP3"][2] is True
+
+    counts = crawl(session, division, PAGE)
+    assert counts == {'inserted': 0, 'updated': 1, 'unchanged': 2, 'vanished': 0}
+    assert not any(vanished for _, _, vanished in stored(session, division).values())
+
+
+def test_empty_crawl_leaves_the_results_untouched(session, division):
+    crawl(session, division, PAGE)
+    before = stored(session, division)
+
+    counts = crawl(session, division, [])
+
+    assert counts == {'inserted': 0, 'updated': 0, 'unchanged': 0, 'vanished': 0}
+    assert stored(session, division) == before
+
+
+def test_results_stored_twice_before_keys_existed_are_collapsed(session, division):
+    # Two crawls before the merge stored every result twice and set no result_key
+    legacy = [{'division_id': division.id, 'rank_overall': rank, 'rank_age_group': rank, 'full_name': name,
+               'total_time_ms': time_ms, 'idp': idp, 'result_key': None}
+              for rank, name, time_ms, idp in [(1, "Doe, John", 3_481_000, "IDP1"),
+                                               (2, "Roe, Richard", 3_750_000, "IDP2")]]
+    session.execute(insert(Result), legacy + legacy)
+    session.commit()
+
+    merge = ResultMerge(session, division.id)
+    session.commit()
+
+    results = session.execute(select(Result.id, Result.result_key).where(Result.division_id == division.id)
+                              .order_by(Result.id)).all()
+    # The oldest copy of every result is kept and gets its key
+    assert [(result_id, key) for result_id, key in results] == [(1, "IDP1"), (2, "IDP2")]
+    # A crawl matches them by key instead of inserting them a third time
+    assert merge.merge_page(PAGE[:2]) == []
@@ -0,0 +1,18 @@
+from sqlalchemy import select
+
+from helpers import row, crawl
+from models import Result
+
+
+def test_parse_times_ms():
+    times = ["58:07", "01:02:03", "120:05", "58:07,25", "01:02:03.4", "1:100:05", "DNF", "", None]
+
+    assert Result.parse_times_ms(times) == [3_487_000, 3_723_000, 7_205_000, 3_487_250, 3_723_400,
+                                            None, None, None, None]
+
+
+def test_result_with_minutes_beyond_an_hour_is_stored(session, division):
+    counts = crawl(session, division, [row(1, "Doe, John", "120:05", "IDP1")])
+
+    assert counts['inserted'] == 1
+    assert session.scalar(select(Result.total_time_ms)) == 7_205_000
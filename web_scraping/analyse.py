@@ -1,26 +1,14 @@
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from db import init_db
 from models import *
-from models.associations import race_divisions
+from repository import get_season
+from reports import iter_division_frequencies, iter_races_with_counts, iter_divisions_with_counts
 
 
 def rank_most_frequent_divisions(session: Session):
-    races = session.query(Race).all()
-    divisions = session.query(Division).all()
-    div_example = divisions[0]
-
-    divisions = (
-        session.query(Division)
-        .outerjoin(race_divisions, Division.id == race_divisions.c.division_id)
-        .group_by(Division.id)
-        .order_by(func.count(race_divisions.c.race_id).desc())
-        .all()
-    )
-
-    for d in divisions:
-        print(d, len(d.races))
+    for division, gender, races, divisions, results in iter_division_frequencies(session):
+        print(division.value, gender.value, races, results)
 
 
 def list_seasons(session: Session):
@@ -30,30 +18,25 @@ def list_seasons(session: Session):
 
 
 def list_season_races(session: Session, season_number: int):
-    season = session.query(Season).filter(Season.number == season_number).first()
-    if not season:
+    if not session.query(Season.id).filter(Season.number == season_number).first():
         print(f"No season found with number {season_number}")
         return
-    races = session.query(Race).filter(Race.season_id == season.id).order_by(Race.name.asc()).all()
-    for race in races:
-        print(race)
+    list_races(session, season_number)
 
 
 def list_races(session: Session, season_number: int = None):
-    if season_number is not None:
-        list_season_races(session, season_number)
-    else:
-        # if no season number is provided, list all races for all seasons
-        seasons = session.query(Season).order_by(Season.number.asc()).all()
-        for season in seasons:
-            print(f"\nRaces for Season {season.number}: {season.name}")
-            list_season_races(session, season.number)
+    # if no season number is provided, list all races for all seasons (in one query)
+    current_season = None
+    for race, number, name, races_in_season, divisions, results in iter_races_with_counts(session, season_number):
+        if number != current_season:
+            current_season = number
+            print(f"\nRaces for Season {number}: {name}")
+        print(race)
 
 
 def list_divisions(session: Session, race: Race):
-    divisions = session.query(Division).filter(Division.race_id == race.id).order_by(Division.division.asc()).all()
-    for division in divisions:
-        print(division)
+    for division_id, division, gender, event_id, results in iter_divisions_with_counts(session, race.name):
+        print(division.value, gender.value, event_id, results)
 
 
 if __name__ == '__main__':
@@ -63,15 +46,15 @@ if __name__ == '__main__':
     # existing_race = session.query(Race).filter(Race.name == '2025 Stuttgart').first()
     # if existing_race:
     #     list_divisions(session, existing_race)
-    season = session.query(Season).filter(Season.number == 8).first()
+    season = get_season(session, 8, profile='divisions')
     for race in season.races:
         print(race.name)
         if not "Hamburg" in race.name:
             continue
-        print(race.divisions.all())
+        print(race.divisions)
         for d in race.divisions:
             print(f" - {d}")
-        print(f"Number of divisions: {len(race.divisions.all())}")
+        print(f"Number of divisions: {len(race.divisions)}")
         # if
     # rank_most_frequent_divisions(session)
     atlanta = session.query(Race).filter(Race.name == '2025 Atlanta').first()
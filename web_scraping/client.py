@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from typing import Callable, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# --- Configuration ---
+# Root of the results site. Can be pointed at a local fake (see benchmarks/macro.py).
+RESULTS_BASE_URL = os.environ.get("HYROX_RESULTS_URL", "https://results.hyrox.com").rstrip("/")
+
+# Minimum interval between two requests to the live site (seconds), shared by all threads (see request);
+# the sequential scrapers also pause this long between races/seasons. 0 turns the limit off.
+POLITENESS_DELAY_S = float(os.environ.get("HYROX_POLITENESS_DELAY", "2"))
+
+# Keep-alive connections per host kept open by each pooled session
+POOL_SIZE = 16
+
+# Callbacks run for every response (e.g. latency bookkeeping); signature: hook(response, *args, **kwargs)
+RESPONSE_HOOKS: List[Callable] = []
+# ---------------------
+
+_local = threading.local()
+# Earliest time.monotonic() the next request may be sent at
+_next_request_at = 0.0
+_rate_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the pooled requests.Session of the current thread.
+
+    Reusing one session keeps TCP/TLS connections alive between requests instead of
+    opening a new connection per call; sessions are per thread because they are not
+    safe to share between threads.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.hooks["response"].append(_run_response_hooks)
+        _local.session = session
+    return session
+
+
+def _run_response_hooks(response: requests.Response, *args, **kwargs):
+    for hook in RESPONSE_HOOKS:
+        hook(response, *args, **kwargs)
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Short, low-cardinality name of the site endpoint a request goes to (used as metrics label)."""
+    if "index.php" in url:
+        return "search_fields"
+    if method == "POST":
+        return "result_list"
+    return "season_index"
+
+
+def wait_for_turn():
+    """
+    Spaces the requests of all threads at least POLITENESS_DELAY_S apart: every caller reserves
+    the next free slot and sleeps until it, so parallel downloads are as polite as sequential ones.
+    """
+    global _next_request_at
+    if POLITENESS_DELAY_S <= 0:
+        return
+    with _rate_lock:
+        now = time.monotonic()
+        slot = max(now, _next_request_at)
+        _next_request_at = slot + POLITENESS_DELAY_S
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request through the pooled session (once the rate limit allows, see wait_for_turn)
+    and records its latency, status and size.
+    """
+    endpoint = endpoint_name(method, url)
+    wait_for_turn()
+    start = time.perf_counter()
+    try:
+        response = get_http_session().request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        metrics.HTTP_REQUESTS.inc(endpoint=endpoint, status="error")
+        raise
+    finally:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    metrics.HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    metrics.HTTP_BYTES.inc(len(response.content), endpoint=endpoint)
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def season_url(season_number: int) -> str:
+    return f"{RESULTS_BASE_URL}/season-{season_number}/"
+
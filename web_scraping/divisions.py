@@ -1,11 +1,16 @@
 from time import sleep
+from typing import List, Dict, Any
 
 import requests
 from requests import Session
 
+import metrics
+import profiling
 from db import init_db
-from models import Race, Season
+from models import Race
 from models.division import DivisionName, Gender, Division
+from repository import get_season
+from web_scraping import client
 
 
 def make_params(race_name: str = "",
@@ -29,7 +34,7 @@ def make_params(race_name: str = "",
 
 
 def get_base_url(season_number: int) -> str:
-    return f"https://results.hyrox.com/season-{season_number}/index.php"
+    return f"{client.season_url(season_number)}index.php"
 
 
 def get_events_from_response(json_response: dict) -> list:
@@ -51,9 +56,10 @@ def get_events(season_number: int, race_name: str) -> list:
     # requests handles the proper encoding (e.g., [b] becomes %5Bb%5D) for the URL.
     params = make_params(race_name=race_name)
 
+    events = []
     # 3. Send the GET request
     try:
-        response = requests.get(base_url, params=params)
+        response = client.get(base_url, params=params)
 
         # 4. Check if the request was successful
         response.raise_for_status()
@@ -76,60 +82,88 @@ def get_events(season_number: int, race_name: str) -> list:
     return events
 
 
-def make_divisions(season_number: int,
-                   race: Race,
-                   events: list,
-                   session: Session):
+def fetch_division_specs(season_number: int, race_name: str, events: list) -> List[Dict[str, Any]]:
+    """
+    Asks the site which sexes every event of a race has and returns the valid divisions
+    as {'division', 'gender', 'event_id'} dicts. Network only, no database access, so it
+    can run in worker threads.
+    """
+    specs = []
+    base_url = get_base_url(season_number)
     # 1. Loop over all events to get divisions
     for event in events:
         event_name = event.get('v')[1]
         event_id = event.get('v')[0]
-        base_url = get_base_url(season_number)
-        params = make_params(race_name=race.name,
+        division_name = DivisionName.from_string(event_name)
+        if not division_name:
+            continue
+        params = make_params(race_name=race_name,
                              event=event_id,
                              sex='M'
                              )
-        # 3. Send the GET request
+        # 2. Send the GET request
         try:
-            response = requests.get(base_url, params=params)
+            response = client.get(base_url, params=params)
             # Check if the request was successful
             response.raise_for_status()
-            # extract sexes from the JSON response
-            json = response.json()
-            sexes = get_sexes_from_response(json)
-            division_name = DivisionName.from_string(event_name)
-            if not division_name:
-                continue
-            for sex in sexes:
-                sex_name = sex.get('v')[1]
-                gender = Gender.from_string(sex_name)
-                if not gender:
-                    continue
-                if not Division.valid_combination(division_name, gender):
-                    print(f"Invalid combination: {division_name} + {gender}")
-                    continue
-                # check if division with division_name and gender already exists for this race
-                existing_division = session.query(Division).filter(
-                    Division.division == division_name,
-                    Division.gender == gender,
-                    Division.race_id == race.id).first()
-                if existing_division:
-                    print(f"Division already exists: {existing_division}")
-                    continue
-                new_division = Division(
-                    division=division_name,
-                    gender=gender,
-                    race_id=race.id,
-                    event_id=event_id
-                )
-                race.divisions.append(new_division)
-                session.add(new_division)
-                session.commit()
-                print(f"Added: {new_division}")
         except requests.exceptions.HTTPError as errh:
             print(f"❌ HTTP Error: {errh}")
-        finally:
+            continue
+        # 3. extract sexes from the JSON response
+        sexes = get_sexes_from_response(response.json())
+        for sex in sexes:
+            sex_name = sex.get('v')[1]
+            gender = Gender.from_string(sex_name)
+            if not gender:
+                continue
+            if not Division.valid_combination(division_name, gender):
+                print(f"Invalid combination: {division_name} + {gender}")
+                continue
+            specs.append({'division': division_name, 'gender': gender, 'event_id': event_id})
+    return specs
+
+
+def write_divisions(session: Session, race: Race, specs: List[Dict[str, Any]], commit: bool = True) -> List[Division]:
+    """
+    Stores the divisions from fetch_division_specs that the race does not have yet. Returns the new ones.
+
+    :param commit: If False, only flush: the caller owns the transaction.
+    """
+    # Divisions the race already has (one query at most, none if loaded with a repository.py profile)
+    existing_divisions = {(d.division, d.gender): d for d in race.divisions}
+    new_divisions = []
+    for spec in specs:
+        existing_division = existing_divisions.get((spec['division'], spec['gender']))
+        if existing_division:
+            print(f"Division already exists: {existing_division}")
+            continue
+        new_division = Division(
+            division=spec['division'],
+            gender=spec['gender'],
+            race_id=race.id,
+            event_id=spec['event_id']
+        )
+        race.divisions.append(new_division)
+        existing_divisions[(spec['division'], spec['gender'])] = new_division
+        session.add(new_division)
+        new_divisions.append(new_division)
+    if commit:
+        with metrics.DB_COMMIT_SECONDS.time(writer='divisions'):
             session.commit()
+    else:
+        session.flush()
+    metrics.ROWS_INSERTED.inc(len(new_divisions), table='divisions')
+    for new_division in new_divisions:
+        print(f"Added: {new_division}")
+    return new_divisions
+
+
+def make_divisions(season_number: int,
+                   race: Race,
+                   events: list,
+                   session: Session):
+    specs = fetch_division_specs(season_number, race.name, events)
+    write_divisions(session, race, specs)
 
 
 def scrape_divisions(season_number: int,
@@ -138,83 +172,94 @@ def scrape_divisions(season_number: int,
     if race is not None:
         races = [race]
     else:
-        season = session.query(Season).filter(Season.number == season_number).first()
-        races = season.races.all()
-    for r in races:
+        season = get_season(session, season_number, profile='divisions')
+        races = season.races
+    for i, r in enumerate(races):
+        metrics.QUEUE_DEPTH.set(len(races) - i, queue='races_without_divisions')
         print(f"Scraping divisions for race: {r.name}")
-        events = get_events(season_number, r.name)
-        events_filtered = filter_events(events)
-        make_divisions(season_number, r, events_filtered, session)
-        sleep(2)
+        with profiling.span('fetch_events'):
+            events = get_events(season_number, r.name)
+        with profiling.span('filter_events'):
+            events_filtered = filter_events(events)
+        with profiling.span('make_divisions'):
+            make_divisions(season_number, r, events_filtered, session)
+        sleep(client.POLITENESS_DELAY_S)
+    metrics.QUEUE_DEPTH.set(0, queue='races_without_divisions')
 
 
-def fix_known_mistakes(events: list) -> list:
+# --- Event Classification ---
+
+# Known naming mistakes on results.hyrox.com: event id -> corrected event name
+KNOWN_EVENT_NAME_FIXES = {
     # Berlin 2025: "HYROX PRO DOUBLES - OVERALL" is called "HYROX DOUBLES - OVERALL"
-    event_ids = [event.get('v')[0] for event in events]
-    if "HDP_BERLIN2025_OVERALL" in event_ids:
-        for event in events:
-            if event.get('v')[0] == "HDP_BERLIN2025_OVERALL":
-                event.get('v')[1] = "HYROX PRO DOUBLES - Overall"
-                print("  🛠️ Fixed known mistake in event name for HDP_BERLIN2025_OVERALL")
+    "HDP_BERLIN2025_OVERALL": "HYROX PRO DOUBLES - Overall",
     # Heerenveen 2025: "HYROX ADAPTIVE - Overall" is called "HYROX DOUBLES - Overall"
-    if "HA_HEERENVEEN25_OVERALL":
-        for event in events:
-            if event.get('v')[0] == "HA_HEERENVEEN25_OVERALL":
-                event.get('v')[1] = "HYROX ADAPTIVE - Overall"
-                print("  🛠️ Fixed known mistake in event name for HA_HEERENVEEN25_OVERALL")
+    "HA_HEERENVEEN25_OVERALL": "HYROX ADAPTIVE - Overall",
+}
+
+# All acceptable division names, longest first (also the order filtered events are returned in)
+DIVISIONS_BY_LENGTH = sorted((e.value for e in DivisionName), key=len, reverse=True)
+_DIVISION_NAMES = frozenset(DIVISIONS_BY_LENGTH)
+
+
+def fix_known_mistakes(events: list) -> list:
+    for event in events:
+        fixed_name = KNOWN_EVENT_NAME_FIXES.get(event.get('v')[0])
+        if fixed_name is not None and event.get('v')[1] != fixed_name:
+            event.get('v')[1] = fixed_name
+            print(f"  🛠️ Fixed known mistake in event name for {event.get('v')[0]}")
     return events
 
+
 def filter_events(events: list) -> list:
+    """
+    Reduces the events of a race to one event per division in a single pass.
+
+    Duplicate event ids are dropped, events that are not exactly a division name
+    (before the hyphen) are excluded, and every remaining event is classified to the
+    longest division name it contains. Multi-day divisions keep only their "Overall" event;
+    a division without exactly one is reported (metrics.INTEGRITY_FINDINGS) and left out.
+    """
     events = fix_known_mistakes(events)
-    # check duplicates
-    event_ids = [event.get('v')[0] for event in events]
-    if len(event_ids) != len(set(event_ids)):
-        events_no_duplicates = []
-        for event in events:
-            id = event.get("v")[0]
-            if not any(e.get("v")[0] == id for e in events_no_duplicates):
-                events_no_duplicates.append(event)
-        events = events_no_duplicates
+
+    seen_event_ids = set()
+    events_by_division = {}
+    for event in events:
+        event_id, event_name = event.get('v')[0], event.get('v')[1]
+        # check duplicates
+        if event_id in seen_event_ids:
+            continue
+        seen_event_ids.add(event_id)
+        # only exact matches remain: this will remove stuff like "HYROX TEAM-CHALLANGE"
+        # but keep "HYROX PRO - Overall" and "HYROX PRO - Friday"
+        event_name_stripped = event_name.split("-")[0].strip()  # remove anything after a hyphen
+        if event_name_stripped not in _DIVISION_NAMES:
+            print(f"  ⚠️ Warning: Unmatched event found and excluded: {event_name}")
+            continue
+        division = DivisionName.from_string(event_name)
+        events_by_division.setdefault(division.value, []).append(event)
 
     # Filter out daily events if they are present (Multi-day events)
     # Keep only "Overall" events
     # BUT!!! Sometimes, events/divisions have also a weekday in them, when there's only one day of that division...
     filtered_events = []
-    # Get all acceptable division names
-    possible_divisions = [e.value for e in DivisionName]
-    # sort by length descending
-    possible_divisions = sorted(possible_divisions, key=len, reverse=True)
-    # clean the events list so only exact matches remain
-    # this will remove stuff like "HYROX TEAM-CHALLANGE"
-    # but keep "HYROX PRO - Overall" and "HYROX PRO - Friday"
-    clean_events = []
-    for event in events:
-        event_name = event.get('v')[1]
-        event_name_stripped = event_name.split("-")[0].strip()  # remove anything after a hyphen
-        if event_name_stripped not in possible_divisions:
-            continue
-        clean_events.append(event)
-    # give a warning for present unmatched events (in case there are some)
-    if len(clean_events) < len(events):
-        unmatched_events = [event for event in events if event not in clean_events]
-        for unmatched_event in unmatched_events:
-            print(f"  ⚠️ Warning: Unmatched event found and excluded: {unmatched_event.get('v')[1]}")
-    events = clean_events
-    for division in possible_divisions:
-        existing_events_for_division = [event for event in events if division in event.get('v')[1]]
-        if len(existing_events_for_division) == 0:
+    for division in DIVISIONS_BY_LENGTH:
+        existing_events_for_division = events_by_division.get(division)
+        if not existing_events_for_division:
             continue
         if len(existing_events_for_division) == 1:
             filtered_events.append(existing_events_for_division[0])
-        if len(existing_events_for_division) > 1:
-            # look for the "Overall" event_id (event name can be corrupt like Rimini 2025 HYROX PRO DOUBLE SATURDAY (exists twice, but one is overall)
-            overall_events = [event for event in existing_events_for_division if "overall" in event.get('v')[0].lower()]
-            if len(overall_events) != 1:
-                raise ValueError(
-                    f"Expected exactly one 'Overall' event for division '{division}', but found {len(overall_events)}: {overall_events}")
-            filtered_events.append(overall_events[0])
-        # remove the events so they don't get queried again
-        [events.remove(event) for event in existing_events_for_division]
+            continue
+        # look for the "Overall" event_id (event name can be corrupt like Rimini 2025 HYROX PRO DOUBLE SATURDAY (exists twice, but one is overall)
+        overall_events = [event for event in existing_events_for_division if "overall" in event.get('v')[0].lower()]
+        if len(overall_events) != 1:
+            # Report it and skip the division instead of guessing (or failing the whole race)
+            metrics.INTEGRITY_FINDINGS.inc(check='ambiguous_overall_event')
+            print(f"  ⚠️ Warning: Expected exactly one 'Overall' event for division '{division}', but found "
+                  f"{len(overall_events)}: {[event.get('v') for event in existing_events_for_division]}. "
+                  f"Division skipped.")
+            continue
+        filtered_events.append(overall_events[0])
     return filtered_events
 
 
@@ -223,7 +268,7 @@ def example_scrape_specific_race(race_name: str):
     existing_race = session.query(Race).filter(Race.name == race_name).first()
 
     # remove existing divisions
-    divisions = existing_race.divisions.all()
+    divisions = list(existing_race.divisions)
     print(f"Found {len(divisions)} divisions")
     for division in divisions:
         print(division)
@@ -236,7 +281,7 @@ def example_scrape_specific_race(race_name: str):
                      race=existing_race
                      )
 
-    divisions = existing_race.divisions.all()
+    divisions = existing_race.divisions
     print(f"After scraping, found {len(divisions)} divisions")
     for division in divisions:
         print(division)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Sequence, Tuple
+
+from models import Division, Result, PageFingerprint
+
+# Rows per result page requested by make_params
+RESULTS_PER_PAGE = 100
+
+
+def normalize_rows(rows_info: list) -> list:
+    """The fields of parsed result rows that identify their content (the link only by its result key)."""
+    return [
+        (Result.make_key(Result.parse_idp(row_info['detailed_results_page_link']), row_info['rank_overall'],
+                         row_info['fullname']),
+         row_info['rank_overall'], row_info['rank_age_group'], row_info['age_group'], row_info['fullname'],
+         row_info['nation_abbreviation'], row_info['total_time'])
+        for row_info in rows_info
+    ]
+
+
+def page_fingerprint(rows_info: list) -> str:
+    """sha256 of the normalized rows of a result page (parsed, so markup-only changes do not count)."""
+    payload = json.dumps(normalize_rows(rows_info), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def last_page_full(row_counts: Sequence[int]) -> bool:
+    """Whether new results would open a new page, given the row count of every page of a division."""
+    if not row_counts:
+        return False
+    # Every page but the last one is full; a single page is only full with a whole page of rows
+    page_size = row_counts[0] if len(row_counts) > 1 else RESULTS_PER_PAGE
+    return row_counts[-1] >= page_size
+
+
+def probe_page(row_counts: Sequence[int]) -> int:
+    """
+    The page that shows whether results were added to a division: its last page, or the page
+    after it if the last page is full.
+
+    Example:
+        probe_page([100, 100, 37])  # 3
+        probe_page([100, 100])  # 3
+    """
+    return len(row_counts) + 1 if last_page_full(row_counts) else len(row_counts)
+
+
+def save_page_fingerprints(division: Division, pages: Sequence[Tuple[str, int]], now: datetime) -> int:
+    """
+    Replaces the stored page fingerprints of a division with those of a complete crawl.
+
+    :param pages: (fingerprint, row count) of every page, in page order.
+    :return: The number of pages that were added, changed or removed.
+    """
+    stored = {page_fingerprint.page: page_fingerprint for page_fingerprint in division.page_fingerprints}
+    changed = 0
+    for page, (fingerprint, row_count) in enumerate(pages, start=1):
+        stored_page = stored.pop(page, None)
+        if stored_page is None:
+            stored_page = PageFingerprint(page=page, fingerprint=fingerprint, row_count=row_count, last_changed=now)
+            division.page_fingerprints.append(stored_page)
+            changed += 1
+        elif stored_page.fingerprint != fingerprint:
+            stored_page.fingerprint = fingerprint
+            stored_page.row_count = row_count
+            stored_page.last_changed = now
+            changed += 1
+        stored_page.last_fetched = now
+    for stored_page in stored.values():
+        division.page_fingerprints.remove(stored_page)
+        changed += 1
+    return changed
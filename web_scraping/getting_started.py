@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from time import sleep
 
 from selenium import webdriver
@@ -10,27 +10,28 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from db import init_db
-from models.division import create_main_divisions
-from web_scraping.scrape_divisions import scrape_divisions
-from web_scraping.scrape_races import scrape_races
-from web_scraping.scrape_seasons import scrape_seasons
+from models import Result
+from web_scraping.pipeline import ScrapePipeline
 from web_scraping.util import get_select
 
 
+def ms_to_time(time_ms: int | None) -> time | None:
+    if time_ms is None:
+        return None
+    return (datetime.min + timedelta(milliseconds=time_ms)).time()
+
+
 def get_split_data_from_row(row) -> dict:
     split_name = row.find_element(By.TAG_NAME, "th").text
     times = row.find_elements(By.TAG_NAME, "td")
 
-    time_of_day = datetime.strptime(times[0].text, "%H:%M:%S")
-    elapsed_time = datetime.strptime(times[1].text, "%H:%M:%S")
-    time_diff_as_datetime = datetime.strptime(times[2].text, "%M:%S")
-    time_diff = timedelta(hours=time_diff_as_datetime.hour, minutes=time_diff_as_datetime.minute,
-                          seconds=time_diff_as_datetime.second)
+    # time of day, elapsed time and diff parsed in one batch (missing gates come back as None)
+    time_of_day_ms, elapsed_ms, time_diff_ms = Result.parse_times_ms([t.text for t in times[:3]])
     split = {
         "split_name": split_name,
-        "time_of_day": time_of_day.time(),
-        "time": elapsed_time.time(),
-        "time_diff": time_diff
+        "time_of_day": ms_to_time(time_of_day_ms),
+        "time": ms_to_time(elapsed_ms),
+        "time_diff": timedelta(milliseconds=time_diff_ms) if time_diff_ms is not None else None
     }
     return split
 
@@ -183,10 +184,8 @@ def get_season_events(season_tuple):
 
 if __name__ == '__main__':
     session = init_db()
-    create_main_divisions(session=session)
-    scrape_seasons(session=session)  # Get all seasons from results.hyrox.com
-    scrape_races(session=session)
-    scrape_divisions(session=session)
+    # Seasons -> races -> divisions -> results (same as `python scrape_cli.py scrape-all`)
+    ScrapePipeline(session).run()
 
     foo = 1
 
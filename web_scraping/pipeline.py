@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+from sqlalchemy import select, exists, func
+from sqlalchemy.orm import Session
+
+import metrics
+from integrity import report_division_findings
+from models import Race, Division, Result, RaceScrapeState, DivisionScrapeState
+from repository import get_seasons, get_season, get_races
+from rows import DivisionRow
+from web_scraping.divisions import get_events, filter_events, fetch_division_specs, write_divisions
+from web_scraping.fingerprints import page_fingerprint, save_page_fingerprints
+from web_scraping.races import get_races as fetch_races, update_races_in_db
+from web_scraping.result_summaries import fetch_results_page, store_results_page, ResultMerge
+from web_scraping.seasons import scrape_hyrox_seasons, update_seasons_in_db
+
+# Pipeline stages in order; every stage is fed by the items its parent stage wrote
+STAGES = ('seasons', 'races', 'divisions', 'results')
+
+DEFAULT_WORKERS = 4
+
+
+class ScrapePipeline:
+    """
+    Streaming seasons -> races -> divisions -> results crawl.
+
+    Worker threads only download and parse (no database access). The calling thread is the
+    single database writer: it stores every finished download and immediately queues the
+    downloads of its children, so all stages overlap instead of running one after another.
+    Stages left out of `stages` are read from the database instead of scraped.
+
+    A division whose last page was stored gets a DivisionScrapeState and is not crawled again;
+    one that lost a page download keeps no state, so the next run crawls it again. Races record
+    when their division list was fetched (RaceScrapeState) and divisions the fingerprints of
+    their pages (PageFingerprint), so a later sync only checks what can have changed.
+
+    Example:
+        ScrapePipeline(session, workers=8, season_numbers=[8], stages=('divisions', 'results')).run()
+    """
+
+    # Loading profile (repository.py) of the season whose races were just stored
+    season_profile = 'races'
+
+    def __init__(self,
+                 session: Session,
+                 workers: int = DEFAULT_WORKERS,
+                 season_numbers: Optional[Iterable[int]] = None,
+                 stages: Sequence[str] = STAGES):
+        self.session = session
+        self.workers = workers
+        self.season_numbers = set(season_numbers) if season_numbers else None
+        self.stages = [stage for stage in STAGES if stage in stages]
+        self.counts = {stage: 0 for stage in self.stages}
+        self.failures = 0
+        self.now = datetime.now()
+        # Divisions left without their last page (a page download failed)
+        self.unfinished: List[Division] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Future, Tuple[str, object]] = {}
+        self._divisions: Dict[int, Division] = {}
+        self._merges: Dict[int, ResultMerge] = {}
+        # (fingerprint, row count) of every page stored so far, per division
+        self._page_fingerprints: Dict[int, List[Tuple[str, int]]] = {}
+
+    # --- Scheduling ---
+
+    def run(self) -> Dict[str, int]:
+        """Runs the crawl to completion. Returns the number of items written per stage."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scrape') as executor:
+            self._executor = executor
+            self._seed()
+            while self._pending:
+                done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, context = self._pending.pop(future)
+                    try:
+                        payload = future.result()
+                    except (requests.exceptions.RequestException, ValueError) as err:
+                        self.failures += 1
+                        print(f"  ❌ {stage} download failed for {context}: {err}")
+                        continue
+                    getattr(self, f"_store_{stage}")(context, payload)
+                metrics.QUEUE_DEPTH.set(len(self._pending), queue='pipeline_downloads')
+        self._report_unfinished()
+        return self.counts
+
+    def _report_unfinished(self):
+        # Their merges are dropped unfinished: the results of a partial crawl are never flagged as vanished
+        self.unfinished = list(self._divisions.values())
+        self._divisions.clear()
+        self._merges.clear()
+        self._page_fingerprints.clear()
+        if self.unfinished:
+            print(f"  ⚠️ {len(self.unfinished)} division(s) unfinished after failed downloads; the next run crawls them again:")
+            for division in self.unfinished:
+                print(f"    - {division.race.name}: {division.division.value} {division.gender.value} "
+                      f"(id: {division.event_id})")
+
+    def _submit(self, stage: str, context, download: Callable, *args):
+        if stage in self.stages:
+            self._pending[self._executor.submit(download, *args)] = (stage, context)
+
+    def _wanted(self, season_number: int) -> bool:
+        return self.season_numbers is None or season_number in self.season_numbers
+
+    def _seed(self):
+        """Queues the first stage, with its parents read from the database."""
+        first_stage = self.stages[0]
+        if first_stage == 'seasons':
+            self._submit('seasons', 'index', scrape_hyrox_seasons)
+        elif first_stage == 'races':
+            self._queue_races(season.number for season in get_seasons(self.session))
+        elif first_stage == 'divisions':
+            for race in get_races(self.session):
+                if self._wanted(race.season.number):
+                    self._queue_divisions(race)
+        else:
+            for race in get_races(self.session):
+                if self._wanted(race.season.number):
+                    self._queue_results(race)
+
+    def _queue_races(self, season_numbers: Iterable[int]):
+        for season_number in season_numbers:
+            if self._wanted(season_number):
+                self._submit('races', season_number, fetch_races, season_number)
+
+    def _queue_divisions(self, race: Race):
+        self._submit('divisions', (race.id, race.name), download_division_specs, race.season.number, race.name)
+
+    def _queue_results(self, race: Race):
+        for division in self._divisions_to_scrape(race):
+            # The session only holds weak references: keep the division until its last page is stored
+            self._divisions[division.id] = division
+            # Workers get a plain tuple, never the ORM object
+            division_row = DivisionRow(division.id, division.race_id, division.division, division.gender,
+                                       division.event_id)
+            self._queue_first_page(division, division_row, race.season.number)
+
+    def _queue_first_page(self, division: Division, division_row: DivisionRow, season_number: int):
+        self._submit('results', (division_row, season_number, 1),
+                     fetch_results_page, season_number, division_row, 1)
+
+    def _divisions_to_scrape(self, race: Race) -> Iterable[Division]:
+        # Only divisions that were not crawled to their last page yet (see _record_scrape_state);
+        # divisions with some results are crawled again and merged (ResultMerge)
+        completed = exists().where(DivisionScrapeState.division_id == Division.id)
+        return self.session.scalars(select(Division).where(Division.race_id == race.id, ~completed))
+
+    # --- Writers (calling thread only) ---
+
+    def _store_seasons(self, context, scraped_seasons: list):
+        update_seasons_in_db(self.session, scraped_seasons)
+        self.counts['seasons'] += len(scraped_seasons)
+        self._queue_races(season['number'] for season in scraped_seasons)
+
+    def _store_races(self, season_number: int, race_groups: Optional[list]):
+        if not race_groups:
+            print(f"  ⚠️ No races found for Season {season_number}.")
+            return
+        season = get_season(self.session, season_number, profile=self.season_profile)
+        if season is None:
+            print(f"  ❌ Season {season_number} is not in the database; scrape the seasons first.")
+            return
+        update_races_in_db(self.session, season, race_groups)
+        self.counts['races'] += len(race_groups)
+        scraped_names = {race_group['name'] for race_group in race_groups}
+        for race in season.races:
+            if race.name in scraped_names:
+                self._queue_divisions(race)
+
+    def _store_divisions(self, context, specs: list):
+        race_id, race_name = context
+        race = self.session.get(Race, race_id)
+        self.counts['divisions'] += len(write_divisions(self.session, race, specs, commit=False))
+        if race.scrape_state is None:
+            race.scrape_state = RaceScrapeState()
+        race.scrape_state.last_fetched = self.now
+        race.scrape_state.division_count = len(race.divisions)
+        with metrics.DB_COMMIT_SECONDS.time(writer='divisions'):
+            self.session.commit()
+        self._queue_results(race)
+
+    def _store_results(self, context, rows_info: list):
+        division_row, season_number, page = context
+        division = self._divisions[division_row.id]
+        if not rows_info:
+            self._finish_division(division, page - 1)
+            return
+        if division.id not in self._merges:
+            self._merges[division.id] = ResultMerge(self.session, division.id)
+        self._page_fingerprints.setdefault(division.id, []).append((page_fingerprint(rows_info), len(rows_info)))
+        self.counts['results'] += store_results_page(self.session, self._merges[division.id], rows_info)
+        self._submit('results', (division_row, season_number, page + 1),
+                     fetch_results_page, season_number, division_row, page + 1)
+
+    def _finish_division(self, division: Division, pages: int):
+        self._divisions.pop(division.id, None)
+        merge = self._merges.pop(division.id, None)
+        if merge is not None:
+            # Every page was merged: flag the stored results that are no longer listed
+            merge.finish()
+        self._record_scrape_state(division)
+        self.session.commit()
+        if merge is not None:
+            report_division_findings(self.session, division.id)
+        print(f"  ✅ {division.division.value} {division.gender.value} (id: {division.event_id}): {pages} page(s).")
+
+    def _save_page_fingerprints(self, division: Division) -> bool:
+        """Stores the fingerprints of the pages just crawled. Returns whether any page changed."""
+        return save_page_fingerprints(division, self._page_fingerprints.pop(division.id, []), self.now) > 0
+
+    def _record_scrape_state(self, division: Division):
+        """Marks a division as crawled to its last page."""
+        changed = self._save_page_fingerprints(division)
+        state = division.scrape_state
+        if state is None:
+            state = division.scrape_state = DivisionScrapeState(last_changed=self.now)
+        state.last_fetched = self.now
+        if changed:
+            state.last_changed = self.now
+        state.result_count = self.session.scalar(
+            select(func.count()).select_from(Result)
+            .where(Result.division_id == division.id, Result.vanished_at.is_(None)))
+
+
+def download_division_specs(season_number: int, race_name: str) -> list:
+    """Downloads the events of a race and the sexes of every division (worker thread)."""
+    events = filter_events(get_events(season_number, race_name))
+    return fetch_division_specs(season_number, race_name, events)
@@ -8,8 +8,10 @@ import requests
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+import metrics
 from db import init_db
 from models import Season, Race  # Import the necessary models
+from web_scraping import client
 
 
 # --- Function to Get Event Main Groups (Town-Events/Races) ---
@@ -20,7 +22,7 @@ def get_races(season_number: int, max_retries: int = 3) -> Optional[List[Dict[st
     (Your provided function, slightly cleaned up)
     """
 
-    BASE_URL = f"https://results.hyrox.com/season-{season_number}/index.php"
+    BASE_URL = f"{client.season_url(season_number)}index.php"
     params = {
         'content': 'ajax2',
         'func': 'getSearchFields',
@@ -32,7 +34,7 @@ def get_races(season_number: int, max_retries: int = 3) -> Optional[List[Dict[st
 
     for attempt in range(max_retries):
         try:
-            response = requests.get(BASE_URL, params=params, timeout=20)
+            response = client.get(BASE_URL, params=params, timeout=20)
             response.raise_for_status()
             response_json = response.json()
 
@@ -55,9 +57,11 @@ def get_races(season_number: int, max_retries: int = 3) -> Optional[List[Dict[st
 
         except requests.exceptions.Timeout:
             print(f"  ⚠️ Timeout occurred. Retrying... (Attempt {attempt + 1}/{max_retries})")
+            metrics.HTTP_RETRIES.inc(endpoint='search_fields')
             time.sleep(5)
         except requests.exceptions.HTTPError as errh:
             if response.status_code >= 500:
+                metrics.HTTP_RETRIES.inc(endpoint='search_fields')
                 time.sleep(5)
                 continue
             print(f"  ❌ Permanent HTTP Error (Season {season_number}). Error: {errh}")
@@ -109,9 +113,11 @@ def parse_race_metadata(race_name: str) -> Dict[str, Any]:
 
 # --- New Function: Update Races in DB ---
 
-def update_races_in_db(session: Session, season: Season, race_groups: List[Dict[str, str]]):
+def update_races_in_db(session: Session, season: Season, race_groups: List[Dict[str, str]], commit: bool = True):
     """
     Inserts or updates Race records for a given Season.
+
+    :param commit: If False, only flush and raise database errors: the caller owns the transaction.
     """
     season_db_id = season.id
     season_number = season.number
@@ -157,11 +163,18 @@ def update_races_in_db(session: Session, season: Season, race_groups: List[Dict[
                 insert_count += 1
 
         session.add(season)
-        session.commit()
+        if commit:
+            with metrics.DB_COMMIT_SECONDS.time(writer='races'):
+                session.commit()
+        else:
+            session.flush()
+        metrics.ROWS_INSERTED.inc(insert_count, table='races')
         print(
             f"  ✅ Season {season_number}: Processed {len(race_groups)} events. Inserted: {insert_count}, Updated: {update_count}.")
 
     except SQLAlchemyError as e:
+        if not commit:
+            raise
         session.rollback()
         print(f"  ❌ Database error processing Season {season_number}: {e}")
 
@@ -1,10 +1,19 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
 import requests
 from bs4 import BeautifulSoup, Tag
+from sqlalchemy import select, insert, update, delete, bindparam
 from sqlalchemy.orm import Session
 
+import metrics
+import profiling
 from db import init_db
+from dimensions import dimension_cache
+from integrity import report_division_findings
 from models import Race, Result
 from models.division import Gender, DivisionName, Division
+from web_scraping import client
 
 
 def make_form_data(race_name: str = "",
@@ -52,7 +61,7 @@ def make_params(page: int,
 
 
 def get_search_url(season_number: int) -> str:
-    return f"https://results.hyrox.com/season-{season_number}/?pid=list&pidp=ranking_nav"
+    return f"{client.season_url(season_number)}?pid=list&pidp=ranking_nav"
 
 
 def get_rank_overall(row_soup: Tag) -> int | None:
@@ -144,6 +153,29 @@ def parse_row_soup(row_soup: Tag, url: str) -> dict:
     return row_info_dict
 
 
+def parse_results_page(page_html: str, url: str) -> list:
+    """Parses one page of the result list into a list of row dicts (see parse_row_soup)."""
+    with metrics.PARSE_SECONDS.time(page_type='result_list'):
+        return _parse_results_page(page_html, url)
+
+
+def _parse_results_page(page_html: str, url: str) -> list:
+    page_soup = BeautifulSoup(page_html, 'html.parser')
+
+    class_table = 'col-sm-12 row-xs'
+    tag_table = 'div'
+    table_soup = page_soup.find_all(tag_table, {"class": class_table})
+    if len(table_soup) == 0:
+        return []
+
+    tag_rows = 'li'
+    class_rows = 'list-active list-group-item row'
+    class_rows_2 = 'list-group-item row'
+    rows_soup = table_soup[0].find_all(tag_rows, {"class": class_rows}) + \
+                table_soup[0].find_all(tag_rows, {"class": class_rows_2})
+    return [parse_row_soup(row_soup, url) for row_soup in rows_soup]
+
+
 def find_race(session: Session, race_name: str) -> Race:
     race = session.query(Race).filter(Race.name == race_name).first()
     if not race:
@@ -154,7 +186,7 @@ def find_race(session: Session, race_name: str) -> Race:
 def find_division(race: Race,
                   division_name: DivisionName,
                   gender: Gender) -> Division:
-    named_divisions = race.divisions.filter_by(division=division_name).all()
+    named_divisions = [div for div in race.divisions if div.division == division_name]
     if len(named_divisions) == 0:
         raise Exception(f"Division '{division_name}' not found in race '{race.name}'")
     division = [div for div in named_divisions if div.gender == gender][0]
@@ -170,64 +202,225 @@ def get_num_pages(page_soup: BeautifulSoup) -> int | None:
     page_selector_container = page_soup.find(tag_page_selector_container, {"class": class_page_selector_container})
     return 0
 
-def example_scrape_result_summaries(race_name: str,
-                                    division_name: DivisionName,
-                                    gender: Gender):
-    # Example usage to scrape for specific race, division, and gender
-    session = init_db()
-    race = find_race(session, race_name)
-    division = find_division(race, division_name, gender)
-    url = get_search_url(race.season.number)
+def fetch_results_page(season_number: int, division: Division, page: int) -> list:
+    """
+    Downloads and parses one page of a division's result list (an empty list means no more pages).
+
+    Only reads division.event_id and division.gender, so a rows.DivisionRow works as well
+    (e.g. in worker threads that must not touch ORM objects).
+    """
+    url = get_search_url(season_number)
     # form_data = make_form_data(race_name=race_name,
     #                            division_event_id=division.event_id,
     #                            sex=gender.value[0].upper())
+    params = make_params(page=page,
+                         division_event_id=division.event_id,
+                         sex=division.gender.value[0].upper())
+    with profiling.span('fetch_results_page'):
+        response = client.post(url, data=params)
+        response.raise_for_status()
+    with profiling.span('parse_results_page'):
+        return parse_results_page(response.text, url)
+
+
+# --- Merge ---
+
+# Result fields that come from the results page (compared to detect changed results);
+# age_group and nation_abbreviation are stored as dimension ids (see dimensions.py)
+MERGED_FIELDS = ('rank_overall', 'rank_age_group', 'age_group', 'full_name', 'nation_abbreviation',
+                 'total_time_ms', 'idp')
+
+
+def result_values(row_info: dict, total_time_ms: int) -> dict:
+    """The MERGED_FIELDS of a parsed result row."""
+    return {
+        'rank_overall': row_info['rank_overall'],
+        'rank_age_group': row_info['rank_age_group'],
+        'age_group': row_info['age_group'],
+        'full_name': row_info['fullname'],
+        'nation_abbreviation': row_info['nation_abbreviation'],
+        'total_time_ms': total_time_ms,
+        # Only the token of the detail page link is stored (see Result.link_to_detail_page)
+        'idp': Result.parse_idp(row_info['detailed_results_page_link']),
+    }
+
+
+class ResultMerge:
+    """
+    Merges crawled result rows of one division into its stored results, keyed by Result.result_key.
+
+    New results are inserted, results whose fields changed are updated in place and unchanged
+    ones are not written at all. finish() flags the stored results that a complete crawl no
+    longer listed (vanished_at) and clears the flag of those that came back.
+
+    Stored results from before result_key existed get their key on load; of results stored
+    twice (crawls before the merge) only the oldest is kept.
+
+    Age groups and nations are interned through the session's DimensionCache on write.
+
+    Nothing is committed here; the caller commits (e.g. once per page).
+
+    Example:
+        merge = ResultMerge(session, division.id)
+        for rows_info in pages:
+            merge.merge_page(rows_info)
+        merge.finish()
+        session.commit()
+    """
+
+    def __init__(self, session: Session, division_id: int):
+        self.session = session
+        self.division_id = division_id
+        self.dimensions = dimension_cache(session)
+        self.counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'vanished': 0}
+        # result_key -> (MERGED_FIELDS values, vanished)
+        self._stored: Dict[str, Tuple[tuple, bool]] = {}
+        self._seen: Set[str] = set()
+        self._load()
+
+    def _load(self):
+        fields = [getattr(Result, field) for field in MERGED_FIELDS]
+        stored = self.session.execute(
+            select(Result.id, Result.result_key, Result.vanished_at, *fields)
+            .where(Result.division_id == self.division_id)
+            .order_by(Result.id))
+        duplicate_ids, backfill = [], []
+        for result_id, result_key, vanished_at, *values in stored:
+            values = tuple(values)
+            if result_key is None:
+                by_field = dict(zip(MERGED_FIELDS, values))
+                key = Result.make_key(by_field['idp'], by_field['rank_overall'], by_field['full_name'])
+            else:
+                key = result_key
+            if key in self._stored:
+                duplicate_ids.append(result_id)
+                continue
+            if result_key is None:
+                backfill.append({'id': result_id, 'result_key': key})
+            self._stored[key] = (values, vanished_at is not None)
+        if duplicate_ids:
+            self.session.execute(delete(Result).where(Result.id.in_(duplicate_ids)))
+            print(f"  🧹 Removed {len(duplicate_ids)} duplicate result(s) of division {self.division_id}.")
+        if backfill:
+            self.session.execute(update(Result), backfill)
+
+    def merge_page(self, rows_info: list) -> List[dict]:
+        """Merges the parsed rows of one result page. Returns the values of the inserted results."""
+        times_ms = Result.parse_times_ms([row_info['total_time'] for row_info in rows_info])
+        inserts, updates = [], []
+        for row_info, total_time_ms in zip(rows_info, times_ms):
+            if total_time_ms is None:
+                print(f"  ⚠️ Skipping result without finish time: {row_info['fullname']} ({row_info['total_time']})")
+                continue
+            values = result_values(row_info, total_time_ms)
+            key = Result.make_key(values['idp'], values['rank_overall'], values['full_name'])
+            self._seen.add(key)
+            stored = self._stored.get(key)
+            new_values = tuple(values.values())
+            if stored is None:
+                inserts.append(dict(values, division_id=self.division_id, result_key=key))
+            elif stored != (new_values, False):
+                updates.append(dict(values, b_key=key, vanished_at=None))
+            else:
+                self.counts['unchanged'] += 1
+                continue
+            self._stored[key] = (new_values, False)
+        if inserts:
+            # Core executemany: one statement for the page instead of one INSERT per ORM object
+            self.session.execute(insert(Result), [self.dimensions.intern_values(values) for values in inserts])
+        if updates:
+            # Core executemany on the connection (the ORM bulk update only matches on primary keys)
+            self.session.connection().execute(self._update_by_key(),
+                                              [self.dimensions.intern_values(values) for values in updates])
+        self.counts['inserted'] += len(inserts)
+        self.counts['updated'] += len(updates)
+        metrics.ROWS_INSERTED.inc(len(inserts), table='results')
+        metrics.ROWS_UPDATED.inc(len(updates), table='results')
+        return inserts
+
+    def finish(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Call after merging every page of the division: flags the results that were not listed."""
+        if not self._seen:
+            # An empty result list is more likely a hiccup of the site than every result withdrawn
+            return self.counts
+        vanished = [key for key, (_, is_vanished) in self._stored.items()
+                    if key not in self._seen and not is_vanished]
+        if vanished:
+            self.session.execute(
+                update(Result)
+                .where(Result.division_id == self.division_id, Result.result_key.in_(vanished))
+                .values(vanished_at=now or datetime.now()))
+            for key in vanished:
+                self._stored[key] = (self._stored[key][0], True)
+        self.counts['vanished'] += len(vanished)
+        self._seen = set()
+        return self.counts
+
+    def _update_by_key(self):
+        results = Result.__table__
+        return (update(results)
+                .where(results.c.division_id == self.division_id, results.c.result_key == bindparam('b_key')))
+
+
+def store_results_page(session: Session, merge: ResultMerge, rows_info: list) -> int:
+    """Merges the parsed rows of one result page of a division and commits. Returns the number of results inserted."""
+    with profiling.span('write_results'):
+        inserted = merge.merge_page(rows_info)
+        with metrics.DB_COMMIT_SECONDS.time(writer='results'):
+            session.commit()
+    return len(inserted)
+
+
+def scrape_division_results(session: Session, division: Division) -> int:
+    """
+    Scrapes all result pages of a division and merges them into its stored results.
+
+    Scraping a division again only writes what changed (see ResultMerge).
+
+    :return: The number of results inserted.
+    """
+    season_number = division.race.season.number
+    merge = ResultMerge(session, division.id)
     page = 1
     while page < 1E6:
-        params = make_params(page=page,
-                             division_event_id=division.event_id,
-                             sex=gender.value[0].upper())
-
-        print(f"URL: {url}")
-        # print(f"Form Data: {form_data}")
-        print(f"Params: {params}")
-        response = requests.post(url, data=params)
-        print(f"Response Status Code: {response.status_code}")
-        # print(f"Response Text: {response.text[:500]}")  # Print first 500 characters of the response text
-
-        page_soup = BeautifulSoup(response.text, 'html.parser')
-
-        class_table = 'col-sm-12 row-xs'
-        tag_table = 'div'
-        table_soup = page_soup.find_all(tag_table, {"class": class_table})
-
-        tag_rows = 'li'
-        class_rows = 'list-active list-group-item row'
-        class_rows_2 = 'list-group-item row'
-        rows_soup = table_soup[0].find_all(tag_rows, {"class": class_rows}) + \
-                    table_soup[0].find_all(tag_rows, {"class": class_rows_2})
-        if len(rows_soup) == 0:
-            print("No more results found, ending pagination.")
+        rows_info = fetch_results_page(season_number, division, page)
+        if len(rows_info) == 0:
             break
-        for row_soup in rows_soup:
-            # todo: check for unique ranks per race (overall and age group)
-            row_info = parse_row_soup(row_soup, url)
-            new_result = make_new_result(row_info)
-            division.results.append(new_result)
-            session.add(new_result)
-            session.commit()
+        store_results_page(session, merge, rows_info)
         page += 1
+    counts = merge.finish()
+    session.commit()
+    # Unique and gapless ranks (overall and per age group); problems are reported, not raised
+    report_division_findings(session, division.id)
+    print(f"  ✅ {division.division.value} {division.gender.value}: {counts['inserted']} new, "
+          f"{counts['updated']} updated, {counts['unchanged']} unchanged, {counts['vanished']} vanished "
+          f"result(s) on {page - 1} page(s).")
+    return counts['inserted']
+
+
+def scrape_race_results(session: Session, race: Race) -> int:
+    """Scrapes the results of every division of a race. Returns the number of results inserted."""
+    print(f"Scraping results for race: {race.name}")
+    insert_count = 0
+    divisions = race.divisions
+    for i, division in enumerate(divisions):
+        metrics.QUEUE_DEPTH.set(len(divisions) - i, queue='divisions_without_results')
+        try:
+            insert_count += scrape_division_results(session, division)
+        except requests.exceptions.RequestException as err:
+            print(f"  ❌ Failed to scrape results for {division}: {err}")
+    metrics.QUEUE_DEPTH.set(0, queue='divisions_without_results')
+    return insert_count
 
 
-def make_new_result(row_info: dict) -> Result:
-    return Result(
-        full_name=row_info['fullname'],
-        nation_abbreviation=row_info['nation_abbreviation'],
-        rank_overall=row_info['rank_overall'],
-        rank_age_group=row_info['rank_age_group'],
-        age_group=row_info['age_group'],
-        total_time_ms=Result.parse_time_ms(row_info['total_time']),
-        link_to_detail_page=row_info['detailed_results_page_link'],
-    )
+def example_scrape_result_summaries(race_name: str,
+                                    division_name: DivisionName,
+                                    gender: Gender):
+    # Example usage to scrape for specific race, division, and gender
+    session = init_db()
+    race = find_race(session, race_name)
+    division = find_division(race, division_name, gender)
+    scrape_division_results(session, division)
 
 
 def example_print_result_summaries(race_name: str,
@@ -6,8 +6,11 @@ from bs4 import BeautifulSoup
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from db import init_db
+import metrics
+from db import session_scope
 from models import Season
+from repository import get_seasons
+from web_scraping import client
 
 
 # --- 1. Scraper Function: Get and Parse Seasons ---
@@ -19,7 +22,7 @@ def scrape_hyrox_seasons() -> List[Dict[str, Any]]:
     :return: A list of dictionaries, each containing 'name', 'number', and 'url'.
     """
     # Use a known season page to get the dropdown
-    url = "https://results.hyrox.com/season-1/"
+    url = client.season_url(1)
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36',
     }
@@ -27,36 +30,37 @@ def scrape_hyrox_seasons() -> List[Dict[str, Any]]:
     print("\n1. 🔎 Attempting to scrape all available seasons...")
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = client.get(url, headers=headers, timeout=10)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"❌ Error fetching seasons URL: {e}")
         return []
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    scraped_seasons = []
+    with metrics.PARSE_SECONDS.time(page_type='season_index'):
+        soup = BeautifulSoup(response.text, 'html.parser')
+        scraped_seasons = []
 
-    # Locate the dropdown menu for seasons
-    season_menu = soup.find('ul', class_='dropdown-menu')
+        # Locate the dropdown menu for seasons
+        season_menu = soup.find('ul', class_='dropdown-menu')
 
-    if season_menu:
-        for anchor in season_menu.find_all('a', href=True):
-            relative_url = anchor.get('href')
-            season_name = anchor.get_text(strip=True)
+        if season_menu:
+            for anchor in season_menu.find_all('a', href=True):
+                relative_url = anchor.get('href')
+                season_name = anchor.get_text(strip=True)
 
-            # Use regex to reliably extract the season number from the URL part
-            match = re.search(r'season-(\d+)', relative_url)
-            season_num = int(match.group(1)) if match else None
+                # Use regex to reliably extract the season number from the URL part
+                match = re.search(r'season-(\d+)', relative_url)
+                season_num = int(match.group(1)) if match else None
 
-            # Construct the full URL
-            full_url = f"https://results.hyrox.com{relative_url}"
+                # Construct the full URL
+                full_url = f"{client.RESULTS_BASE_URL}{relative_url}"
 
-            if season_num:
-                scraped_seasons.append({
-                    'name': season_name,
-                    'number': season_num,
-                    'url': full_url
-                })
+                if season_num:
+                    scraped_seasons.append({
+                        'name': season_name,
+                        'number': season_num,
+                        'url': full_url
+                    })
 
     print(f"✅ Scraped {len(scraped_seasons)} season(s).")
     return scraped_seasons
@@ -67,6 +71,7 @@ def scrape_hyrox_seasons() -> List[Dict[str, Any]]:
 def update_seasons_in_db(session: Session,
                          seasons_data: List[Dict[str, Any]],
                          overwrite_existing: bool = False,
+                         commit: bool = True,
                          ):
     """
     Inserts new seasons or updates existing ones using session.merge().
@@ -74,6 +79,7 @@ def update_seasons_in_db(session: Session,
     :param session: The SQLAlchemy Session object.
     :param seasons_data: List of dictionaries containing season data.
     :param overwrite_existing: If True, existing seasons will be updated with new data.
+    :param commit: If False, only flush and raise database errors: the caller owns the transaction.
     """
     print("\n2. 💾 Updating/Inserting Seasons into the Database...")
 
@@ -108,16 +114,21 @@ def update_seasons_in_db(session: Session,
                 insert_count += 1
 
         # Commit all changes at once
-        session.commit()
+        if commit:
+            with metrics.DB_COMMIT_SECONDS.time(writer='seasons'):
+                session.commit()
+        else:
+            session.flush()
+        metrics.ROWS_INSERTED.inc(insert_count, table='seasons')
         print(f"✅ Successfully processed {len(seasons_data)} seasons.")
         print(f"   - {insert_count} new season(s) inserted.")
         print(f"   - {update_count} existing season(s) updated.")
 
     except SQLAlchemyError as e:
+        if not commit:
+            raise
         session.rollback()
         print(f"❌ Database error occurred: {e}")
-    finally:
-        session.close()
 
 
 # --- Demo Functions (For verification) ---
@@ -125,32 +136,25 @@ def update_seasons_in_db(session: Session,
 def list_seasons(session: Session):
     """Lists all seasons currently in the database."""
     print("\n3. 📋 Listing all Seasons currently in the DB (Verification):")
-    seasons = session.query(Season).order_by(Season.number.asc()).all()
+    seasons = get_seasons(session, profile='races')
     if not seasons:
         print("   - Database contains no seasons.")
         return
 
     for season in seasons:
-        # Use .count() on the 'dynamic' relationship to check the number of races
-        print(f"   - Season {season.number}: {season.name} | Races: {season.races.count()}")
+        # The races were loaded together with the seasons (one query for all seasons)
+        print(f"   - Season {season.number}: {season.name} | Races: {len(season.races)}")
 
 
 # --- Main Execution ---
 
 if __name__ == '__main__':
-    # 1. Initialize DB and get session
-    session = init_db()
+    with session_scope() as session:
+        # 1. Scrape the data
+        scraped_seasons = scrape_hyrox_seasons()
 
-    # 2. Scrape the data
-    scraped_seasons = scrape_hyrox_seasons()
+        # 2. Update the database
+        update_seasons_in_db(session, scraped_seasons)
 
-    # 3. Update the database
-    # Note: We pass the session to the update function, which closes it.
-    update_seasons_in_db(session, scraped_seasons)
-
-    # 4. Re-establish session for verification
-    session = init_db()
-
-    # 5. Verify the results
-    list_seasons(session)
-    session.close()
+        # 3. Verify the results
+        list_seasons(session)
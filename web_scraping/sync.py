@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from models import Season, Race, Division, RaceScrapeState, DivisionScrapeState
+from rows import DivisionRow
+from web_scraping.fingerprints import page_fingerprint, probe_page
+from web_scraping.pipeline import ScrapePipeline, DEFAULT_WORKERS, STAGES
+from web_scraping.result_summaries import fetch_results_page
+
+# Divisions (and the division lists of races) checked more recently than this are not checked again
+DEFAULT_RECHECK_AFTER = timedelta(hours=20)
+# Divisions whose pages have not changed for this long are final and never checked again
+DEFAULT_FINAL_AFTER = timedelta(days=14)
+# Page number in the context of a check download (page 1 plus the probe page, see _queue_first_page)
+CHECK_PAGES = 0
+
+
+def download_check_pages(season_number: int, division: DivisionRow, pages: Tuple[int, ...]) -> Dict[int, list]:
+    """Downloads the pages that show whether a division changed (worker thread)."""
+    return {page: fetch_results_page(season_number, division, page) for page in pages}
+
+
+class SyncPipeline(ScrapePipeline):
+    """
+    Incremental scrape-all: only refreshes what can have changed since the last run.
+
+    - Past seasons whose races and divisions were all scraped before are skipped entirely.
+    - The division list of a race is re-fetched only if it was last fetched more than
+      `recheck_after` ago (and never for past seasons).
+    - Every division that is not final downloads page 1 and its probe page (the last page, or
+      the next one if the last page is full). If both match their stored fingerprints (so the
+      top of the list and the result count are the same) the division is done; otherwise all
+      its pages are re-scraped and merged into the stored results.
+    - A division is final once its pages stayed unchanged for `final_after`, or once it was
+      scraped and a newer season exists.
+
+    Example:
+        SyncPipeline(session, workers=8).run()
+    """
+
+    season_profile = 'scrape_state'
+
+    def __init__(self,
+                 session: Session,
+                 workers: int = DEFAULT_WORKERS,
+                 season_numbers: Optional[Iterable[int]] = None,
+                 recheck_after: timedelta = DEFAULT_RECHECK_AFTER,
+                 final_after: timedelta = DEFAULT_FINAL_AFTER,
+                 now: Optional[datetime] = None):
+        super().__init__(session, workers=workers, season_numbers=season_numbers, stages=STAGES)
+        self.recheck_after = recheck_after
+        self.final_after = final_after
+        self.now = now or datetime.now()
+        self.skipped = {'seasons': 0, 'races': 0, 'divisions': 0}
+        self.unchanged = 0
+        self._latest_season = 0
+        self._unchanged_ids: Set[int] = set()
+
+    # --- Decisions ---
+
+    def _complete_seasons(self) -> Set[int]:
+        """Seasons in which every race and every division has a scrape state."""
+        with_races = set(self.session.scalars(select(Season.number).join(Race, Race.season_id == Season.id)))
+        races_missing = self.session.scalars(
+            select(Season.number).join(Race, Race.season_id == Season.id)
+            .outerjoin(RaceScrapeState, RaceScrapeState.race_id == Race.id)
+            .where(RaceScrapeState.race_id.is_(None)))
+        divisions_missing = self.session.scalars(
+            select(Season.number).join(Race, Race.season_id == Season.id)
+            .join(Division, Division.race_id == Race.id)
+            .outerjoin(DivisionScrapeState, DivisionScrapeState.division_id == Division.id)
+            .where(DivisionScrapeState.division_id.is_(None)))
+        return with_races - set(races_missing) - set(divisions_missing)
+
+    def _is_past(self, race: Race) -> bool:
+        return race.season.number < self._latest_season
+
+    def _is_final(self, state: DivisionScrapeState, past: bool) -> bool:
+        return past or state.last_fetched - state.last_changed >= self.final_after
+
+    def _recently_checked(self, last_fetched: datetime) -> bool:
+        return self.now - last_fetched < self.recheck_after
+
+    # --- Scheduling ---
+
+    def _queue_races(self, season_numbers: Iterable[int]):
+        season_numbers = list(season_numbers)
+        self._latest_season = self.session.scalar(select(func.max(Season.number))) or 0
+        complete = self._complete_seasons()
+        for season_number in season_numbers:
+            if season_number < self._latest_season and season_number in complete and self._wanted(season_number):
+                self.skipped['seasons'] += 1
+                print(f"  ⏭️ Season {season_number} is complete. Skipping.")
+                continue
+            super()._queue_races([season_number])
+
+    def _queue_divisions(self, race: Race):
+        state = race.scrape_state
+        if state is not None and (self._is_past(race) or self._recently_checked(state.last_fetched)):
+            self.skipped['races'] += 1
+            self._queue_results(race)
+            return
+        super()._queue_divisions(race)
+
+    def _queue_first_page(self, division: Division, division_row: DivisionRow, season_number: int):
+        row_counts = [stored_page.row_count for stored_page in division.page_fingerprints]
+        if not row_counts:
+            super()._queue_first_page(division, division_row, season_number)
+            return
+        pages = tuple(sorted({1, probe_page(row_counts)}))
+        self._submit('results', (division_row, season_number, CHECK_PAGES),
+                     download_check_pages, season_number, division_row, pages)
+
+    def _divisions_to_scrape(self, race: Race) -> Iterable[Division]:
+        past = self._is_past(race)
+        for division in race.divisions:
+            state = division.scrape_state
+            if state is not None and (self._is_final(state, past) or self._recently_checked(state.last_fetched)):
+                self.skipped['divisions'] += 1
+                continue
+            yield division
+
+    # --- Writers ---
+
+    def _store_results(self, context, payload):
+        division_row, season_number, page = context
+        if page == CHECK_PAGES:
+            division = self._divisions[division_row.id]
+            if self._pages_unchanged(division, payload):
+                self._unchanged_ids.add(division.id)
+                self._finish_division(division, pages=0)
+                return
+            # Changed: continue like a full crawl from page 1
+            context, payload = (division_row, season_number, 1), payload[1]
+        super()._store_results(context, payload)
+
+    @staticmethod
+    def _pages_unchanged(division: Division, pages: Dict[int, list]) -> bool:
+        stored = {stored_page.page: stored_page.fingerprint for stored_page in division.page_fingerprints}
+        for page, rows_info in pages.items():
+            if page not in stored:
+                if rows_info:
+                    return False
+            elif page_fingerprint(rows_info) != stored[page]:
+                return False
+        return True
+
+    def _save_page_fingerprints(self, division: Division) -> bool:
+        if division.id in self._unchanged_ids:
+            # Only the check pages were downloaded: the stored fingerprints stay as they are
+            self._unchanged_ids.discard(division.id)
+            self.unchanged += 1
+            return False
+        return super()._save_page_fingerprints(division)
@@ -0,0 +1,264 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, TextIO
+
+import requests
+from sqlalchemy.orm import Session
+
+import metrics
+import profiling
+from models import Race, Division, Result
+from repository import get_race
+from rows import DivisionRow
+from web_scraping.divisions import write_divisions
+from web_scraping.pipeline import download_division_specs, DEFAULT_WORKERS
+from web_scraping.result_summaries import fetch_results_page, ResultMerge
+from web_scraping.fingerprints import page_fingerprint, probe_page, save_page_fingerprints
+
+# Poll interval bounds per division: halved after new finishers, stretched by INTERVAL_BACKOFF otherwise
+DEFAULT_MIN_INTERVAL_S = 15.0
+DEFAULT_MAX_INTERVAL_S = 300.0
+INTERVAL_BACKOFF = 1.5
+
+FinisherHook = Callable[[dict], None]
+
+
+def ndjson_hook(stream: TextIO) -> FinisherHook:
+    """Finisher hook that writes every event as one JSON line and flushes it immediately."""
+    def write_event(event: dict):
+        stream.write(json.dumps(event, default=str) + "\n")
+        stream.flush()
+    return write_event
+
+
+# --- Downloads (worker threads) ---
+
+class PollResult(NamedTuple):
+    # Parsed rows of every page whose fingerprint changed (1-based page number -> rows)
+    changed_pages: Dict[int, list]
+    # (fingerprint, row count) of all pages after the poll
+    pages: List[Tuple[str, int]]
+    requests: int
+
+
+def poll_division(season_number: int, division: DivisionRow, pages: Tuple[Tuple[str, int], ...] = ()) -> PollResult:
+    """
+    Finds the changed result pages of a division with as few requests as possible.
+
+    Result lists are sorted by rank, so new finishers and re-ranked athletes only change a
+    suffix of the pages. The probe page (the last known page, or the one after it if the last
+    page is full) is downloaded first; if it did not change that is all. Otherwise the first
+    changed page is found by binary search over the known pages, and the pages from there on
+    are downloaded until an empty page. Without known pages (first poll) every page is downloaded.
+    Corrections that change no page at the end are not seen here; `sync` picks them up.
+
+    :param pages: (fingerprint, row count) of every page as of the last poll.
+    """
+    fetched: Dict[int, list] = {}
+
+    def fetch(page: int) -> list:
+        if page not in fetched:
+            fetched[page] = fetch_results_page(season_number, division, page)
+        return fetched[page]
+
+    def changed(page: int) -> bool:
+        if page > len(pages):
+            return bool(fetch(page))
+        return page_fingerprint(fetch(page)) != pages[page - 1][0]
+
+    first_changed = 1
+    if pages:
+        probe = probe_page([row_count for _, row_count in pages])
+        if not changed(probe):
+            return PollResult({}, list(pages), len(fetched))
+        low, high = 1, probe
+        while low < high:
+            middle = (low + high) // 2
+            if changed(middle):
+                high = middle
+            else:
+                low = middle + 1
+        first_changed = low
+
+    new_pages = list(pages[:first_changed - 1])
+    changed_pages = {}
+    page = first_changed
+    while rows_info := fetch(page):
+        fingerprint = page_fingerprint(rows_info)
+        if page > len(pages) or fingerprint != pages[page - 1][0]:
+            changed_pages[page] = rows_info
+        new_pages.append((fingerprint, len(rows_info)))
+        page += 1
+    return PollResult(changed_pages, new_pages, len(fetched))
+
+
+# --- Tail ---
+
+class TailedDivision:
+    """Poll state of one division: page fingerprints, stored results and the adaptive interval."""
+
+    def __init__(self, division: Division, merge: ResultMerge, interval_s: float):
+        self.division = division
+        # Workers get a plain tuple, never the ORM object
+        self.division_row = DivisionRow(division.id, division.race_id, division.division, division.gender,
+                                        division.event_id)
+        self.pages: Tuple[Tuple[str, int], ...] = tuple(
+            (stored_page.fingerprint, stored_page.row_count) for stored_page in division.page_fingerprints)
+        self.merge = merge
+        self.interval_s = interval_s
+        self.next_poll = 0.0
+        self.polls = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.division_row.division.value} {self.division_row.gender.value}"
+
+
+class RaceTail:
+    """
+    Live race-day mode: polls the divisions of a race and stores new finishers within seconds.
+
+    Every division is polled on its own adaptive interval (halved down to `min_interval_s`
+    when new finishers showed up, stretched up to `max_interval_s` while nothing changes).
+    A poll only downloads the pages whose fingerprint changed (see poll_division), inserts
+    the results that are not stored yet, updates stored results whose rank or time changed,
+    and passes an event for every new finisher to `on_finisher`.
+
+    As in ScrapePipeline, worker threads only download; the calling thread writes.
+
+    Example:
+        RaceTail(session, '2025 Hamburg', on_finisher=ndjson_hook(sys.stdout)).run()
+    """
+
+    def __init__(self,
+                 session: Session,
+                 race_name: str,
+                 on_finisher: Optional[FinisherHook] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 min_interval_s: float = DEFAULT_MIN_INTERVAL_S,
+                 max_interval_s: float = DEFAULT_MAX_INTERVAL_S,
+                 max_polls: Optional[int] = None):
+        self.session = session
+        self.race_name = race_name
+        self.on_finisher = on_finisher
+        self.workers = workers
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.max_polls = max_polls
+        self.counts = {'polls': 0, 'requests': 0, 'inserted': 0, 'updated': 0}
+        self.failures = 0
+        self.race: Optional[Race] = None
+        self.season_number = 0
+        self.tailed: List[TailedDivision] = []
+
+    def run(self) -> Dict[str, int]:
+        """Polls until every division was polled `max_polls` times (or forever, until Ctrl+C)."""
+        self._load()
+        pending: Dict[Future, TailedDivision] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tail') as executor:
+            try:
+                while True:
+                    now = time.monotonic()
+                    polling = set(pending.values())
+                    for tailed in self.tailed:
+                        if tailed not in polling and tailed.next_poll <= now and not self._done(tailed):
+                            pending[executor.submit(poll_division, self.season_number, tailed.division_row,
+                                                    tailed.pages)] = tailed
+                    if not pending and all(self._done(tailed) for tailed in self.tailed):
+                        break
+                    next_poll = min((tailed.next_poll for tailed in self.tailed
+                                     if tailed not in pending.values() and not self._done(tailed)), default=None)
+                    timeout = None if next_poll is None else max(next_poll - time.monotonic(), 0)
+                    if not pending:
+                        time.sleep(timeout)
+                        continue
+                    done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        tailed = pending.pop(future)
+                        try:
+                            poll = future.result()
+                        except (requests.exceptions.RequestException, ValueError) as err:
+                            self.failures += 1
+                            self._schedule(tailed, found_new=False)
+                            print(f"  ❌ Poll of {tailed.label} failed: {err}")
+                            continue
+                        self._store_poll(tailed, poll)
+                    metrics.QUEUE_DEPTH.set(len(pending), queue='tail_polls')
+            except KeyboardInterrupt:
+                print("🛑 Stopping tail.")
+                for future in pending:
+                    future.cancel()
+        return self.counts
+
+    def _done(self, tailed: TailedDivision) -> bool:
+        return self.max_polls is not None and tailed.polls >= self.max_polls
+
+    def _schedule(self, tailed: TailedDivision, found_new: bool):
+        tailed.polls += 1
+        if found_new:
+            tailed.interval_s = max(self.min_interval_s, tailed.interval_s / 2)
+        else:
+            tailed.interval_s = min(self.max_interval_s, tailed.interval_s * INTERVAL_BACKOFF)
+        tailed.next_poll = time.monotonic() + tailed.interval_s
+
+    # --- Writers (calling thread only) ---
+
+    def _load(self):
+        """Loads the race (scraping its divisions if there are none yet) and the stored results."""
+        self.race = get_race(self.session, self.race_name, profile='page_fingerprints')
+        if self.race is None:
+            raise ValueError(f"Race '{self.race_name}' is not in the database; scrape the races first.")
+        self.season_number = self.race.season.number
+        if not self.race.divisions:
+            write_divisions(self.session, self.race,
+                            download_division_specs(self.season_number, self.race_name))
+        self.tailed = [TailedDivision(division, ResultMerge(self.session, division.id), self.min_interval_s)
+                       for division in self.race.divisions]
+        # Keys backfilled / duplicates removed while loading the stored results
+        self.session.commit()
+        print(f"👀 Tailing {len(self.tailed)} division(s) of {self.race_name}.")
+
+    def _store_poll(self, tailed: TailedDivision, poll: PollResult):
+        self.counts['polls'] += 1
+        self.counts['requests'] += poll.requests
+        new_events = []
+        with profiling.span('write_results'):
+            for page in sorted(poll.changed_pages):
+                new_events.extend(self._store_rows(tailed, poll.changed_pages[page]))
+            if tuple(poll.pages) != tailed.pages:
+                tailed.pages = tuple(poll.pages)
+                save_page_fingerprints(tailed.division, tailed.pages, datetime.now())
+                with metrics.DB_COMMIT_SECONDS.time(writer='tail'):
+                    self.session.commit()
+        if self.on_finisher is not None:
+            for event in new_events:
+                self.on_finisher(event)
+        self._schedule(tailed, found_new=bool(new_events))
+        if new_events:
+            print(f"  🏁 {tailed.label}: {len(new_events)} new finisher(s) from {poll.requests} request(s), "
+                  f"next poll in {tailed.interval_s:.0f}s.")
+
+    def _store_rows(self, tailed: TailedDivision, rows_info: list) -> List[dict]:
+        # A poll only sees the changed pages, so results are never flagged as vanished here
+        counts_before = dict(tailed.merge.counts)
+        inserted = tailed.merge.merge_page(rows_info)
+        for count in ('inserted', 'updated'):
+            self.counts[count] += tailed.merge.counts[count] - counts_before[count]
+        detected_at = datetime.now().isoformat(timespec='seconds')
+        return [{
+            'event': 'finisher',
+            'detected_at': detected_at,
+            'race': self.race_name,
+            'division': tailed.division_row.division.value,
+            'gender': tailed.division_row.gender.value,
+            'result_key': values['result_key'],
+            'full_name': values['full_name'],
+            'nation': values['nation_abbreviation'],
+            'age_group': values['age_group'],
+            'rank_overall': values['rank_overall'],
+            'rank_age_group': values['rank_age_group'],
+            'total_time': Result.time_ms_to_string(values['total_time_ms']),
+            'total_time_ms': values['total_time_ms'],
+        } for values in inserted]